@@ -4,3 +4,38 @@ from django.apps import AppConfig
 class SrcConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'src'
+
+    def ready(self):
+        from django.db.models.signals import post_save, post_delete
+        from src.models.items import Item
+        from src.cache.item_catalog import ItemCatalog
+        from src.models.user_discoveries import UserDiscovery
+        from src.models.skin import Skin
+        from src.models.skin_variant import SkinVariant
+        from src.cache.skin_catalog import SkinCatalog
+        from src.service.skin_asset_pipeline import SkinAssetPipeline
+        from src.models.achievement import Achievement
+        from src.service.achievement_engine import AchievementEngine
+        from src.service.task_runner import TaskRunner
+        from src.models.season import Season
+        from src.service.season_service import SeasonService
+
+        # Any change to an item outdates the in-memory catalog in every process
+        post_save.connect(ItemCatalog.invalidate, sender=Item, dispatch_uid='item_catalog_save')
+        post_delete.connect(ItemCatalog.invalidate, sender=Item, dispatch_uid='item_catalog_delete')
+        # Discoveries carry copies of their item's category and rarity
+        post_save.connect(UserDiscovery.sync_item_labels, sender=Item, dispatch_uid='user_discovery_item_labels')
+        # As does any change to a skin or its variants for the skin catalog, which lists thumbnail sizes too
+        for model in (Skin, SkinVariant):
+            post_save.connect(SkinCatalog.invalidate, sender=model, dispatch_uid=f'skin_catalog_save_{model.__name__}')
+            post_delete.connect(SkinCatalog.invalidate, sender=model, dispatch_uid=f'skin_catalog_delete_{model.__name__}')
+        # Resized variants are regenerated in the background whenever a skin's image changes
+        post_save.connect(SkinAssetPipeline.on_skin_saved, sender=Skin, dispatch_uid='skin_asset_variants')
+        # Achievements are compiled into rules once per change, not per discovery
+        post_save.connect(AchievementEngine.invalidate, sender=Achievement, dispatch_uid='achievement_rules_save')
+        post_delete.connect(AchievementEngine.invalidate, sender=Achievement, dispatch_uid='achievement_rules_delete')
+        # Seasons are cached per process, ending or archiving one early must reach every process
+        post_save.connect(SeasonService.invalidate, sender=Season, dispatch_uid='current_season_save')
+        post_delete.connect(SeasonService.invalidate, sender=Season, dispatch_uid='current_season_delete')
+        # Background writes still waiting are run when the process is asked to stop, not dropped
+        TaskRunner.install_signal_handler()
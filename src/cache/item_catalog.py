@@ -0,0 +1,98 @@
+import time
+import threading
+from typing import Optional
+from dataclasses import dataclass
+from django.conf import settings
+from src.models.items import Item
+from src.cache.shared_version import SharedVersion
+
+
+@dataclass(frozen=True)
+class CatalogItem:
+    id: int
+    name: str
+    category: str
+    rarity: str
+    point_value: int
+    threat_level: int
+    average_decomposition_time: int
+    environmental_impact_description: str
+    award_points: int  # what a discovery of this item is worth, see Item.award_points
+
+
+@dataclass(frozen=True)
+class CatalogSnapshot:
+    version: int
+    loaded_at: float  # time.monotonic() of the load
+    items: tuple[CatalogItem, ...]  # ordered by id
+    by_id: dict[int, CatalogItem]
+    by_name: dict[str, CatalogItem]  # casefolded name
+
+
+class ItemCatalog:
+    """
+    Immutable in-process copy of the items table, shared by every service
+
+    Items change rarely, so the whole table is held as one snapshot and swapped out wholesale when
+    its SharedVersion moves. Saving or deleting an Item bumps the version (see SrcConfig.ready), and
+    every process notices within settings.SHARED_VERSION_CHECK_SECONDS. A snapshot is also reloaded
+    once older than settings.CATALOG_MAX_AGE_SECONDS, so a missed bump (a raw SQL edit, a change
+    rolled back after the bump was seen) can't keep a process on stale items for long.
+    """
+    VERSION = SharedVersion('item_catalog')
+
+    def __init__(self):
+        self.__snapshot = None  # type: Optional[CatalogSnapshot]
+        self.__lock = threading.Lock()
+
+    def snapshot(self) -> CatalogSnapshot:
+        version = self.VERSION.get()
+        snapshot = self.__snapshot
+        if self.__outdated(snapshot, version):
+            with self.__lock:
+                snapshot = self.__snapshot
+                if self.__outdated(snapshot, version):
+                    snapshot = self.__snapshot = self.__load(version)
+        return snapshot
+
+    def get(self, item_id: int) -> Optional[CatalogItem]:
+        return self.snapshot().by_id.get(item_id)
+
+    def find_by_name(self, name: str) -> Optional[CatalogItem]:
+        """Case-insensitive lookup of a label, as returned by the vision model"""
+        return self.snapshot().by_name.get(name.strip().casefold())
+
+    def all(self) -> tuple[CatalogItem, ...]:
+        return self.snapshot().items
+
+    @classmethod
+    def invalidate(cls, *args, **kwargs) -> None:
+        """Signal receiver, makes every process reload the catalog once the change is committed"""
+        cls.VERSION.bump()
+
+    @staticmethod
+    def __outdated(snapshot: Optional[CatalogSnapshot], version: int) -> bool:
+        return snapshot is None or snapshot.version != version or \
+            time.monotonic() - snapshot.loaded_at >= settings.CATALOG_MAX_AGE_SECONDS
+
+    @staticmethod
+    def __load(version: int) -> CatalogSnapshot:
+        items = tuple(CatalogItem(
+            id=item.id,
+            name=item.name,
+            category=item.category,
+            rarity=item.rarity,
+            point_value=item.point_value,
+            threat_level=item.threat_level,
+            average_decomposition_time=item.average_decomposition_time,
+            environmental_impact_description=item.environmental_impact_description,
+            award_points=item.award_points
+        ) for item in Item.objects.order_by('id'))
+
+        return CatalogSnapshot(
+            version=version,
+            loaded_at=time.monotonic(),
+            items=items,
+            by_id={item.id: item for item in items},
+            by_name={item.name.casefold(): item for item in items}
+        )
@@ -0,0 +1,141 @@
+import os
+import mmap
+import time
+import struct
+import logging
+import tempfile
+import threading
+from array import array
+from bisect import bisect_left
+from typing import Iterable, Optional
+
+
+class LeaderboardSnapshot:
+    """
+    Read-only view over a memory-mapped leaderboard snapshot file
+
+    Layout (native byte order, every section 8 byte aligned):
+        header        magic, format version, user count, created_at
+        neg_scores    int64[count]  -total_points_earned, in leaderboard order
+        ranked_ids    int64[count]  user ids, in leaderboard order
+        sorted_ids    int64[count]  user ids, ascending
+        positions     int64[count]  leaderboard position of sorted_ids[i]
+
+    Leaderboard order is (total_points_earned desc, id asc). Arrays are sliced straight out of the
+    mapping, so every worker process shares the same page cache pages instead of holding a copy.
+    """
+    MAGIC = b'CCLB'
+    FORMAT_VERSION = 1
+    HEADER = struct.Struct('=4sIQd')
+    HEADER_SIZE = 32
+    SECTIONS = 4
+
+    def __init__(self, mapping: mmap.mmap):
+        magic, format_version, count, created_at = self.HEADER.unpack_from(mapping, 0)
+        if magic != self.MAGIC or format_version != self.FORMAT_VERSION:
+            raise ValueError("Not a leaderboard snapshot")
+        if len(mapping) != self.HEADER_SIZE + self.SECTIONS * 8 * count:
+            raise ValueError("Truncated leaderboard snapshot")
+
+        self.count = count
+        self.created_at = created_at
+        self.__mapping = mapping  # keeps the mapping alive as long as this view is referenced
+        view = memoryview(mapping)
+        sections = [
+            view[self.HEADER_SIZE + i * 8 * count:self.HEADER_SIZE + (i + 1) * 8 * count].cast('q')
+            for i in range(self.SECTIONS)
+        ]
+        self.__neg_scores, self.__ranked_ids, self.__sorted_ids, self.__positions = sections
+
+    def top(self, offset: int, limit: int) -> list[tuple[int, int]]:
+        """(user_id, total_points) for leaderboard positions [offset, offset + limit)"""
+        end = min(self.count, offset + limit)
+        return [(self.__ranked_ids[i], -self.__neg_scores[i]) for i in range(max(0, offset), end)]
+
+    def position_of(self, user_id: int) -> Optional[int]:
+        """0-based leaderboard position of a user, None if they are not in the snapshot"""
+        i = bisect_left(self.__sorted_ids, user_id)
+        if i < self.count and self.__sorted_ids[i] == user_id:
+            return self.__positions[i]
+        return None
+
+    def users_ahead_of(self, total_points: int) -> int:
+        """Number of users with strictly more points"""
+        return bisect_left(self.__neg_scores, -total_points)
+
+    @classmethod
+    def write(cls, path: str, ranking: Iterable[tuple[int, int]]) -> int:
+        """
+        Write a snapshot from (user_id, total_points) pairs already in leaderboard order
+        The file is built next to the target and renamed over it, so readers never see a partial file
+        Returns the number of users written
+        """
+        neg_scores, ranked_ids = array('q'), array('q')
+        for user_id, total_points in ranking:
+            ranked_ids.append(user_id)
+            neg_scores.append(-total_points)
+
+        order = sorted(range(len(ranked_ids)), key=ranked_ids.__getitem__)
+        sorted_ids = array('q', (ranked_ids[i] for i in order))
+        positions = array('q', order)
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.leaderboard-', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                header = cls.HEADER.pack(cls.MAGIC, cls.FORMAT_VERSION, len(ranked_ids), time.time())
+                file.write(header.ljust(cls.HEADER_SIZE, b'\0'))
+                for section in (neg_scores, ranked_ids, sorted_ids, positions):
+                    section.tofile(file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return len(ranked_ids)
+
+
+class LeaderboardSnapshotReader:
+    """
+    Hands out the newest snapshot file, remapping it whenever the refresher swaps in a new one
+    """
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, path: str, max_age_seconds: float):
+        self.__path = path
+        self.__max_age_seconds = max_age_seconds
+        self.__snapshot = None  # type: Optional[LeaderboardSnapshot]
+        self.__identity = None  # type: Optional[tuple[int, int]]
+        self.__lock = threading.Lock()
+
+    def current(self) -> Optional[LeaderboardSnapshot]:
+        """The mapped snapshot, or None if there is none or it is too old to trust"""
+        try:
+            stat = os.stat(self.__path)
+        except FileNotFoundError:
+            return None
+
+        identity = (stat.st_ino, stat.st_mtime_ns)
+        if identity != self.__identity:
+            with self.__lock:
+                if identity != self.__identity:
+                    self.__snapshot = self.__map()
+                    self.__identity = identity
+
+        snapshot = self.__snapshot
+        if snapshot is None or time.time() - snapshot.created_at > self.__max_age_seconds:
+            return None
+        return snapshot
+
+    def __map(self) -> Optional[LeaderboardSnapshot]:
+        # The previous mapping is not closed, views still in use elsewhere keep it alive until released
+        try:
+            with open(self.__path, 'rb') as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    return None
+                return LeaderboardSnapshot(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Could not map leaderboard snapshot {self.__path}: {str(e)}")
+            return None
@@ -0,0 +1,40 @@
+import time
+import threading
+from typing import Optional
+from django.conf import settings
+from django.db.models import F
+from src.models.cache_version import CacheVersion
+
+
+class SharedVersion:
+    """
+    Version of an in-process cache that every worker process agrees on, stored in a CacheVersion row
+
+    get() re-reads the row at most every settings.SHARED_VERSION_CHECK_SECONDS, so a hot path pays one
+    small query per interval and a bump reaches every process within that interval, unlike a version in
+    a per-process cache backend. bump() is a single UPDATE in the caller's transaction, so other
+    processes only see the new version once the change it describes is committed.
+    """
+
+    def __init__(self, key: str):
+        self.__key = key
+        self.__version = None  # type: Optional[int]
+        self.__checked_at = 0.0
+        self.__lock = threading.Lock()
+
+    def get(self) -> int:
+        if self.__version is None or time.monotonic() - self.__checked_at >= settings.SHARED_VERSION_CHECK_SECONDS:
+            with self.__lock:
+                if self.__version is None or time.monotonic() - self.__checked_at >= settings.SHARED_VERSION_CHECK_SECONDS:
+                    version = CacheVersion.objects.filter(key=self.__key).values_list('version', flat=True).first()
+                    if version is None:
+                        version = CacheVersion.objects.get_or_create(key=self.__key)[0].version
+                    self.__version, self.__checked_at = version, time.monotonic()
+        return self.__version
+
+    def bump(self) -> None:
+        if not CacheVersion.objects.filter(key=self.__key).update(version=F('version') + 1):
+            CacheVersion.objects.get_or_create(key=self.__key)
+            CacheVersion.objects.filter(key=self.__key).update(version=F('version') + 1)
+        # This process sees its own change on the next get()
+        self.__version = None
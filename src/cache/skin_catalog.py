@@ -0,0 +1,105 @@
+import time
+import threading
+from typing import Optional
+from dataclasses import dataclass
+from django.conf import settings
+from django.db.models import F
+from src.models.skin import Skin
+from src.models.skin_variant import SkinVariant
+from src.cache.shared_version import SharedVersion
+
+
+@dataclass(frozen=True)
+class CatalogSkin:
+    id: int
+    name: str
+    rarity: str
+    price_points: int
+    description: str
+    available: bool
+    stock: Optional[int]  # units released, None when unlimited, see Skin.stock
+    thumbnail_sizes: tuple[int, ...]  # sizes with a variant generated from the current image
+
+    @property
+    def is_limited(self) -> bool:
+        return self.stock is not None
+
+
+@dataclass(frozen=True)
+class SkinCatalogSnapshot:
+    version: int
+    loaded_at: float  # time.monotonic() of the load
+    skins: tuple[CatalogSkin, ...]  # ordered by id
+    by_id: dict[int, CatalogSkin]
+
+
+class SkinCatalog:
+    """
+    Immutable in-process copy of the skins table without image data, shared by every service
+
+    Works like ItemCatalog: saving or deleting a Skin or SkinVariant bumps its SharedVersion (see
+    SrcConfig.ready), every process reloads once it sees the bump, and snapshots older than
+    settings.CATALOG_MAX_AGE_SECONDS are reloaded regardless. Per-user views overlay the user's
+    owned skin ids on the snapshot instead of joining against skins. Remaining stock changes with every
+    purchase of a limited edition, so it is never part of the snapshot.
+    """
+    VERSION = SharedVersion('skin_catalog')
+
+    def __init__(self):
+        self.__snapshot = None  # type: Optional[SkinCatalogSnapshot]
+        self.__lock = threading.Lock()
+
+    def snapshot(self) -> SkinCatalogSnapshot:
+        version = self.VERSION.get()
+        snapshot = self.__snapshot
+        if self.__outdated(snapshot, version):
+            with self.__lock:
+                snapshot = self.__snapshot
+                if self.__outdated(snapshot, version):
+                    snapshot = self.__snapshot = self.__load(version)
+        return snapshot
+
+    def get(self, skin_id: int) -> Optional[CatalogSkin]:
+        return self.snapshot().by_id.get(skin_id)
+
+    def all(self) -> tuple[CatalogSkin, ...]:
+        return self.snapshot().skins
+
+    @classmethod
+    def invalidate(cls, *args, **kwargs) -> None:
+        """Signal receiver, makes every process reload the catalog once the change is committed"""
+        cls.VERSION.bump()
+
+    @staticmethod
+    def __outdated(snapshot: Optional[SkinCatalogSnapshot], version: int) -> bool:
+        return snapshot is None or snapshot.version != version or \
+            time.monotonic() - snapshot.loaded_at >= settings.CATALOG_MAX_AGE_SECONDS
+
+    @staticmethod
+    def __load(version: int) -> SkinCatalogSnapshot:
+        thumbnail_sizes = {}
+        for skin_id, size in SkinVariant.objects.filter(
+            format=SkinVariant.WEBP,
+            source_hash=F('skin__image_hash')
+        ).values_list('skin_id', 'size').order_by('size'):
+            thumbnail_sizes.setdefault(skin_id, []).append(size)
+
+        skins = tuple(CatalogSkin(
+            id=skin['id'],
+            name=skin['name'],
+            rarity=skin['rarity'],
+            price_points=skin['price_points'],
+            description=skin['description'],
+            available=skin['available'],
+            stock=skin['stock'],
+            thumbnail_sizes=tuple(thumbnail_sizes.get(skin['id'], ()))
+        ) for skin in Skin.objects.order_by('id').values(
+            'id', 'name', 'rarity', 'price_points', 'description', 'available', 'stock'
+        ))
+
+        return SkinCatalogSnapshot(
+            version=version,
+            loaded_at=time.monotonic(),
+            skins=skins,
+            by_id={skin.id: skin for skin in skins}
+        )
@@ -0,0 +1,19 @@
+import json
+import hashlib
+from typing import Any
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    value: Any
+    version: int
+    etag: str
+    computed_at: float  # time.monotonic() when the value was computed
+    compute_seconds: float  # how long the computation took, drives early refresh
+
+    @staticmethod
+    def etag_for(value: Any) -> str:
+        """Strong ETag derived from the serialized content"""
+        payload = json.dumps(value, sort_keys=True, default=str).encode('utf-8')
+        return f'"{hashlib.blake2b(payload, digest_size=16).hexdigest()}"'
@@ -0,0 +1,164 @@
+import math
+import time
+import random
+import logging
+import threading
+from typing import Any, Callable, Hashable, Optional
+from collections import OrderedDict
+from django.core.cache import cache
+from django.db import connections
+from src.cache.snapshot import Snapshot
+
+
+class SnapshotCache:
+    """
+    Versioned in-process cache of computed snapshots
+
+    A snapshot is fresh while its version matches the current version and it is younger than
+    `ttl_seconds`. Stale snapshots keep being served for up to `max_stale_seconds` while a
+    single background refresh recomputes them, so slow queries never pile up behind each other.
+    Fresh snapshots are refreshed slightly early with a probability that grows as they approach
+    expiry (XFetch), which spreads recomputation out instead of expiring every key at once.
+
+    At most `max_entries` snapshots are kept, the least recently used go first, and snapshots past
+    their stale window are dropped as soon as anything new is stored, so keys derived from request
+    parameters can't grow the cache without bound.
+    """
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+            self,
+            namespace: str,
+            ttl_seconds: float,
+            max_stale_seconds: float,
+            beta: float = 1.0,
+            max_entries: int = 1000
+    ):
+        """
+        :param namespace: Prefix for the shared version counter
+        :param ttl_seconds: Fixed refresh interval, even if the version never changes
+        :param max_stale_seconds: How long past expiry a snapshot may still be served while refreshing
+        :param beta: Early refresh aggressiveness, values > 1 favour refreshing earlier
+        :param max_entries: Snapshots kept at most, least recently used are evicted first
+        """
+        self.__version_key = f"{namespace}:version"
+        self.__ttl_seconds = ttl_seconds
+        self.__max_stale_seconds = max_stale_seconds
+        self.__beta = beta
+        self.__max_entries = max_entries
+        self.__entries = OrderedDict()  # type: OrderedDict[Hashable, Snapshot], least recently used first
+        self.__locks = {}  # type: dict[Hashable, threading.Lock]
+        self.__locks_guard = threading.Lock()  # guards both __entries and __locks
+
+    def version(self) -> int:
+        """Current version, shared through the Django cache backend"""
+        return cache.get_or_set(self.__version_key, 1, timeout=None)
+
+    def bump_version(self) -> None:
+        """Mark every snapshot as outdated, called whenever the underlying data changes"""
+        try:
+            cache.incr(self.__version_key)
+        except ValueError:
+            # Key was evicted or never set, restart from a value no snapshot can have
+            cache.set(self.__version_key, int(time.time()), timeout=None)
+
+    def get(self, key: Hashable, compute: Callable[[], Any]) -> Snapshot:
+        """Return the snapshot for key, computing it at most once concurrently"""
+        version = self.version()
+        entry = self.__lookup(key)
+        now = time.monotonic()
+
+        if entry is not None and self.__is_fresh(entry, version, now):
+            return entry
+
+        if entry is not None and now - entry.computed_at <= self.__ttl_seconds + self.__max_stale_seconds:
+            # Serve stale while one background thread revalidates
+            lock = self.__lock_for(key)
+            if lock.acquire(blocking=False):
+                threading.Thread(
+                    target=self.__refresh_in_background,
+                    args=(key, compute, version, lock),
+                    daemon=True
+                ).start()
+            return entry
+
+        # Nothing servable, compute synchronously but only once for concurrent callers
+        lock = self.__lock_for(key)
+        with lock:
+            entry = self.__lookup(key)
+            if entry is not None and entry.version == version \
+                    and time.monotonic() - entry.computed_at < self.__ttl_seconds:
+                return entry
+            return self.__compute(key, compute, version)
+
+    def build(self, compute: Callable[[], Any]) -> Snapshot:
+        """Compute a snapshot without caching it, for values too varied to be worth keeping"""
+        return self.__snapshot_of(compute, self.version())
+
+    def __is_fresh(self, entry: Snapshot, version: int, now: float) -> bool:
+        if entry.version != version:
+            return False
+        expires_at = entry.computed_at + self.__ttl_seconds
+        # XFetch: -log(U) is exponentially distributed, so early refreshes cluster just before expiry
+        early_by = entry.compute_seconds * self.__beta * -math.log(1.0 - random.random())
+        return now + early_by < expires_at
+
+    def __lock_for(self, key: Hashable) -> threading.Lock:
+        with self.__locks_guard:
+            return self.__locks.setdefault(key, threading.Lock())
+
+    def __lookup(self, key: Hashable) -> Optional[Snapshot]:
+        with self.__locks_guard:
+            entry = self.__entries.get(key)
+            if entry is not None:
+                self.__entries.move_to_end(key)
+            return entry
+
+    def __compute(self, key: Hashable, compute: Callable[[], Any], version: int) -> Snapshot:
+        snapshot = self.__snapshot_of(compute, version)
+        with self.__locks_guard:
+            self.__entries[key] = snapshot
+            self.__entries.move_to_end(key)
+            self.__evict(time.monotonic())
+        return snapshot
+
+    def __evict(self, now: float) -> None:
+        """Drop snapshots too old to be served, then the least recently used beyond max_entries"""
+        expired = [
+            key for key, entry in self.__entries.items()
+            if now - entry.computed_at > self.__ttl_seconds + self.__max_stale_seconds
+        ]
+        for key in expired:
+            self.__forget(key)
+        while len(self.__entries) > self.__max_entries:
+            self.__forget(next(iter(self.__entries)))
+
+    def __forget(self, key: Hashable) -> None:
+        del self.__entries[key]
+        # A lock still held by a computation stays referenced by it, a later get() just makes a new one
+        self.__locks.pop(key, None)
+
+    @staticmethod
+    def __snapshot_of(compute: Callable[[], Any], version: int) -> Snapshot:
+        started_at = time.monotonic()
+        value = compute()
+        finished_at = time.monotonic()
+        return Snapshot(
+            value=value,
+            version=version,
+            etag=Snapshot.etag_for(value),
+            computed_at=finished_at,
+            compute_seconds=finished_at - started_at
+        )
+
+    def __refresh_in_background(
+            self, key: Hashable, compute: Callable[[], Any], version: int, lock: threading.Lock
+    ) -> None:
+        try:
+            self.__compute(key, compute, version)
+        except Exception as e:
+            self.logger.error(f"Snapshot refresh failed for {key}: {str(e)}")
+        finally:
+            lock.release()
+            # Connections are per thread, this one will never be reused
+            connections.close_all()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
 from src.util.env import Env
 from datetime import timedelta
@@ -55,6 +56,7 @@ MIDDLEWARE = [
 
 CORS_ORIGIN_ALLOW_ALL = True
 CORS_ALLOW_ALL_ORIGINS = True
+CORS_EXPOSE_HEADERS = ['ETag', 'X-Next-Cursor']
 
 ROOT_URLCONF = 'src.cybercyclones.urls'
 
@@ -75,6 +77,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'src.cybercyclones.wsgi.application'
+ASGI_APPLICATION = 'src.cybercyclones.asgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
@@ -90,6 +93,88 @@ DATABASES = {
     }
 }
 
+# Per-process cache by default, point this at a shared backend so workers share snapshot versions
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Versions of the in-process catalogs live in the database, each process re-reads one at most every CHECK_SECONDS,
+# and reloads a catalog at least every MAX_AGE_SECONDS even when it saw no change
+SHARED_VERSION_CHECK_SECONDS = float(Env()['SHARED_VERSION_CHECK_SECONDS'] or 2)
+CATALOG_MAX_AGE_SECONDS = float(Env()['CATALOG_MAX_AGE_SECONDS'] or 300)
+
+# Leaderboard snapshots are recomputed at least every TTL and served stale for at most MAX_STALE
+# past expiry while a refresh is running, each process keeps at most MAX_ENTRIES of them
+LEADERBOARD_SNAPSHOT_TTL_SECONDS = float(Env()['LEADERBOARD_SNAPSHOT_TTL_SECONDS'] or 30)
+LEADERBOARD_SNAPSHOT_MAX_STALE_SECONDS = float(Env()['LEADERBOARD_SNAPSHOT_MAX_STALE_SECONDS'] or 120)
+LEADERBOARD_SNAPSHOT_MAX_ENTRIES = int(Env()['LEADERBOARD_SNAPSHOT_MAX_ENTRIES'] or 1000)
+# Hard upper bound on the `limit` of a leaderboard page, larger requests are clamped
+LEADERBOARD_MAX_PAGE_SIZE = int(Env()['LEADERBOARD_MAX_PAGE_SIZE'] or 100)
+# Memory-mapped global ranking shared by all worker processes, written by the refresh_leaderboard_snapshot
+# command and ignored once older than MAX_AGE (the database is queried instead)
+LEADERBOARD_SHARED_SNAPSHOT_PATH = Env()['LEADERBOARD_SHARED_SNAPSHOT_PATH'] or str(
+    Path(tempfile.gettempdir()) / 'cybercyclones' / 'leaderboard.snapshot'
+)
+LEADERBOARD_SHARED_SNAPSHOT_MAX_AGE_SECONDS = float(Env()['LEADERBOARD_SHARED_SNAPSHOT_MAX_AGE_SECONDS'] or 300)
+# Hard upper bound on the `limit` of a discovery history page
+DISCOVERY_HISTORY_MAX_PAGE_SIZE = int(Env()['DISCOVERY_HISTORY_MAX_PAGE_SIZE'] or 100)
+# Discoveries older than this many days are moved out of user_discoveries by the compact_discoveries command,
+# must stay above the 7 day windows (weekly leaderboard, recent discoveries) that only read recent rows
+DISCOVERY_HOT_RETENTION_DAYS = int(Env()['DISCOVERY_HOT_RETENTION_DAYS'] or 90)
+# Rows each points histogram bucket is split across, more shards means less lock contention on crowded buckets
+POINTS_HISTOGRAM_SHARDS = int(Env()['POINTS_HISTOGRAM_SHARDS'] or 8)
+# Counter rows per item for discovery counts, more shards means less lock contention on popular items
+POPULARITY_COUNTER_SHARDS = int(Env()['POPULARITY_COUNTER_SHARDS'] or 8)
+# A discovery's weight in the trending score halves every TRENDING_HALF_LIFE_HOURS
+TRENDING_HALF_LIFE_HOURS = float(Env()['TRENDING_HALF_LIFE_HOURS'] or 6)
+# Scan analytics sketches: labels are counted in buckets of BUCKET_SECONDS kept for RETENTION_HOURS, unique scanners
+# per UTC day kept for RETENTION_DAYS, each worker writes its sketches at most every FLUSH_SECONDS
+ANALYTICS_LABEL_BUCKET_SECONDS = int(Env()['ANALYTICS_LABEL_BUCKET_SECONDS'] or 300)
+ANALYTICS_LABEL_RETENTION_HOURS = int(Env()['ANALYTICS_LABEL_RETENTION_HOURS'] or 24)
+ANALYTICS_SCANNER_RETENTION_DAYS = int(Env()['ANALYTICS_SCANNER_RETENTION_DAYS'] or 30)
+ANALYTICS_FLUSH_SECONDS = float(Env()['ANALYTICS_FLUSH_SECONDS'] or 10)
+# Counter rows the stock of a limited-edition skin is split across, more shards let more buyers claim at once
+SKIN_STOCK_SHARDS = int(Env()['SKIN_STOCK_SHARDS'] or 16)
+# Content-addressed storage for skin images, 'local' keeps them as files under BLOB_STORE_ROOT
+BLOB_STORE_BACKEND = Env()['BLOB_STORE_BACKEND'] or 'local'
+BLOB_STORE_ROOT = Env()['BLOB_STORE_ROOT'] or str(BASE_DIR.parent / 'data' / 'blobs')
+# How long clients may reuse a skin image or thumbnail before revalidating it with its ETag
+SKIN_ASSET_MAX_AGE_SECONDS = int(Env()['SKIN_ASSET_MAX_AGE_SECONDS'] or 3600)
+# Internal location of the front proxy that serves BLOB_STORE_ROOT (nginx: `internal; alias <root>/;`), skin assets
+# are then answered with an X-Accel-Redirect there and sent by the proxy. Empty streams them through the app instead
+SKIN_ASSET_ACCEL_REDIRECT_PREFIX = Env()['SKIN_ASSET_ACCEL_REDIRECT_PREFIX'] or ''
+# Longest sides in pixels of the WebP variants generated for every skin image, by a pool of SKIN_ASSET_WORKERS threads
+SKIN_VARIANT_SIZES = [int(size) for size in (Env()['SKIN_VARIANT_SIZES'] or '64,128,256').split(',')]
+SKIN_ASSET_WORKERS = int(Env()['SKIN_ASSET_WORKERS'] or 2)
+# Outbox events are delivered by a pool of EVENT_BUS_WORKERS threads per process, a dispatcher holds an event for
+# LEASE_SECONDS before another may retry it, failed deliveries back off exponentially up to MAX_BACKOFF_SECONDS
+EVENT_BUS_WORKERS = int(Env()['EVENT_BUS_WORKERS'] or 2)
+EVENT_BUS_LEASE_SECONDS = float(Env()['EVENT_BUS_LEASE_SECONDS'] or 60)
+EVENT_BUS_MAX_BACKOFF_SECONDS = float(Env()['EVENT_BUS_MAX_BACKOFF_SECONDS'] or 3600)
+# Non-critical writes run on WORKERS background threads per process, at most MAX_PENDING may wait (callers run
+# theirs inline beyond that), waiting ones are run on shutdown for up to DRAIN_TIMEOUT_SECONDS
+BACKGROUND_TASK_WORKERS = int(Env()['BACKGROUND_TASK_WORKERS'] or 2)
+BACKGROUND_TASK_MAX_PENDING = int(Env()['BACKGROUND_TASK_MAX_PENDING'] or 10000)
+BACKGROUND_TASK_DRAIN_TIMEOUT_SECONDS = float(Env()['BACKGROUND_TASK_DRAIN_TIMEOUT_SECONDS'] or 10)
+# Logins by one user within this many seconds update last_login_at once
+LAST_LOGIN_COALESCE_SECONDS = float(Env()['LAST_LOGIN_COALESCE_SECONDS'] or 5)
+# Delivered events are deleted by the dispatch_events command once older than this many days
+EVENT_RETENTION_DAYS = int(Env()['EVENT_RETENTION_DAYS'] or 7)
+# Live leaderboard stream: changes are pushed at most once per INTERVAL, the top-K is rebuilt at least every
+# REFRESH even without a version bump, idle connections get a comment every HEARTBEAT. The version lives in CACHES,
+# with the per-process LocMemCache other workers' awards only show up on the REFRESH rebuild
+LEADERBOARD_STREAM_INTERVAL_SECONDS = float(Env()['LEADERBOARD_STREAM_INTERVAL_SECONDS'] or 2)
+LEADERBOARD_STREAM_REFRESH_SECONDS = float(Env()['LEADERBOARD_STREAM_REFRESH_SECONDS'] or 30)
+LEADERBOARD_STREAM_HEARTBEAT_SECONDS = float(Env()['LEADERBOARD_STREAM_HEARTBEAT_SECONDS'] or 15)
+LEADERBOARD_STREAM_TOP_K = int(Env()['LEADERBOARD_STREAM_TOP_K'] or 10)
+# Open a season for each calendar month automatically when no season covers the current date
+SEASONS_AUTO_MONTHLY = (Env()['SEASONS_AUTO_MONTHLY'] or 'TRUE') == 'TRUE'
+# Users estimated to have at most this many users ahead of them also get an exact leaderboard position,
+# everyone else only gets an approximate percentile
+EXACT_LEADERBOARD_POSITION_LIMIT = int(Env()['EXACT_LEADERBOARD_POSITION_LIMIT'] or 1000)
+
 # 10MB in bytes
 DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10485760
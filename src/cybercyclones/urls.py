@@ -2,15 +2,18 @@ from django.contrib import admin
 from django.http import HttpResponse
 from django.urls import path, include
 from rest_framework import routers
+from src.rest.analytics_controller import AnalyticsController
 from src.rest.auth_controller import AuthController
 from src.rest.discovery_controller import DiscoveryController
 from src.rest.leaderboard_controller import LeaderboardController
+from src.rest.leaderboard_stream_controller import LeaderboardStreamController
 from src.rest.points_controller import PointsController
 from src.rest.skin_controller import SkinController
 from src.rest.user_controller import UserController
 
 router = routers.DefaultRouter()
 
+router.register(r'analytics', AnalyticsController, basename='analytics')
 router.register(r'auth', AuthController, basename='auth')
 router.register(r'discoveries', DiscoveryController, basename='discoveries')
 router.register(r'leaderboard', LeaderboardController, basename='leaderboard')
@@ -47,5 +50,6 @@ urlpatterns = [
     path('', root_view, name='root'),
     path('admin/', admin.site.urls),
     path('health/', health_check, name='health-check'),
+    path('api/v1/leaderboard/stream/', LeaderboardStreamController.as_view(), name='leaderboard-stream'),
     path('api/v1/', include(router.urls))
 ]
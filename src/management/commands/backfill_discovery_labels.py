@@ -0,0 +1,35 @@
+from django.db import transaction
+from django.db.models import Max, Min, OuterRef, Subquery
+from django.core.management.base import BaseCommand
+from src.models.items import Item
+from src.models.user_discoveries import UserDiscovery
+
+
+class Command(BaseCommand):
+    help = "Copy item category and rarity onto user_discoveries rows that don't have them yet, in id-range batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Rows per transaction")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        missing = UserDiscovery.objects.filter(category__isnull=True) | UserDiscovery.objects.filter(rarity__isnull=True)
+        bounds = missing.aggregate(first=Min('id'), last=Max('id'))
+        if bounds['first'] is None:
+            self.stdout.write(self.style.SUCCESS("Every discovery already has its item labels"))
+            return
+
+        item = Item.objects.filter(id=OuterRef('item_id'))
+        updated = 0
+        for start in range(bounds['first'], bounds['last'] + 1, batch_size):
+            with transaction.atomic():
+                updated += missing.filter(
+                    id__gte=start,
+                    id__lt=start + batch_size
+                ).update(
+                    category=Subquery(item.values('category')[:1]),
+                    rarity=Subquery(item.values('rarity')[:1])
+                )
+            self.stdout.write(f"Backfilled {updated} discoveries (up to id {start + batch_size - 1})")
+
+        self.stdout.write(self.style.SUCCESS(f"Backfilled item labels on {updated} discoveries"))
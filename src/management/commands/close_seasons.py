@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from src.service_module import ServiceModule
+
+
+class Command(BaseCommand):
+    help = "Freeze the final standings of every season that has ended"
+
+    def handle(self, *args, **options):
+        closed = ServiceModule().season_service.close_ended_seasons()
+        for name, users in closed:
+            self.stdout.write(f"Archived season {name} with {users} ranked users")
+        self.stdout.write(self.style.SUCCESS(f"Closed {len(closed)} season(s)"))
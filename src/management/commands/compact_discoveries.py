@@ -0,0 +1,37 @@
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.core.management.base import BaseCommand, CommandError
+from src.service_module import ServiceModule
+
+
+class Command(BaseCommand):
+    help = "Move discoveries older than DISCOVERY_HOT_RETENTION_DAYS into the archive and per-day rollups"
+
+    MIN_RETENTION_DAYS = 8
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Discoveries moved per transaction")
+        parser.add_argument(
+            '--rebuild-rollups',
+            action='store_true',
+            help="Recompute all rollups from the archive afterwards, e.g. after items were recategorised"
+        )
+
+    def handle(self, *args, **options):
+        retention_days = settings.DISCOVERY_HOT_RETENTION_DAYS
+        if retention_days < self.MIN_RETENTION_DAYS:
+            raise CommandError(f"DISCOVERY_HOT_RETENTION_DAYS must be at least {self.MIN_RETENTION_DAYS}")
+
+        discovery_repository = ServiceModule().discovery_repository
+        before = timezone.now() - timedelta(days=retention_days)
+
+        archived = 0
+        while moved := discovery_repository.archive_batch(before, options['batch_size']):
+            archived += moved
+            self.stdout.write(f"Archived {archived} discoveries")
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} discoveries made before {before:%Y-%m-%d %H:%M}"))
+
+        if options['rebuild_rollups']:
+            rollups = discovery_repository.rebuild_rollups()
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {rollups} rollups"))
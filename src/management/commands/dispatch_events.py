@@ -0,0 +1,36 @@
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+from src.service_module import ServiceModule
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver outbox events that weren't delivered right after their commit (crashed process, failed handler) "
+        "and delete delivered events older than EVENT_RETENTION_DAYS"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help="Keep dispatching every INTERVAL seconds instead of exiting once nothing is due"
+        )
+        parser.add_argument('--batch-size', type=int, default=500, help="Events claimed per round")
+
+    def handle(self, *args, **options):
+        event_bus = ServiceModule().event_bus
+
+        while True:
+            delivered = 0
+            while completed := event_bus.dispatch_due(options['batch_size']):
+                delivered += completed
+            pruned = event_bus.prune(timezone.now() - timedelta(days=settings.EVENT_RETENTION_DAYS))
+            self.stdout.write(f"Delivered {delivered} events, deleted {pruned} delivered events")
+
+            if options['interval'] <= 0:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from src.models.skin import Skin
+from src.service_module import ServiceModule
+
+
+class Command(BaseCommand):
+    help = "Generate the resized WebP variants of every skin whose variants are missing or outdated"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skin', type=int, help="Only this skin")
+
+    def handle(self, *args, **options):
+        pipeline = ServiceModule().skin_asset_pipeline
+        skins = Skin.objects.exclude(image_hash=None).order_by('id')
+        if options['skin'] is not None:
+            skins = skins.filter(id=options['skin'])
+
+        generated = 0
+        for skin_id in skins.values_list('id', flat=True).iterator():
+            # Synchronously, so the command finishes only once every variant exists
+            generated += pipeline.generate(skin_id)
+
+        self.stdout.write(self.style.SUCCESS(f"Generated {generated} variants at {pipeline.sizes} px"))
@@ -0,0 +1,92 @@
+import sys
+import time
+from datetime import datetime
+from django.utils import timezone
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+from src.models.user import User
+from src.service_module import ServiceModule
+
+
+class Command(BaseCommand):
+    help = (
+        "Give a skin to a list of users or every active user matching a filter, in batches ordered by user id. "
+        "Users who already own it are skipped, so an interrupted grant can be rerun as is "
+        "or resumed with --after-user-id from the last reported id"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('skin_id', type=int)
+        users = parser.add_mutually_exclusive_group(required=True)
+        users.add_argument('--users-file', help="File with one user id per line, - for stdin")
+        users.add_argument('--all-active', action='store_true', help="Every active user, narrowed by the filters below")
+        parser.add_argument('--joined-before', type=datetime.fromisoformat, help="With --all-active, ISO date or datetime")
+        parser.add_argument('--active-since', type=datetime.fromisoformat, help="With --all-active, last login on or after")
+        parser.add_argument('--min-points', type=int, help="With --all-active, minimum total points earned")
+        parser.add_argument('--reason', default='SPECIAL_EVENT', help="Acquisition type recorded on the grants")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Users granted per transaction")
+        parser.add_argument('--after-user-id', type=int, default=0, help="Resume after this user id")
+
+    def handle(self, *args, **options):
+        skin_service = ServiceModule().skin_service
+        totals = {"granted": 0, "already_owned": 0, "unknown_users": 0}
+        started = time.monotonic()
+
+        for batch in self.__batches(options):
+            try:
+                result = skin_service.grant_skin_in_bulk(options['skin_id'], batch, options['reason'])
+            except ValidationError as e:
+                raise CommandError(str(e))
+            for key in totals:
+                totals[key] += result[key]
+            self.stdout.write(
+                f"Up to user {batch[-1]}: {totals['granted']} granted, {totals['already_owned']} already owned, "
+                f"{totals['unknown_users']} unknown"
+            )
+
+        elapsed = time.monotonic() - started
+        processed = sum(totals.values())
+        self.stdout.write(self.style.SUCCESS(
+            f"Granted skin {options['skin_id']} to {totals['granted']} users, {totals['already_owned']} already owned it "
+            f"and {totals['unknown_users']} don't exist ({processed / elapsed if elapsed else 0:.0f} users/s)"
+        ))
+
+    def __batches(self, options):
+        """Lists of up to --batch-size user ids, ascending and after --after-user-id"""
+        batch_size, after = options['batch_size'], options['after_user_id']
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        if options['users_file']:
+            user_ids = sorted(user_id for user_id in self.__read_user_ids(options['users_file']) if user_id > after)
+            for start in range(0, len(user_ids), batch_size):
+                yield user_ids[start:start + batch_size]
+            return
+
+        users = User.objects.filter(is_active=True)
+        if options['joined_before']:
+            users = users.filter(created_at__lt=self.__aware(options['joined_before']))
+        if options['active_since']:
+            users = users.filter(last_login_at__gte=self.__aware(options['active_since']))
+        if options['min_points'] is not None:
+            users = users.filter(total_points_earned__gte=options['min_points'])
+
+        # Keyset pagination, so batches stay cheap however far the grant has got
+        while batch := list(users.filter(id__gt=after).order_by('id').values_list('id', flat=True)[:batch_size]):
+            yield batch
+            after = batch[-1]
+
+    @staticmethod
+    def __read_user_ids(path: str) -> set[int]:
+        file = sys.stdin if path == '-' else open(path)
+        try:
+            return {int(line) for line in file if line.strip()}
+        except ValueError as e:
+            raise CommandError(f"Invalid user id in {path}: {e}")
+        finally:
+            if file is not sys.stdin:
+                file.close()
+
+    @staticmethod
+    def __aware(at: datetime) -> datetime:
+        return timezone.make_aware(at) if timezone.is_naive(at) else at
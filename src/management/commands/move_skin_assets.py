@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+from src.models.skin import Skin
+
+
+class Command(BaseCommand):
+    help = "Move skin images and thumbnails still stored in the skins table into the blob store, in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=20, help="Skins loaded into memory at a time")
+
+    def handle(self, *args, **options):
+        moved, last_id = 0, 0
+        while True:
+            with transaction.atomic():
+                batch = list(Skin.objects.with_assets().filter(
+                    id__gt=last_id
+                ).exclude(
+                    image=b'', thumbnail=b''
+                ).order_by('id').only(
+                    'id', *Skin.ASSET_FIELDS, *(f'{field}_hash' for field in Skin.ASSET_FIELDS)
+                )[:options['batch_size']])
+                if not batch:
+                    break
+                for skin in batch:
+                    # save() writes each non-empty asset to the blob store and leaves its key behind
+                    skin.save(update_fields=[*Skin.ASSET_FIELDS, *(f'{field}_hash' for field in Skin.ASSET_FIELDS)])
+            moved += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f"Moved assets of {moved} skins")
+
+        self.stdout.write(self.style.SUCCESS(f"Moved assets of {moved} skins into the blob store"))
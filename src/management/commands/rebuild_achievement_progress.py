@@ -0,0 +1,37 @@
+from django.db import transaction
+from django.core.management.base import BaseCommand
+from src.models.user import User
+from src.service_module import ServiceModule
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every user's achievement counters from their discovery history and grant what they completed, "
+        "run after adding an achievement so discoveries made before it count"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, help="Only this user")
+
+    def handle(self, *args, **options):
+        services = ServiceModule()
+        users = User.objects.order_by('id')
+        if options['user'] is not None:
+            users = users.filter(id=options['user'])
+
+        rebuilt = completed = 0
+        for user_id in users.values_list('id', flat=True).iterator():
+            with transaction.atomic():
+                # Locked like a discovery would, so none can advance the counters halfway through
+                if services.user_repository.find_by_id_for_update(user_id) is None:
+                    continue
+                completed += len(services.achievement_engine.rebuild_progress(
+                    user_id,
+                    services.discovery_repository.totals_by_category_and_rarity(user_id),
+                    services.discovery_repository.discovery_days(user_id)
+                ))
+            rebuilt += 1
+            if rebuilt % 1000 == 0:
+                self.stdout.write(f"Rebuilt progress of {rebuilt} users")
+
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt progress of {rebuilt} users, {completed} achievements completed"))
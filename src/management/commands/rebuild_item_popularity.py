@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from src.service_module import ServiceModule
+
+
+class Command(BaseCommand):
+    help = "Recompute the per-item popularity and trending counters from user_discoveries"
+
+    def handle(self, *args, **options):
+        items = ServiceModule().popularity_service.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt popularity counters for {items} items"))
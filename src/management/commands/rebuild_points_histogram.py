@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from src.models.points_histogram_bucket import PointsHistogramBucket
+
+
+class Command(BaseCommand):
+    help = "Recompute the points histogram behind percentile ranks from the users table"
+
+    def handle(self, *args, **options):
+        users = PointsHistogramBucket.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt points histogram from {users} users"))
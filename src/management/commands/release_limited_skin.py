@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+from src.service_module import ServiceModule
+
+
+class Command(BaseCommand):
+    help = "Make a skin a limited edition with the given number of units left for sale"
+
+    def add_arguments(self, parser):
+        parser.add_argument('skin_id', type=int)
+        parser.add_argument('quantity', type=int)
+
+    def handle(self, *args, **options):
+        try:
+            release = ServiceModule().skin_service.release_limited_edition(options['skin_id'], options['quantity'])
+        except ValidationError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Skin {release['skin_id']} now has {release['remaining_stock']} units for sale"))
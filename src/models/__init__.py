@@ -3,5 +3,23 @@ from .items import Item
 from .skin import Skin
 from .user_discoveries import UserDiscovery
 from .user_skins import UserSkin
+from .points_histogram_bucket import PointsHistogramBucket
+from .season import Season
+from .season_score import SeasonScore
+from .season_standing import SeasonStanding
+from .item_popularity_counter import ItemPopularityCounter
+from .scan_sketch import ScanSketch
+from .archived_discovery import ArchivedDiscovery
+from .discovery_rollup import DiscoveryRollup
+from .skin_stock import SkinStock
+from .skin_variant import SkinVariant
+from .achievement import Achievement
+from .achievement_progress import AchievementProgress
+from .outbox_event import OutboxEvent
+from .outbox_delivery import OutboxDelivery
+from .cache_version import CacheVersion
 
-__all__ = ['User', 'Item', 'Skin', 'UserDiscovery', 'UserSkin']
\ No newline at end of file
+__all__ = ['User', 'Item', 'Skin', 'UserDiscovery', 'UserSkin', 'PointsHistogramBucket', 'Season', 'SeasonScore',
+           'SeasonStanding', 'ItemPopularityCounter', 'ScanSketch', 'ArchivedDiscovery', 'DiscoveryRollup',
+           'SkinStock', 'SkinVariant', 'Achievement', 'AchievementProgress',
+           'OutboxEvent', 'OutboxDelivery', 'CacheVersion']
\ No newline at end of file
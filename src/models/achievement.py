@@ -0,0 +1,37 @@
+from django.db import models
+from django.core.validators import MinValueValidator
+
+
+class Achievement(models.Model):
+    """
+    A rule over a user's discoveries, rewarded with a skin once met, evaluated by AchievementEngine
+
+    DISCOVERIES: at least `threshold` discoveries of items matching category and rarity ("10 plastic items")
+    COLLECTION: every item matching category and rarity in the catalog ("all EPIC items")
+    STREAK: discoveries of any item on `threshold` consecutive days ("7-day streak")
+    """
+    DISCOVERIES = 'DISCOVERIES'
+    COLLECTION = 'COLLECTION'
+    STREAK = 'STREAK'
+    KIND_CHOICES = [
+        (DISCOVERIES, 'Discoveries'),
+        (COLLECTION, 'Collection'),
+        (STREAK, 'Streak')
+    ]
+
+    code = models.SlugField(max_length=50, unique=True)
+    name = models.CharField(max_length=100)
+    description = models.TextField(blank=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # Only discoveries of items in this category / of this rarity count, None for any, ignored by STREAK
+    category = models.CharField(max_length=20, null=True, blank=True)
+    rarity = models.CharField(max_length=20, null=True, blank=True)
+    threshold = models.IntegerField(null=True, blank=True, validators=[MinValueValidator(1)])  # unused by COLLECTION
+    reward_skin = models.ForeignKey('Skin', null=True, blank=True, on_delete=models.SET_NULL)
+    active = models.BooleanField(default=True)
+
+    class Meta:
+        db_table = 'achievements'
+
+    def __str__(self):
+        return f"{self.name} ({self.kind})"
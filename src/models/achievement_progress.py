@@ -0,0 +1,22 @@
+from django.db import models
+from django.core.validators import MinValueValidator
+
+
+class AchievementProgress(models.Model):
+    """
+    A user's running counter towards one achievement, advanced by each matching discovery
+    For DISCOVERIES and COLLECTION `value` counts matching discoveries, for STREAK it is the length
+    of the streak ending on `last_day`
+    """
+    user = models.ForeignKey('User', on_delete=models.CASCADE)
+    achievement = models.ForeignKey('Achievement', on_delete=models.CASCADE)
+    value = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    last_day = models.DateField(null=True)  # local date of the latest counted discovery, for streaks
+    completed_at = models.DateTimeField(null=True)
+
+    class Meta:
+        db_table = 'achievement_progress'
+        unique_together = ['user', 'achievement']
+
+    def __str__(self):
+        return f"{self.user_id} at {self.value} towards {self.achievement_id}"
@@ -0,0 +1,25 @@
+from django.db import models
+from django.core.validators import MinValueValidator
+
+
+class ArchivedDiscovery(models.Model):
+    """
+    A user_discoveries row older than DISCOVERY_HOT_RETENTION_DAYS, moved here by compact_discoveries
+    with its id unchanged, its totals live on in DiscoveryRollup
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey('User', on_delete=models.CASCADE)
+    item = models.ForeignKey('Item', on_delete=models.CASCADE)
+    discovered_at = models.DateTimeField()
+    points_awarded = models.IntegerField(validators=[MinValueValidator(0)])
+    category = models.CharField(max_length=20)
+    rarity = models.CharField(max_length=20)
+
+    class Meta:
+        db_table = 'archived_discoveries'
+        indexes = [
+            models.Index(fields=['user', '-discovered_at', '-id']),  # For paging a user's history
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} discovered {self.item_id} (archived)"
@@ -0,0 +1,16 @@
+from django.db import models
+
+
+class CacheVersion(models.Model):
+    """
+    Version counter of an in-process cache, bumped whenever what it caches changes, see SharedVersion
+    Kept in the database so every worker process sees the same value whatever cache backend is configured
+    """
+    key = models.CharField(max_length=100, unique=True)
+    version = models.BigIntegerField(default=1)
+
+    class Meta:
+        db_table = 'cache_versions'
+
+    def __str__(self):
+        return f"{self.key} v{self.version}"
@@ -0,0 +1,23 @@
+from django.db import models
+from django.core.validators import MinValueValidator
+
+
+class DiscoveryRollup(models.Model):
+    """Totals of a user's archived discoveries for one UTC day, item category and rarity"""
+    user = models.ForeignKey('User', on_delete=models.CASCADE)
+    day = models.DateField()
+    category = models.CharField(max_length=20)
+    rarity = models.CharField(max_length=20)
+    discoveries = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    points = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    decomposition_time = models.BigIntegerField(default=0, validators=[MinValueValidator(0)])  # in days
+
+    class Meta:
+        db_table = 'discovery_rollups'
+        unique_together = ['user', 'day', 'category', 'rarity']
+        indexes = [
+            models.Index(fields=['category', 'user', 'points']),  # For category leaderboards
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} on {self.day}: {self.discoveries} {self.rarity} {self.category}"
@@ -0,0 +1,22 @@
+from django.db import models
+from django.core.validators import MinValueValidator
+
+
+class ItemPopularityCounter(models.Model):
+    """
+    One of several counter rows per item, a discovery bumps a random shard so popular items
+    don't serialize every award on a single row lock
+    """
+    item = models.ForeignKey('Item', on_delete=models.CASCADE)
+    shard = models.SmallIntegerField(validators=[MinValueValidator(0)])
+    discoveries = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    # Sum of exp(decay * (discovered_at - epoch start)) over this shard's discoveries in trending_epoch
+    trending = models.FloatField(default=0)
+    trending_epoch = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'item_popularity_counters'
+        unique_together = ['item', 'shard']
+
+    def __str__(self):
+        return f"{self.item_id}#{self.shard}: {self.discoveries} discoveries"
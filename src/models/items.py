@@ -39,6 +39,25 @@ class Item(models.Model):
             models.Index(fields=['rarity']),
         ]
 
+    @property
+    def award_points(self) -> int:
+        """Points for discovering this item, based on its value, rarity and threat level"""
+        # Base points from item's point_value
+        points = self.point_value
+
+        # Multiply based on rarity
+        rarity_multipliers = {
+            'COMMON': 1,
+            'UNCOMMON': 1.5,
+            'RARE': 2,
+            'EPIC': 3
+        }
+        points *= rarity_multipliers[self.rarity]
+        # Add bonus for threat level (more threatening items = more points)
+        points += (self.threat_level - 1) * 10
+
+        return int(points)  # Round down to nearest integer
+
     def __str__(self):
         return f"{self.name} ({self.category})"
     
\ No newline at end of file
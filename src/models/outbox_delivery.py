@@ -0,0 +1,19 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxDelivery(models.Model):
+    """
+    Idempotency record of one handler having processed one event, committed together with
+    the handler's own writes, so a redelivered event skips the handlers it already reached
+    """
+    event = models.ForeignKey('OutboxEvent', on_delete=models.CASCADE)
+    handler = models.CharField(max_length=100)
+    delivered_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'outbox_deliveries'
+        unique_together = ['event', 'handler']
+
+    def __str__(self):
+        return f"{self.event_id} delivered to {self.handler}"
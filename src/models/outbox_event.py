@@ -0,0 +1,29 @@
+from django.db import models
+from django.utils import timezone
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class OutboxEvent(models.Model):
+    """
+    Something that happened, written in the same transaction as the change it describes and
+    delivered to the EventBus handlers of its topic afterwards, at least once each
+    """
+    DISCOVERY_RECORDED = 'discovery.recorded'
+
+    topic = models.CharField(max_length=100)
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    created_at = models.DateTimeField(default=timezone.now)
+    available_at = models.DateTimeField(default=timezone.now)  # pushed back after a failed delivery
+    lease_until = models.DateTimeField(null=True)  # claimed by a dispatcher until then
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    processed_at = models.DateTimeField(null=True)  # every handler has it
+
+    class Meta:
+        db_table = 'outbox_events'
+        indexes = [
+            models.Index(fields=['processed_at', 'available_at']),  # For finding due events
+        ]
+
+    def __str__(self):
+        return f"{self.topic} #{self.id}"
@@ -0,0 +1,100 @@
+import random
+from bisect import bisect_right
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F, Sum, Count
+from django.core.validators import MinValueValidator
+
+
+def _bucket_lower_bounds() -> list[int]:
+    # Bucket 0 is exactly zero points, then 10 point wide buckets up to 1000,
+    # then buckets growing by 5% so the long tail of high scores stays a few hundred rows
+    bounds = [0] + list(range(1, 1002, 10))
+    while bounds[-1] < 10 ** 9:
+        bounds.append(max(bounds[-1] + 10, int(bounds[-1] * 1.05)))
+    return bounds
+
+
+class PointsHistogramManager(models.Manager):
+    def add(self, points: int, users: int = 1) -> None:
+        """Add (or remove, with a negative count) users to a random shard of the bucket holding points"""
+        bucket = PointsHistogramBucket.bucket_for(points)
+        shard = random.randrange(settings.POINTS_HISTOGRAM_SHARDS)
+        counter = self.filter(bucket=bucket, shard=shard)
+        if not counter.update(users=F('users') + users):
+            self.get_or_create(bucket=bucket, shard=shard)
+            counter.update(users=F('users') + users)
+
+    def counts(self) -> dict[int, int]:
+        """Users per bucket, summed over its shards, buckets nobody is in may be missing"""
+        return dict(self.values('bucket').annotate(total=Sum('users')).values_list('bucket', 'total').order_by())
+
+    def shift(self, old_points: int, new_points: int) -> None:
+        """Move one user from the bucket of old_points to the bucket of new_points"""
+        old_bucket = PointsHistogramBucket.bucket_for(old_points)
+        new_bucket = PointsHistogramBucket.bucket_for(new_points)
+        if old_bucket == new_bucket:
+            return
+        # Always lock the lower bucket first so concurrent shifts can't deadlock, a shard is only
+        # ever locked together with other buckets' shards
+        changes = sorted([(old_bucket, old_points, -1), (new_bucket, new_points, 1)])
+        with transaction.atomic():
+            for _, points, users in changes:
+                self.add(points, users)
+
+    @transaction.atomic
+    def rebuild(self) -> int:
+        """
+        Recompute every bucket from the active users, returns the number of users counted
+        Also puts right any drift between the shards and the users table
+        """
+        from src.models.user import User
+
+        counts = {}
+        for row in User.objects.filter(is_active=True).values('total_points_earned').annotate(users=Count('id')):
+            bucket = PointsHistogramBucket.bucket_for(row['total_points_earned'])
+            counts[bucket] = counts.get(bucket, 0) + row['users']
+
+        self.all().delete()
+        self.bulk_create([
+            PointsHistogramBucket(bucket=bucket, users=users)
+            for bucket, users in counts.items()
+        ])
+        return sum(counts.values())
+
+
+class PointsHistogramBucket(models.Model):
+    """
+    Number of active users whose total_points_earned falls in a bucket, kept up to date as points
+    change and accounts are deactivated or reactivated, so it counts the users the leaderboard ranks
+
+    Each bucket is split over settings.POINTS_HISTOGRAM_SHARDS rows, a change goes to a random one and
+    reads sum them (see counts()), so the crowded low buckets every new user passes through don't
+    serialize all point awards on a single row. A shard may go negative, only the sum is meaningful
+    """
+    LOWER_BOUNDS = _bucket_lower_bounds()
+
+    bucket = models.IntegerField(validators=[MinValueValidator(0)])
+    shard = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    users = models.IntegerField(default=0)
+
+    objects = PointsHistogramManager()
+
+    class Meta:
+        db_table = 'points_histogram'
+        unique_together = ['bucket', 'shard']
+
+    @staticmethod
+    def bucket_for(points: int) -> int:
+        bounds = PointsHistogramBucket.LOWER_BOUNDS
+        # The last bound only closes the final bucket
+        return min(bisect_right(bounds, max(0, points)) - 1, len(bounds) - 2)
+
+    @staticmethod
+    def bounds(bucket: int) -> tuple[int, int]:
+        """[lower, upper) points range of a bucket"""
+        return PointsHistogramBucket.LOWER_BOUNDS[bucket], PointsHistogramBucket.LOWER_BOUNDS[bucket + 1]
+
+    def __str__(self):
+        lower, upper = self.bounds(self.bucket)
+        return f"{self.users} users with {lower}-{upper - 1} points (shard {self.shard})"
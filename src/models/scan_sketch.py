@@ -0,0 +1,30 @@
+from django.db import models
+
+
+class ScanSketch(models.Model):
+    """
+    One worker's serialized sketch of scans in one time bucket, readers merge all workers' rows
+    for the buckets they need (see ScanAnalyticsService)
+    """
+    LABELS = 'LABELS'  # CountMinSketch of scanned labels
+    SCANNERS = 'SCANNERS'  # HyperLogLog of scanning user ids
+    KIND_CHOICES = [
+        (LABELS, 'Labels'),
+        (SCANNERS, 'Scanners')
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    bucket_start = models.DateTimeField()
+    worker = models.CharField(max_length=100)
+    data = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'scan_sketches'
+        unique_together = ['kind', 'bucket_start', 'worker']
+        indexes = [
+            models.Index(fields=['kind', 'bucket_start'])
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.bucket_start} from {self.worker}"
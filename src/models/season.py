@@ -0,0 +1,17 @@
+from django.db import models
+
+
+class Season(models.Model):
+    name = models.CharField(max_length=50, unique=True)
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    archived_at = models.DateTimeField(null=True)  # set once the final standings are frozen
+
+    class Meta:
+        db_table = 'seasons'
+        indexes = [
+            models.Index(fields=['starts_at', 'ends_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.starts_at:%Y-%m-%d} - {self.ends_at:%Y-%m-%d})"
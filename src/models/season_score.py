@@ -0,0 +1,20 @@
+from django.db import models
+from django.core.validators import MinValueValidator
+
+
+class SeasonScore(models.Model):
+    """Live score of a user in a season that is still running, removed once the season is archived"""
+    season = models.ForeignKey('Season', on_delete=models.CASCADE)
+    user = models.ForeignKey('User', on_delete=models.CASCADE)
+    points = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+    discoveries = models.IntegerField(default=0, validators=[MinValueValidator(0)])
+
+    class Meta:
+        db_table = 'season_scores'
+        indexes = [
+            models.Index(fields=['season', '-points', 'user']),  # For live season leaderboards
+        ]
+        unique_together = ['season', 'user']
+
+    def __str__(self):
+        return f"{self.user_id} has {self.points} points in season {self.season_id}"
@@ -0,0 +1,19 @@
+from django.db import models
+from django.core.validators import MinValueValidator
+
+
+class SeasonStanding(models.Model):
+    """Frozen final ranking of an archived season, one row per ranked user"""
+    season = models.ForeignKey('Season', on_delete=models.CASCADE)
+    user = models.ForeignKey('User', on_delete=models.CASCADE)
+    rank = models.IntegerField(validators=[MinValueValidator(1)])
+    points = models.IntegerField(validators=[MinValueValidator(0)])
+    discoveries = models.IntegerField(validators=[MinValueValidator(0)])
+
+    class Meta:
+        db_table = 'season_standings'
+        # (season, rank) serves top-K pages and (season, user) a user's past rank, each as one index read
+        unique_together = [['season', 'rank'], ['season', 'user']]
+
+    def __str__(self):
+        return f"{self.user_id} finished #{self.rank} in season {self.season_id}"
@@ -3,10 +3,27 @@ from django.utils import timezone
 from django.core.validators import MinValueValidator
 
 
+class SkinManager(models.Manager):
+    def get_queryset(self):
+        # Image data is only ever needed by the asset endpoints, which ask for it explicitly
+        return super().get_queryset().defer(*Skin.ASSET_FIELDS)
+
+    def with_assets(self):
+        """Skins with their image data loaded, narrow it down with only()"""
+        return super().get_queryset()
+
+
 class Skin(models.Model):
+    ASSET_FIELDS = ('image', 'thumbnail')
+
     name = models.CharField(max_length=100, unique=True)
-    image = models.BinaryField()  # for storing image data
-    thumbnail = models.BinaryField()  # for storing thumbnail data
+    # Image data is moved into the blob store on save and the columns emptied, they only still hold
+    # bytes on rows written before the store existed (see the move_skin_assets command)
+    image = models.BinaryField(blank=True)
+    thumbnail = models.BinaryField(blank=True)
+    # Blob store keys (SHA-256 of the content) of image and thumbnail, also served as their ETags
+    image_hash = models.CharField(max_length=64, null=True, editable=False)
+    thumbnail_hash = models.CharField(max_length=64, null=True, editable=False)
     price_points = models.IntegerField(validators=[MinValueValidator(0)])
     rarity = models.CharField(
         max_length=20,
@@ -19,14 +36,34 @@ class Skin(models.Model):
     )
     release_date = models.DateTimeField(default=timezone.now)
     available = models.BooleanField(default=True)
+    # Units released for a limited edition, None when unlimited, what's left is spread over SkinStock shards
+    stock = models.IntegerField(null=True, blank=True, validators=[MinValueValidator(0)])
     description = models.TextField()
 
+    objects = SkinManager()
+
     class Meta:
         db_table = 'skins'
+        base_manager_name = 'objects'  # related lookups like user.active_skin skip the blobs too
         indexes = [
             models.Index(fields=['rarity']),
             models.Index(fields=['price_points']),
         ]
 
+    @property
+    def is_limited(self) -> bool:
+        return self.stock is not None
+
+    def save(self, *args, **kwargs):
+        from src.storage.blob_store_factory import BlobStoreFactory
+
+        deferred = self.get_deferred_fields()
+        for field in self.ASSET_FIELDS:
+            content = getattr(self, field) if field not in deferred else None
+            if content:
+                setattr(self, f'{field}_hash', BlobStoreFactory.get_store().put(bytes(content)))
+                setattr(self, field, b'')
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.name} ({self.rarity})"
@@ -0,0 +1,71 @@
+import random
+from django.db import models, transaction, connection
+from django.db.models import F, Sum
+from django.core.validators import MinValueValidator
+
+
+class SkinStockManager(models.Manager):
+    @transaction.atomic
+    def release(self, skin_id: int, quantity: int, shards: int) -> None:
+        """Replace a skin's stock with `quantity` units spread as evenly as possible over `shards` counters"""
+        from src.models.skin import Skin
+
+        shards = max(1, min(shards, quantity))
+        self.filter(skin_id=skin_id).delete()
+        self.bulk_create([
+            SkinStock(skin_id=skin_id, shard=shard, remaining=quantity // shards + (shard < quantity % shards))
+            for shard in range(shards)
+        ])
+        Skin.objects.filter(id=skin_id).update(stock=quantity)
+
+    def claim(self, skin_id: int) -> bool:
+        """
+        Take one unit of a skin's stock, False once it's sold out
+        Must run inside the purchase transaction, the unit goes back if that transaction rolls back
+        """
+        if connection.features.has_select_for_update_skip_locked:
+            # Lock any shard nobody else holds right now instead of queueing behind one
+            shard = self.select_for_update(skip_locked=True).filter(
+                skin_id=skin_id,
+                remaining__gt=0
+            ).values_list('id', flat=True).first()
+            if shard is not None:
+                self.filter(id=shard).update(remaining=F('remaining') - 1)
+                return True
+
+        # Every shard with stock is locked by other buyers (or the database can't skip locks),
+        # wait for them starting from a random shard so buyers spread out
+        shards = list(self.filter(skin_id=skin_id, remaining__gt=0).values_list('id', flat=True))
+        random.shuffle(shards)
+        for shard in shards:
+            if self.filter(id=shard, remaining__gt=0).update(remaining=F('remaining') - 1):
+                return True
+        return False
+
+    def in_stock(self, skin_id: int) -> bool:
+        return self.filter(skin_id=skin_id, remaining__gt=0).exists()
+
+    def remaining(self, skin_id: int) -> int:
+        return self.filter(skin_id=skin_id).aggregate(remaining=Sum('remaining'))['remaining'] or 0
+
+
+class SkinStock(models.Model):
+    """
+    One of several counters that together hold the remaining stock of a limited-edition skin,
+    buyers claim a unit from whichever shard they can lock first so a drop doesn't queue on one row
+    """
+    skin = models.ForeignKey('Skin', on_delete=models.CASCADE)
+    shard = models.SmallIntegerField(validators=[MinValueValidator(0)])
+    remaining = models.IntegerField(validators=[MinValueValidator(0)])
+
+    objects = SkinStockManager()
+
+    class Meta:
+        db_table = 'skin_stock'
+        unique_together = ['skin', 'shard']
+        indexes = [
+            models.Index(fields=['skin', 'remaining']),
+        ]
+
+    def __str__(self):
+        return f"{self.skin_id}#{self.shard}: {self.remaining} left"
@@ -0,0 +1,26 @@
+from django.db import models
+from django.core.validators import MinValueValidator
+
+
+class SkinVariant(models.Model):
+    """A resized copy of a skin's image in the blob store, generated by SkinAssetPipeline"""
+    WEBP = 'WEBP'
+    FORMAT_CHOICES = [
+        (WEBP, 'WebP')
+    ]
+
+    skin = models.ForeignKey('Skin', on_delete=models.CASCADE)
+    size = models.SmallIntegerField(validators=[MinValueValidator(1)])  # longest side in pixels
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default=WEBP)
+    source_hash = models.CharField(max_length=64)  # image_hash of the skin when this was generated
+    blob_hash = models.CharField(max_length=64)
+    byte_size = models.IntegerField(validators=[MinValueValidator(0)])
+    width = models.SmallIntegerField(validators=[MinValueValidator(1)])
+    height = models.SmallIntegerField(validators=[MinValueValidator(1)])
+
+    class Meta:
+        db_table = 'skin_variants'
+        unique_together = ['skin', 'size', 'format']
+
+    def __str__(self):
+        return f"{self.skin_id} at {self.size}px ({self.format})"
@@ -4,6 +4,7 @@ from django.core.validators import MinValueValidator
 from django.contrib.auth.models import AbstractBaseUser
 from django.contrib.auth.base_user import BaseUserManager
 from django.contrib.auth.hashers import make_password, is_password_usable
+from src.models.points_histogram_bucket import PointsHistogramBucket
 
 
 class UserManager(BaseUserManager):
@@ -22,6 +23,8 @@ class UserManager(BaseUserManager):
         )
         user.password = make_password(password)
         user.save(using=self._db)
+        if user.is_active:
+            PointsHistogramBucket.objects.add(user.total_points_earned)
         return user
 
 
@@ -37,6 +40,8 @@ class User(AbstractBaseUser):
     rank = models.IntegerField(default=0, validators=[MinValueValidator(0)])
     is_admin = models.BooleanField(default=False)
     is_active = models.BooleanField(default=True)
+    # Bit i is set once the item with id i has been discovered, None until first built from user_discoveries
+    discovered_items = models.BinaryField(null=True, editable=False)
 
     objects = UserManager()
 
@@ -52,7 +57,8 @@ class User(AbstractBaseUser):
     class Meta:
         db_table = 'users'
         indexes = [
-            models.Index(fields=['-total_points_earned']),  # For leaderboard queries (negative sign for desc)
+            # For leaderboard queries (negative sign for desc), id breaks ties so keyset seeks stay on the index
+            models.Index(fields=['-total_points_earned', 'id']),
         ]
 
     @property
@@ -76,6 +82,8 @@ class User(AbstractBaseUser):
             self.rank = 0
 
     def add_points(self, points: int):
+        if self.is_active:
+            PointsHistogramBucket.objects.shift(self.total_points_earned, self.total_points_earned + points)
         self.points_balance += points
         self.total_points_earned += points
         self.update_rank()
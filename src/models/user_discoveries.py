@@ -8,21 +8,45 @@ class UserDiscovery(models.Model):
     item = models.ForeignKey('Item', on_delete=models.CASCADE)
     discovered_at = models.DateTimeField(default=timezone.now)
     points_awarded = models.IntegerField(validators=[MinValueValidator(0)])
+    # Copies of item.category and item.rarity so analytics can filter and group without joining items,
+    # kept in sync with the item by SrcConfig.ready and filled in for older rows by backfill_discovery_labels
+    category = models.CharField(max_length=20, null=True, editable=False)
+    rarity = models.CharField(max_length=20, null=True, editable=False)
 
     class Meta:
         db_table = 'user_discoveries'
         indexes = [
-            models.Index(fields=['user', 'item']),
-            models.Index(fields=['discovered_at']),
+            # The (user, item) lookup is served by the unique constraint's index
+            models.Index(fields=['discovered_at', 'user', 'points_awarded']),  # For the weekly leaderboard
+            models.Index(fields=['user', '-discovered_at', '-id']),  # For paging a user's history
+            models.Index(fields=['user', 'category', 'rarity', 'points_awarded']),  # For per-user breakdowns
+            models.Index(fields=['category', 'user', 'points_awarded']),  # For category leaderboards
         ]
         # Prevent user from getting points multiple times from same item
         unique_together = ['user', 'item']
 
-    def __str__(self):
-        return f"{self.user.username} discovered {self.item.name}"
-
     def save(self, *args, **kwargs):
-        # If this is a new discovery, award points to user
-        if self.pk is None:  # pk is None when object is new
-            self.user.add_points(self.points_awarded)
+        if self.category is None or self.rarity is None:
+            self.category, self.rarity = self.item.category, self.item.rarity
         super().save(*args, **kwargs)
+
+    @classmethod
+    def sync_item_labels(cls, sender, instance, **kwargs) -> None:
+        """
+        Signal receiver, copies an item's category and rarity onto its discoveries when they change
+        Archived discoveries follow too, rollups keep the labels they were compacted with until rebuilt
+        """
+        from src.models.archived_discovery import ArchivedDiscovery
+        for model in (cls, ArchivedDiscovery):
+            model.objects.filter(
+                item_id=instance.id
+            ).exclude(
+                category=instance.category,
+                rarity=instance.rarity
+            ).update(
+                category=instance.category,
+                rarity=instance.rarity
+            )
+
+    def __str__(self):
+        return f"{self.user.username} discovered {self.item.name}"
@@ -18,18 +18,10 @@ class UserSkin(models.Model):
     class Meta:
         db_table = 'user_skins'
         indexes = [
-            models.Index(fields=['user', 'skin']),
             models.Index(fields=['acquired_at']),
         ]
-        # Prevent duplicate skin ownership
+        # Prevent duplicate skin ownership, purchases rely on this to reject a second copy
         unique_together = ['user', 'skin']
 
     def __str__(self):
         return f"{self.user.username} owns {self.skin.name}"
-
-    def save(self, *args, **kwargs):
-        if not self.pk and self.acquisition_type == 'PURCHASE':
-            # Deduct points only for new purchases
-            if not self.user.deduct_points(self.skin.price_points):
-                raise ValueError("Insufficient points to purchase skin")
-        super().save(*args, **kwargs)
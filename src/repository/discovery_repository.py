@@ -0,0 +1,329 @@
+from itertools import chain
+from typing import List, Optional, Iterator
+from datetime import date, datetime, time
+from django.utils import timezone
+from django.db import connection, transaction
+from django.db.models import F, Q, Sum, Count
+from django.db.models.functions import Trunc, TruncDate, ExtractHour
+from src.models.items import Item
+from src.models.user_discoveries import UserDiscovery
+from src.models.discovery_rollup import DiscoveryRollup
+from src.models.archived_discovery import ArchivedDiscovery
+
+
+class DiscoveryRepository:
+    """
+    Reads over a user's discoveries wherever they live
+
+    Recent discoveries are rows in user_discoveries. Once older than DISCOVERY_HOT_RETENTION_DAYS,
+    compact_discoveries moves them to archived_discoveries and adds them to per-user per-day totals in
+    discovery_rollups, so aggregates combine hot rows with rollups and row listings continue into the archive.
+    Windows shorter than the retention (the weekly leaderboard, last-7-days counts) only need hot rows.
+    """
+    HISTORY_FIELDS = ('id', 'discovered_at', 'points_awarded', 'item__name', 'category', 'rarity')
+
+    @staticmethod
+    def count_for_user(user_id: int) -> int:
+        archived = DiscoveryRollup.objects.filter(
+            user_id=user_id
+        ).aggregate(total=Sum('discoveries'))['total'] or 0
+        return UserDiscovery.objects.filter(user_id=user_id).count() + archived
+
+    @staticmethod
+    def item_ids_for_user(user_id: int) -> Iterator[int]:
+        return chain(
+            UserDiscovery.objects.filter(user_id=user_id).values_list('item_id', flat=True),
+            ArchivedDiscovery.objects.filter(user_id=user_id).values_list('item_id', flat=True)
+        )
+
+    @staticmethod
+    def totals_by_category_and_rarity(user_id: int, recent_since: Optional[datetime] = None) -> List[dict]:
+        """
+        One entry per (category, rarity) the user has discovered, with count, points and decomposition_time
+        With `recent_since`, also `recent`: the discoveries since then, counted in the same grouped query.
+        Must be later than the hot retention, rollups have no recent discoveries to add
+        """
+        recent = {} if recent_since is None else {
+            "recent": Count('id', filter=Q(discovered_at__gte=recent_since))
+        }
+        hot = UserDiscovery.objects.filter(
+            user_id=user_id
+        ).values(
+            'category', 'rarity'
+        ).annotate(
+            count=Count('id'),
+            points=Sum('points_awarded'),
+            decomposition_time=Sum('item__average_decomposition_time'),
+            **recent
+        ).order_by()
+        archived = DiscoveryRollup.objects.filter(
+            user_id=user_id
+        ).values(
+            'category', 'rarity'
+        ).annotate(
+            count=Sum('discoveries'),
+            points=Sum('points'),
+            decomposition_time=Sum('decomposition_time')
+        ).order_by()
+
+        fields = ('count', 'points', 'decomposition_time') + tuple(recent)
+        totals = {}
+        for group in chain(hot, archived):
+            total = totals.setdefault((group['category'], group['rarity']), {
+                "category": group['category'],
+                "rarity": group['rarity'],
+                **{field: 0 for field in fields}
+            })
+            for field in fields:
+                total[field] += group.get(field) or 0
+        return list(totals.values())
+
+    @staticmethod
+    def points_by_period(user_id: int, since: datetime, period: str) -> List[dict]:
+        """
+        Points and discoveries per `period` ('day', 'week' or 'month') since `since`, oldest first
+        Archived discoveries are counted by day, so the first day of the window is counted whole
+        """
+        totals = {}
+        hot = UserDiscovery.objects.filter(
+            user_id=user_id,
+            discovered_at__gte=since
+        ).annotate(
+            period=Trunc('discovered_at', period)
+        ).values('period').annotate(
+            points=Sum('points_awarded'),
+            discoveries=Count('id')
+        ).order_by()
+        for entry in hot:
+            totals[entry['period']] = [entry['points'], entry['discoveries']]
+
+        archived = DiscoveryRollup.objects.filter(
+            user_id=user_id,
+            day__gte=timezone.localtime(since).date()
+        ).values('day').annotate(
+            points=Sum('points'),
+            discoveries=Sum('discoveries')
+        ).order_by()
+        for entry in archived:
+            start = DiscoveryRepository.__period_start(entry['day'], period)
+            total = totals.setdefault(start, [0, 0])
+            total[0] += entry['points']
+            total[1] += entry['discoveries']
+
+        return [{
+            "period": start,
+            "points": points,
+            "discoveries": discoveries
+        } for start, (points, discoveries) in sorted(totals.items())]
+
+    @staticmethod
+    def totals_by_hour(user_id: int) -> List[dict]:
+        """Points and discoveries per hour of the day, from individual rows since rollups are daily"""
+        totals = {}
+        for model in (UserDiscovery, ArchivedDiscovery):
+            for entry in model.objects.filter(
+                user_id=user_id
+            ).annotate(
+                hour=ExtractHour('discovered_at')
+            ).values('hour').annotate(
+                total_points=Sum('points_awarded'),
+                count=Count('id')
+            ).order_by():
+                total = totals.setdefault(entry['hour'], {"hour": entry['hour'], "total_points": 0, "count": 0})
+                total['total_points'] += entry['total_points']
+                total['count'] += entry['count']
+        return [totals[hour] for hour in sorted(totals)]
+
+    @staticmethod
+    def discovery_days(user_id: int) -> List[date]:
+        """Days the user discovered anything on, oldest first"""
+        hot = UserDiscovery.objects.filter(
+            user_id=user_id
+        ).annotate(
+            date=TruncDate('discovered_at')
+        ).values_list('date', flat=True).distinct()
+        archived = DiscoveryRollup.objects.filter(user_id=user_id).values_list('day', flat=True).distinct()
+        return sorted(set(hot) | set(archived))
+
+    @staticmethod
+    def history_page(
+            user_id: int,
+            limit: int,
+            after: Optional[tuple[datetime, int]] = None,
+            category: Optional[str] = None,
+            rarity: Optional[str] = None
+    ) -> List[dict]:
+        """
+        Up to `limit` discoveries ordered by (discovered_at, id) descending, strictly after the `after` keyset
+        Every archived row is older than every hot row, so a page continues into the archive where hot rows run out
+        """
+        page = []
+        for model in (UserDiscovery, ArchivedDiscovery):
+            discoveries = model.objects.filter(user_id=user_id)
+            if category:
+                discoveries = discoveries.filter(category=category)
+            if rarity:
+                discoveries = discoveries.filter(rarity=rarity)
+            if after is not None:
+                discoveries = discoveries.filter(
+                    Q(discovered_at__lt=after[0]) |
+                    Q(discovered_at=after[0], id__lt=after[1])
+                )
+            page += discoveries.order_by(
+                '-discovered_at', '-id'
+            ).values(*DiscoveryRepository.HISTORY_FIELDS)[:limit - len(page)]
+            if len(page) >= limit:
+                break
+        return page
+
+    @staticmethod
+    def category_points_page(category: str, limit: int, after: Optional[tuple[int, int]] = None) -> List[dict]:
+        """
+        Users by total points from `category` discoveries, ordered by (points desc, user id asc),
+        strictly after the `after` keyset of (points, user id)
+        """
+        having, params = "", []
+        if after is not None:
+            having = "HAVING SUM(points) < %s OR (SUM(points) = %s AND user_id > %s)"
+            params = [after[0], after[0], after[1]]
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT user_id, SUM(discoveries), SUM(points) AS total_points "
+                f"FROM ({DiscoveryRepository.__category_totals_sql()}) AS combined "
+                f"GROUP BY user_id {having} ORDER BY total_points DESC, user_id LIMIT %s",
+                [category, category, *params, limit]
+            )
+            # SUM over a UNION comes back as a decimal on some backends
+            return [{
+                "user": user_id,
+                "discoveries": int(discoveries),
+                "points": int(points)
+            } for user_id, discoveries, points in cursor.fetchall()]
+
+    @staticmethod
+    def count_users_ahead_in_category(user_id: int, category: str) -> int:
+        """Users with more points from `category` discoveries than the given user"""
+        archived = DiscoveryRollup.objects.filter(
+            user_id=user_id,
+            category=category
+        ).aggregate(total=Sum('points'))['total'] or 0
+        points = (UserDiscovery.objects.filter(
+            user_id=user_id,
+            category=category
+        ).aggregate(total=Sum('points_awarded'))['total'] or 0) + archived
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT COUNT(*) FROM (SELECT user_id FROM ({DiscoveryRepository.__category_totals_sql()}) AS combined "
+                f"GROUP BY user_id HAVING SUM(points) > %s) AS ahead",
+                [category, category, points]
+            )
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def count_by_item() -> dict[int, int]:
+        """Discoveries of each item across all users"""
+        counts = {}
+        for model in (UserDiscovery, ArchivedDiscovery):
+            for item_id, count in model.objects.values('item_id').annotate(
+                count=Count('id')
+            ).values_list('item_id', 'count').order_by():
+                counts[item_id] = counts.get(item_id, 0) + count
+        return counts
+
+    @staticmethod
+    def archive_batch(before: datetime, batch_size: int) -> int:
+        """
+        Move up to `batch_size` of the oldest discoveries made before `before` into archived_discoveries,
+        adding them to their rollups in the same transaction, returns how many were moved
+        """
+        with transaction.atomic():
+            batch = list(UserDiscovery.objects.filter(
+                discovered_at__lt=before
+            ).order_by('id').values(
+                'id', 'user_id', 'item_id', 'discovered_at', 'points_awarded', 'category', 'rarity'
+            )[:batch_size])
+            if not batch:
+                return 0
+
+            items = {item['id']: item for item in Item.objects.filter(
+                id__in={discovery['item_id'] for discovery in batch}
+            ).values('id', 'category', 'rarity', 'average_decomposition_time')}
+
+            rollups = {}
+            for discovery in batch:
+                item = items[discovery['item_id']]
+                discovery['category'] = discovery['category'] or item['category']
+                discovery['rarity'] = discovery['rarity'] or item['rarity']
+                key = (
+                    discovery['user_id'],
+                    timezone.localtime(discovery['discovered_at']).date(),
+                    discovery['category'],
+                    discovery['rarity']
+                )
+                rollup = rollups.setdefault(key, [0, 0, 0])
+                rollup[0] += 1
+                rollup[1] += discovery['points_awarded']
+                rollup[2] += item['average_decomposition_time']
+
+            for (user_id, day, category, rarity), (discoveries, points, decomposition_time) in rollups.items():
+                rollup = DiscoveryRollup.objects.filter(user_id=user_id, day=day, category=category, rarity=rarity)
+                if not rollup.update(
+                    discoveries=F('discoveries') + discoveries,
+                    points=F('points') + points,
+                    decomposition_time=F('decomposition_time') + decomposition_time
+                ):
+                    DiscoveryRollup.objects.create(
+                        user_id=user_id,
+                        day=day,
+                        category=category,
+                        rarity=rarity,
+                        discoveries=discoveries,
+                        points=points,
+                        decomposition_time=decomposition_time
+                    )
+
+            ArchivedDiscovery.objects.bulk_create([
+                ArchivedDiscovery(**discovery) for discovery in batch
+            ])
+            UserDiscovery.objects.filter(id__in=[discovery['id'] for discovery in batch]).delete()
+            return len(batch)
+
+    @staticmethod
+    def rebuild_rollups() -> int:
+        """Recompute every rollup from archived_discoveries, returns the number of rollups written"""
+        with transaction.atomic():
+            DiscoveryRollup.objects.all().delete()
+            rollups = DiscoveryRollup.objects.bulk_create([
+                DiscoveryRollup(**rollup) for rollup in ArchivedDiscovery.objects.annotate(
+                    day=TruncDate('discovered_at')
+                ).values(
+                    'user_id', 'day', 'category', 'rarity'
+                ).annotate(
+                    discoveries=Count('id'),
+                    points=Sum('points_awarded'),
+                    decomposition_time=Sum('item__average_decomposition_time')
+                ).order_by().iterator()
+            ], batch_size=1000)
+            return len(rollups)
+
+    @staticmethod
+    def __category_totals_sql() -> str:
+        """Per-user (discoveries, points) for one category from hot rows and rollups, takes the category twice"""
+        return (
+            f"SELECT user_id, COUNT(*) AS discoveries, SUM(points_awarded) AS points "
+            f"FROM {UserDiscovery._meta.db_table} WHERE category = %s GROUP BY user_id "
+            f"UNION ALL "
+            f"SELECT user_id, SUM(discoveries) AS discoveries, SUM(points) AS points "
+            f"FROM {DiscoveryRollup._meta.db_table} WHERE category = %s GROUP BY user_id"
+        )
+
+    @staticmethod
+    def __period_start(day: date, period: str) -> datetime:
+        """What Trunc(discovered_at, period) gives for a discovery on `day`"""
+        if period == 'week':
+            day = date.fromordinal(day.toordinal() - day.weekday())
+        elif period == 'month':
+            day = day.replace(day=1)
+        return timezone.make_aware(datetime.combine(day, time()))
@@ -1,12 +1,21 @@
-from typing import Optional
+from operator import or_
+from functools import reduce
+from typing import Optional, Iterator
+from datetime import datetime
 from django.db import transaction
+from django.db.models import F, Q, Count
 from src.models.user import User
 from src.models.skin import Skin
+from src.util.bitset import Bitset
+from src.repository.discovery_repository import DiscoveryRepository
+from src.models.points_histogram_bucket import PointsHistogramBucket
 from django.core.exceptions import ObjectDoesNotExist
 from django.contrib.auth.hashers import check_password, make_password
 
 
 class UserRepository:
+    POSITION_BATCH_SIZE = 100
+
     @staticmethod
     def find_by_id(user_id: int) -> Optional[User]:
         try:
@@ -14,6 +23,18 @@ class UserRepository:
         except ObjectDoesNotExist:
             return None
 
+    @staticmethod
+    def find_by_id_for_update(user_id: int) -> Optional[User]:
+        """Fetch and row-lock a user, must be called inside a transaction"""
+        try:
+            return User.objects.select_for_update().get(id=user_id)
+        except ObjectDoesNotExist:
+            return None
+
+    @staticmethod
+    def find_by_ids(user_ids: list[int]) -> dict[int, User]:
+        return User.objects.in_bulk(user_ids)
+
     @staticmethod
     def find_by_username(username: str) -> Optional[User]:
         try:
@@ -37,6 +58,8 @@ class UserRepository:
             **extra_fields
         )
         user.save()
+        if user.is_active:
+            PointsHistogramBucket.objects.add(user.total_points_earned)
         return user
 
     @transaction.atomic
@@ -49,10 +72,27 @@ class UserRepository:
         try:
             user = User.objects.get(id=user_id)
             user.delete()
+            if user.is_active:
+                PointsHistogramBucket.objects.add(user.total_points_earned, -1)
             return True
         except ObjectDoesNotExist:
             return False
 
+    @staticmethod
+    @transaction.atomic
+    def set_active(user_id: int, is_active: bool) -> bool:
+        """
+        Activate or deactivate a user, moving them in or out of the points histogram with it
+        Returns False if the user doesn't exist
+        """
+        user = User.objects.select_for_update().filter(id=user_id).first()
+        if user is None:
+            return False
+        if user.is_active != is_active:
+            User.objects.filter(id=user_id).update(is_active=is_active)
+            PointsHistogramBucket.objects.add(user.total_points_earned, 1 if is_active else -1)
+        return True
+
     @staticmethod
     def verify_password(username: str, password: str) -> bool:
         try:
@@ -67,11 +107,16 @@ class UserRepository:
             password=make_password(hashed_password)
         )
 
-    @transaction.atomic
-    def update_last_login(self, user_id: int) -> None:
+    @staticmethod
+    def update_last_login(user_id: int, at: Optional[datetime] = None) -> None:
         from django.utils import timezone
-        User.objects.filter(id=user_id).update(
-            last_login_at=timezone.now()
+        at = at or timezone.now()
+        # A single UPDATE needs no transaction, and a late write never moves the time backwards
+        User.objects.filter(
+            Q(last_login_at__isnull=True) | Q(last_login_at__lt=at),
+            id=user_id
+        ).update(
+            last_login_at=at
         )
 
     @staticmethod
@@ -104,11 +149,26 @@ class UserRepository:
     @transaction.atomic
     def update_points(self, user_id: int, points_balance: int, total_points: int) -> User:
         user = User.objects.get(id=user_id)
+        if user.is_active:
+            PointsHistogramBucket.objects.shift(user.total_points_earned, total_points)
         user.points_balance = points_balance
         user.total_points_earned = total_points
         user.save()
         return user
 
+    @staticmethod
+    @transaction.atomic
+    def debit_points(user_id: int, points: int) -> Optional[int]:
+        """
+        Take points off a user's balance with one conditional UPDATE, so concurrent debits can never overdraw it
+        Returns the new balance, or None if the user doesn't exist or can't afford it
+        """
+        if not User.objects.filter(id=user_id, points_balance__gte=points).update(
+            points_balance=F('points_balance') - points
+        ):
+            return None
+        return User.objects.filter(id=user_id).values_list('points_balance', flat=True).get()
+
     @transaction.atomic
     def update_rank(self, user_id: int, new_rank: int) -> User:
         user = User.objects.get(id=user_id)
@@ -116,19 +176,135 @@ class UserRepository:
         user.save()
         return user
 
+    def get_user_rank_position(self, user_id: int) -> int:
+        """1-based leaderboard position of a user by id, see get_user_leaderboard_position"""
+        user = self.find_by_id(user_id)
+        if user is None:
+            raise ValueError("User not found")
+        return self.get_user_leaderboard_position(user)
+
+    def get_user_leaderboard_position(self, user: User) -> int:
+        """
+        1-based position of the user among active users in the leaderboard ordering
+        (total_points_earned desc, id asc), so ties resolve deterministically
+
+        Users in higher points buckets are summed from the histogram (a few hundred rows at most),
+        only the users sharing the user's bucket are counted, so the cost depends on the size of
+        that bucket rather than on how far down the leaderboard the user is
+        """
+        return self.get_leaderboard_positions([user])[user.id]
+
+    @classmethod
+    def get_leaderboard_positions(cls, users: list[User]) -> dict[int, int]:
+        """
+        get_user_leaderboard_position of several users by user id, with one histogram read and
+        one count query per POSITION_BATCH_SIZE users
+        """
+        if not users:
+            return {}
+
+        size = len(PointsHistogramBucket.LOWER_BOUNDS) - 1
+        users_above = [0] * size  # users in buckets above each bucket
+        in_bucket = PointsHistogramBucket.objects.counts()
+        for bucket in range(size - 2, -1, -1):
+            users_above[bucket] = users_above[bucket + 1] + max(0, in_bucket.get(bucket + 1, 0))
+
+        positions = {}
+        for start in range(0, len(users), cls.POSITION_BATCH_SIZE):
+            batch = users[start:start + cls.POSITION_BATCH_SIZE]
+            ahead = {user.id: cls.__ahead_in_bucket(user) for user in batch}
+            counts = User.objects.filter(
+                reduce(or_, ahead.values()),
+                is_active=True
+            ).aggregate(**{
+                f'ahead_of_{user_id}': Count('id', filter=condition) for user_id, condition in ahead.items()
+            })
+            for user in batch:
+                bucket = PointsHistogramBucket.bucket_for(user.total_points_earned)
+                positions[user.id] = users_above[bucket] + counts[f'ahead_of_{user.id}'] + 1
+        return positions
+
     @staticmethod
-    def get_user_rank_position(user_id: int) -> int:
-        try:
-            # Get user's total points
-            user = User.objects.get(id=user_id)
+    def __ahead_in_bucket(user: User) -> Q:
+        """Users ahead of the user that share their histogram bucket"""
+        ahead = (
+            Q(total_points_earned__gt=user.total_points_earned) |
+            Q(total_points_earned=user.total_points_earned, id__lt=user.id)
+        )
+        bucket = PointsHistogramBucket.bucket_for(user.total_points_earned)
+        if bucket < len(PointsHistogramBucket.LOWER_BOUNDS) - 2:
+            # The last bucket is open ended, see PointsHistogramBucket.bucket_for
+            ahead &= Q(total_points_earned__lt=PointsHistogramBucket.bounds(bucket)[1])
+        return ahead
+
+    @staticmethod
+    def find_ranked_above(user: User, limit: int) -> list[dict]:
+        """
+        Seek the `limit` active users directly ahead of the user in the leaderboard ordering
+        Returned nearest first
+        """
+        users = User.objects.filter(is_active=True).values('id', 'username', 'display_name', 'total_points_earned')
+        # Ties first, then higher scores, each a plain index range seek, an OR of the two
+        # would make the database sort every user ahead before applying the limit
+        tied = list(users.filter(
+            total_points_earned=user.total_points_earned,
+            id__lt=user.id
+        ).order_by('-id')[:limit])
+        if len(tied) >= limit:
+            return tied
+        return tied + list(users.filter(
+            total_points_earned__gt=user.total_points_earned
+        ).order_by('total_points_earned', '-id')[:limit - len(tied)])
 
-            # Count how many users have more points
-            higher_ranked_count = User.objects.filter(
-                total_points_earned__gt=user.total_points_earned
-            ).count()
+    @staticmethod
+    def find_ranked_below(user: User, limit: int) -> list[dict]:
+        """
+        Seek the `limit` active users directly behind the user in the leaderboard ordering
+        Returned nearest first
+        """
+        users = User.objects.filter(is_active=True).values('id', 'username', 'display_name', 'total_points_earned')
+        tied = list(users.filter(
+            total_points_earned=user.total_points_earned,
+            id__gt=user.id
+        ).order_by('id')[:limit])
+        if len(tied) >= limit:
+            return tied
+        return tied + list(users.filter(
+            total_points_earned__lt=user.total_points_earned
+        ).order_by('-total_points_earned', 'id')[:limit - len(tied)])
 
-            # Add 1 to convert to 1-based ranking
-            return higher_ranked_count + 1
+    @staticmethod
+    def iter_leaderboard() -> Iterator[tuple[int, int]]:
+        """
+        Stream (id, total_points_earned) of every active user in leaderboard order
+        """
+        return User.objects.filter(
+            is_active=True
+        ).order_by(
+            '-total_points_earned', 'id'
+        ).values_list(
+            'id', 'total_points_earned'
+        ).iterator(chunk_size=10000)
 
-        except ObjectDoesNotExist:
-            raise ValueError("User not found")
+    @staticmethod
+    def get_discovered_items(user: User) -> Bitset:
+        """
+        Bitset of item ids the user has discovered, built from recent and archived discoveries the first time it's needed
+        Callers may not hold the user's lock, so the built bitset is only stored while none is: an award that
+        committed meanwhile wrote a bitset with its own item, which one built before it must not overwrite
+        """
+        if user.discovered_items is not None:
+            return Bitset(user.discovered_items)
+
+        discovered_items = Bitset.of(DiscoveryRepository.item_ids_for_user(user.id))
+        if User.objects.filter(id=user.id, discovered_items__isnull=True).update(
+            discovered_items=discovered_items.to_bytes()
+        ):
+            user.discovered_items = discovered_items.to_bytes()
+        return discovered_items
+
+    @transaction.atomic
+    def update_discovered_items(self, user_id: int, discovered_items: Bitset) -> None:
+        User.objects.filter(id=user_id).update(
+            discovered_items=discovered_items.to_bytes()
+        )
@@ -0,0 +1,39 @@
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from src.rest.is_admin import IsAdmin
+from src.rest.dto.scan_analytics_dto import ScanAnalyticsDto
+from src.service_module import ServiceModule
+
+
+class AnalyticsController(viewsets.ViewSet):
+    base_route = "api/v1/analytics"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        __service_module = ServiceModule()
+        self.scan_analytics_service = __service_module.scan_analytics_service
+
+    @action(detail=False, methods=['GET'], permission_classes=[IsAdmin])
+    def scans(self, request) -> Response:
+        """
+        GET /api/v1/analytics/scans/?minutes=60&days=7&limit=20
+        Get approximate most scanned labels and unique scanners, admins only
+        """
+        try:
+            analytics: ScanAnalyticsDto = self.scan_analytics_service.get_scan_analytics(
+                minutes=self.__int_param(request, 'minutes', 60),
+                days=self.__int_param(request, 'days', 7),
+                limit=self.__int_param(request, 'limit', 20)
+            )
+            return Response(analytics, status=status.HTTP_200_OK)
+        except ValidationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @staticmethod
+    def __int_param(request, name: str, default: int) -> int:
+        try:
+            return int(request.query_params.get(name, default))
+        except ValueError:
+            raise ValidationError(f"{name} must be an integer")
@@ -0,0 +1,30 @@
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def etag_matches(request, etag: str) -> bool:
+    """
+    Weak comparison of an ETag against the request's If-None-Match header (RFC 9110 13.1.2)
+    """
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(
+        candidate.strip().removeprefix('W/') == opaque
+        for candidate in header.split(',')
+    )
+
+
+def conditional_response(
+        request, data, etag: str, cache_control: str = 'no-cache', headers: dict | None = None
+) -> Response:
+    """
+    200 with the data, or an empty 304 if the client already holds this ETag
+    """
+    headers = {**(headers or {}), "ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(data, status=status.HTTP_200_OK, headers=headers)
@@ -5,11 +5,13 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
+from src.rest.dto.collection_progress_dto import CollectionProgressDto
 from src.rest.dto.discovery_history_dto import DiscoveryHistoryDto
 from src.rest.dto.discovery_stats_dto import DiscoveryStatsDto
 from src.rest.dto.popular_discovery_dto import PopularDiscoveryDto
 from src.rest.dto.scan_discovery_dto import ScanDiscoveryDto
 from src.rest.dto.scan_discovery_request_dto import ScanDiscoveryRequestDto
+from src.rest.dto.trending_discovery_dto import TrendingDiscoveryDto
 from src.rest.dto.undiscovered_item_dto import UndiscoveredItemDto
 from src.service_module import ServiceModule
 
@@ -51,14 +53,25 @@ class DiscoveryController(viewsets.ViewSet):
     @action(detail=False, methods=['GET'])
     def history(self, request) -> Response:
         """
-        GET /api/v1/discoveries/history/
-        Get user's discovery history
+        GET /api/v1/discoveries/history/?limit=&cursor=&category=&rarity=
+        Get a page of the user's discovery history, the next page's cursor is in the X-Next-Cursor header
         """
         try:
-            history: List[DiscoveryHistoryDto] = self.discovery_service.get_user_discoveries(
-                user_id=request.user.id
+            try:
+                limit = int(request.query_params.get('limit', 50))
+            except ValueError:
+                raise ValidationError("limit must be an integer")
+
+            page = self.discovery_service.get_user_discoveries(
+                user_id=request.user.id,
+                limit=limit,
+                cursor=request.query_params.get('cursor'),
+                category=request.query_params.get('category'),
+                rarity=request.query_params.get('rarity')
             )
-            return Response(history, status=status.HTTP_200_OK)
+            history: List[DiscoveryHistoryDto] = page['results']
+            headers = {"X-Next-Cursor": page['next_cursor']} if page['next_cursor'] else None
+            return Response(history, status=status.HTTP_200_OK, headers=headers)
         except ValidationError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -90,6 +103,20 @@ class DiscoveryController(viewsets.ViewSet):
         except ValidationError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=False, methods=['GET'])
+    def progress(self, request) -> Response:
+        """
+        GET /api/v1/discoveries/progress/
+        Get how much of the item catalog the user has discovered
+        """
+        try:
+            progress: CollectionProgressDto = self.discovery_service.get_collection_progress(
+                user_id=request.user.id
+            )
+            return Response(progress, status=status.HTTP_200_OK)
+        except ValidationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
     @action(detail=False, methods=['GET'])
     def popular(self, request) -> Response:
         """
@@ -101,3 +128,15 @@ class DiscoveryController(viewsets.ViewSet):
             return Response(popular_items, status=status.HTTP_200_OK)
         except ValidationError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['GET'])
+    def trending(self, request) -> Response:
+        """
+        GET /api/v1/discoveries/trending/
+        Get items discovered most often recently
+        """
+        try:
+            trending_items: List[TrendingDiscoveryDto] = self.discovery_service.get_trending_discoveries()
+            return Response(trending_items, status=status.HTTP_200_OK)
+        except ValidationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,17 @@
+from typing import TypedDict
+from dataclasses import dataclass
+
+
+@dataclass
+class CategoryProgressDto(TypedDict):
+    discovered: int
+    total: int
+    completion_percentage: float
+
+
+@dataclass
+class CollectionProgressDto(TypedDict):
+    discovered: int
+    total: int
+    completion_percentage: float
+    categories: dict[str, CategoryProgressDto]  # e.g., {"PLASTIC": {"discovered": 3, "total": 10, ...}}
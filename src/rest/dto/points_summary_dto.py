@@ -8,7 +8,9 @@ class PointsSummaryDto(TypedDict):
     total_earned: int
     current_rank: int
     rank_title: str
-    leaderboard_position: int
+    leaderboard_position: int | None  # None when the user is far down the long tail, see top_percent
+    top_percent: float  # e.g. 12.5 for "top 12.5%"
+    top_percent_error: float  # top_percent is accurate to within +/- this many percentage points
     next_rank: int | None
     points_to_next_rank: int | None
     discoveries_count: int
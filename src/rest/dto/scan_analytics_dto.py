@@ -0,0 +1,27 @@
+from typing import TypedDict, List
+from dataclasses import dataclass
+from datetime import date
+
+
+@dataclass
+class ScannedLabelDto(TypedDict):
+    label: str
+    scans: int  # never below the true count, see label_overcount_bound
+
+
+@dataclass
+class DailyScannersDto(TypedDict):
+    date: date
+    unique_scanners: int
+
+
+@dataclass
+class ScanAnalyticsDto(TypedDict):
+    window_minutes: int
+    total_scans: int
+    top_labels: List[ScannedLabelDto]
+    label_overcount_bound: float  # label counts exceed the true count by more than this ...
+    label_overcount_probability: float  # ... with at most this probability
+    unique_scanners: int
+    unique_scanners_by_day: List[DailyScannersDto]
+    unique_scanners_relative_error: float  # relative standard error of every unique_scanners figure
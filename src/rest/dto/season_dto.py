@@ -0,0 +1,10 @@
+from typing import TypedDict
+from dataclasses import dataclass
+
+
+@dataclass
+class SeasonDto(TypedDict):
+    name: str
+    starts_at: str  # ISO format datetime
+    ends_at: str  # ISO format datetime
+    archived: bool
@@ -0,0 +1,12 @@
+from typing import TypedDict
+from dataclasses import dataclass
+
+
+@dataclass
+class SeasonLeaderboardDto(TypedDict):
+    rank: int
+    username: str
+    display_name: str | None
+    points: int
+    discoveries: int
+    season: str
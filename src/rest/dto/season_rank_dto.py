@@ -0,0 +1,11 @@
+from typing import TypedDict
+from dataclasses import dataclass
+
+
+@dataclass
+class SeasonRankDto(TypedDict):
+    season: str
+    rank: int | None  # None if the user scored nothing that season
+    points: int
+    discoveries: int
+    archived: bool
@@ -1,4 +1,4 @@
-from typing import TypedDict
+from typing import TypedDict, Optional, List
 from dataclasses import dataclass
 
 
@@ -9,3 +9,5 @@ class SkinDto(TypedDict):
     rarity: str
     price_points: int
     description: str
+    remaining_stock: Optional[int]  # None for skins that aren't limited editions
+    thumbnail_sizes: List[int]  # sizes that can be asked for with ?size= on the thumbnail endpoint
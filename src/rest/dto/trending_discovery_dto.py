@@ -0,0 +1,9 @@
+from typing import TypedDict
+from dataclasses import dataclass
+
+
+@dataclass
+class TrendingDiscoveryDto(TypedDict):
+    item_name: str
+    category: str
+    trending_score: float  # discoveries weighted by recency, each halving every TRENDING_HALF_LIFE_HOURS
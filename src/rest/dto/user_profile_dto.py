@@ -10,7 +10,9 @@ class UserProfileDto(TypedDict):
     rank_title: str
     points_balance: int
     total_points_earned: int
-    leaderboard_position: int
+    leaderboard_position: int | None  # None when the user is far down the long tail, see top_percent
+    top_percent: float  # e.g. 12.5 for "top 12.5%"
+    top_percent_error: float  # top_percent is accurate to within +/- this many percentage points
     active_skin_id: int | None
     member_since: str  # ISO format datetime
     last_login: str | None  # ISO format datetime
@@ -0,0 +1,8 @@
+from rest_framework.permissions import BasePermission
+
+
+class IsAdmin(BasePermission):
+    """Allows access only to authenticated users flagged with User.is_admin"""
+
+    def has_permission(self, request, view) -> bool:
+        return bool(request.user and request.user.is_authenticated and getattr(request.user, 'is_admin', False))
@@ -3,9 +3,14 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
+from src.cache.snapshot import Snapshot
+from src.rest.conditional_response import conditional_response
 from src.rest.dto.category_leaderboard_dto import CategoryLeaderboardDto
 from src.rest.dto.global_leaderboard_dto import GlobalLeaderboardDto
 from src.rest.dto.nearby_ranking_dto import NearbyRankingDto
+from src.rest.dto.season_dto import SeasonDto
+from src.rest.dto.season_leaderboard_dto import SeasonLeaderboardDto
+from src.rest.dto.season_rank_dto import SeasonRankDto
 from src.rest.dto.user_ranking_dto import UserRankingDto
 from src.rest.dto.weekly_leaderboard_dto import WeeklyLeaderboardDto
 from src.service_module import ServiceModule
@@ -18,6 +23,7 @@ class LeaderboardController(viewsets.ViewSet):
         super().__init__(**kwargs)
         __service_module = ServiceModule()
         self.leaderboard_service = __service_module.leaderboard_service
+        self.season_service = __service_module.season_service
 
     @action(detail=False, methods=['GET'])
     def global_rankings(self, request) -> Response:
@@ -26,11 +32,13 @@ class LeaderboardController(viewsets.ViewSet):
         Get global leaderboard rankings
         """
         try:
-            limit = int(request.query_params.get('limit', 10))
-            rankings: List[GlobalLeaderboardDto] = self.leaderboard_service.get_global_leaderboard(
-                limit=limit
+            limit, cursor = self.__page_params(request)
+            snapshot: Snapshot = self.leaderboard_service.get_global_leaderboard_snapshot(
+                limit=limit,
+                cursor=cursor
             )
-            return Response(rankings, status=status.HTTP_200_OK)
+            rankings: List[GlobalLeaderboardDto] = snapshot.value['results']
+            return self.__page_response(request, rankings, snapshot)
         except ValidationError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -41,11 +49,13 @@ class LeaderboardController(viewsets.ViewSet):
         Get weekly leaderboard rankings
         """
         try:
-            limit = int(request.query_params.get('limit', 10))
-            rankings: List[WeeklyLeaderboardDto] = self.leaderboard_service.get_weekly_leaderboard(
-                limit=limit
+            limit, cursor = self.__page_params(request)
+            snapshot: Snapshot = self.leaderboard_service.get_weekly_leaderboard_snapshot(
+                limit=limit,
+                cursor=cursor
             )
-            return Response(rankings, status=status.HTTP_200_OK)
+            rankings: List[WeeklyLeaderboardDto] = snapshot.value['results']
+            return self.__page_response(request, rankings, snapshot)
         except ValidationError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -56,12 +66,14 @@ class LeaderboardController(viewsets.ViewSet):
         Get category-specific leaderboard (pk is the category name)
         """
         try:
-            limit = int(request.query_params.get('limit', 10))
-            rankings: List[CategoryLeaderboardDto] = self.leaderboard_service.get_category_leaderboard(
+            limit, cursor = self.__page_params(request)
+            snapshot: Snapshot = self.leaderboard_service.get_category_leaderboard_snapshot(
                 category=pk,
-                limit=limit
+                limit=limit,
+                cursor=cursor
             )
-            return Response(rankings, status=status.HTTP_200_OK)
+            rankings: List[CategoryLeaderboardDto] = snapshot.value['results']
+            return self.__page_response(request, rankings, snapshot)
         except ValidationError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -86,7 +98,7 @@ class LeaderboardController(viewsets.ViewSet):
         Get rankings for users nearby in rank
         """
         try:
-            range_value = int(request.query_params.get('range', 2))
+            range_value = self.__int_param(request, 'range', 2)
             rankings: List[NearbyRankingDto] = self.leaderboard_service.get_nearby_rankings(
                 user_id=request.user.id,
                 range=range_value
@@ -94,3 +106,71 @@ class LeaderboardController(viewsets.ViewSet):
             return Response(rankings, status=status.HTTP_200_OK)
         except ValidationError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['GET'])
+    def seasons(self, request) -> Response:
+        """
+        GET /api/v1/leaderboard/seasons/
+        List all seasons, most recent first
+        """
+        try:
+            seasons: List[SeasonDto] = self.season_service.get_seasons()
+            return Response(seasons, status=status.HTTP_200_OK)
+        except ValidationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=True, methods=['GET'])
+    def season(self, request, pk=None) -> Response:
+        """
+        GET /api/v1/leaderboard/{season}/season/
+        Get a season's leaderboard (pk is the season name, or "current")
+        """
+        try:
+            limit, cursor = self.__page_params(request)
+            snapshot: Snapshot = self.season_service.get_season_leaderboard_snapshot(
+                season_name=pk,
+                limit=limit,
+                cursor=cursor
+            )
+            rankings: List[SeasonLeaderboardDto] = snapshot.value['results']
+            return self.__page_response(request, rankings, snapshot)
+        except ValidationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=True, methods=['GET'])
+    def my_season(self, request, pk=None) -> Response:
+        """
+        GET /api/v1/leaderboard/{season}/my_season/
+        Get the current user's rank in a season (pk is the season name, or "current")
+        """
+        try:
+            ranking: SeasonRankDto = self.season_service.get_user_season_rank(
+                season_name=pk,
+                user_id=request.user.id
+            )
+            return Response(ranking, status=status.HTTP_200_OK)
+        except ValidationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @staticmethod
+    def __int_param(request, name: str, default: int) -> int:
+        try:
+            return int(request.query_params.get(name, default))
+        except ValueError:
+            raise ValidationError(f"{name} must be an integer")
+
+    def __page_params(self, request) -> tuple[int, str | None]:
+        """
+        ?limit= (clamped server-side) and ?cursor= taken from a previous page's X-Next-Cursor header
+        """
+        return self.__int_param(request, 'limit', 10), request.query_params.get('cursor')
+
+    @staticmethod
+    def __page_response(request, rankings: list, snapshot: Snapshot) -> Response:
+        next_cursor = snapshot.value['next_cursor']
+        return conditional_response(
+            request,
+            rankings,
+            snapshot.etag,
+            headers={"X-Next-Cursor": next_cursor} if next_cursor else None
+        )
@@ -0,0 +1,59 @@
+import logging
+from django.views import View
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse, HttpResponseBase
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from src.service_module import ServiceModule
+from src.service.leaderboard_broadcaster import LeaderboardBroadcaster
+
+
+class LeaderboardStreamController(View):
+    """
+    Server-Sent Events stream of leaderboard changes, needs the ASGI application (the Dockerfile serves it
+    with uvicorn). Under WSGI every subscriber would hold a worker thread and the stream is buffered until
+    it ends, so it answers 501 there instead
+    """
+    base_route = "api/v1/leaderboard/stream"
+    logger = logging.getLogger(__name__)
+
+    async def get(self, request) -> HttpResponseBase:
+        """
+        GET /api/v1/leaderboard/stream/?range=2
+        Stream the top of the global leaderboard and the current user's neighbourhood as they change
+        """
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({"error": "Streaming needs the server to run the ASGI application"}, status=501)
+
+        try:
+            user_and_token = await sync_to_async(JWTAuthentication().authenticate)(request)
+        except AuthenticationFailed as e:
+            return JsonResponse({"error": str(e)}, status=401)
+        if user_and_token is None:
+            return JsonResponse({"error": "Authentication credentials were not provided"}, status=401)
+
+        try:
+            range_value = int(request.GET.get('range', 2))
+        except ValueError:
+            return JsonResponse({"error": "range must be an integer"}, status=400)
+
+        broadcaster = ServiceModule().leaderboard_broadcaster
+        response = StreamingHttpResponse(
+            self.__events(broadcaster, user_and_token[0].id, range_value),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # stop reverse proxies from buffering the stream
+        return response
+
+    @staticmethod
+    async def __events(broadcaster: LeaderboardBroadcaster, user_id: int, range_value: int):
+        yield f"retry: {int(settings.LEADERBOARD_STREAM_INTERVAL_SECONDS * 1000)}\n\n"
+        async for event in broadcaster.subscribe(
+                user_id=user_id,
+                range=range_value,
+                heartbeat_seconds=settings.LEADERBOARD_STREAM_HEARTBEAT_SECONDS
+        ):
+            yield ": keepalive\n\n" if event is None else LeaderboardBroadcaster.encode(event)
@@ -4,10 +4,13 @@ from src.rest.dto.owned_skin_dto import OwnedSkinDto
 from src.rest.dto.skin_equip_dto import SkinEquipDto
 from src.rest.dto.skin_stats_dto import SkinStatsDto
 from src.rest.dto.skin_purchase_dto import SkinPurchaseDto
+from django.conf import settings
+from django.http import HttpResponse, FileResponse
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.exceptions import ValidationError
+from src.rest.conditional_response import etag_matches
 from src.service_module import ServiceModule
 
 
@@ -90,3 +93,54 @@ class SkinController(viewsets.ViewSet):
             return Response(stats, status=status.HTTP_200_OK)
         except ValidationError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=True, methods=['GET'])
+    def image(self, request, pk=None) -> HttpResponse:
+        """
+        GET /api/v1/skins/{skin_id}/image/
+        Get the full-size image of a skin, 304 when the client's copy is still current
+        """
+        return self.__asset_response(request, pk, 'image')
+
+    @action(detail=True, methods=['GET'])
+    def thumbnail(self, request, pk=None) -> HttpResponse:
+        """
+        GET /api/v1/skins/{skin_id}/thumbnail/?size=128
+        Get the thumbnail of a skin, 304 when the client's copy is still current
+        With ?size= (one of the skin's thumbnail_sizes) a WebP resized to that longest side instead
+        """
+        return self.__asset_response(request, pk, 'thumbnail')
+
+    def __asset_response(self, request, skin_id, asset: str) -> HttpResponse:
+        """
+        Image bytes with a strong ETag, the blob is only read when the client doesn't already have it
+        Sent by the front proxy when SKIN_ASSET_ACCEL_REDIRECT_PREFIX is set, streamed by the app otherwise
+        """
+        try:
+            size = request.query_params.get('size')
+            try:
+                size = int(size) if size is not None else None
+            except ValueError:
+                raise ValidationError("size must be an integer")
+
+            etag = self.skin_service.get_skin_asset_etag(skin_id, asset, size)
+            headers = {
+                "ETag": etag,
+                "Cache-Control": f"public, max-age={settings.SKIN_ASSET_MAX_AGE_SECONDS}"
+            }
+            if etag_matches(request, etag):
+                return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+            if settings.SKIN_ASSET_ACCEL_REDIRECT_PREFIX:
+                location = self.skin_service.get_skin_asset_location(skin_id, asset, size)
+                if location is not None:
+                    # The proxy sends the file itself (sendfile() from its own workers), none of it passes through us
+                    path, content_type = location
+                    headers["X-Accel-Redirect"] = settings.SKIN_ASSET_ACCEL_REDIRECT_PREFIX.rstrip('/') + '/' + path
+                    return HttpResponse(content_type=content_type, headers=headers)
+
+            file, content_type = self.skin_service.get_skin_asset(skin_id, asset, size)
+            # Under ASGI there is no file wrapper to sendfile() it, Django reads the whole file into memory and sends it
+            return FileResponse(file, content_type=content_type, headers=headers)
+        except ValidationError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
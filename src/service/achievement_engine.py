@@ -0,0 +1,226 @@
+import logging
+import threading
+from typing import List, Optional, Iterable
+from datetime import date, datetime, timedelta
+from dataclasses import dataclass
+from django.utils import timezone
+from django.db import transaction, IntegrityError
+from rest_framework.exceptions import ValidationError
+from src.models.items import Item
+from src.models.achievement import Achievement
+from src.models.achievement_progress import AchievementProgress
+from src.cache.item_catalog import ItemCatalog, CatalogItem
+from src.cache.shared_version import SharedVersion
+from src.service.skin_service import SkinService
+
+
+@dataclass(frozen=True)
+class AchievementRule:
+    id: int
+    code: str
+    name: str
+    kind: str
+    reward_skin_id: Optional[int]
+    target: int  # counter value that completes it, for COLLECTION the number of matching catalog items
+
+
+@dataclass(frozen=True)
+class AchievementRuleSet:
+    version: tuple[int, int]  # (achievements version, item catalog version)
+    # Rules by the (category, rarity) a discovery must have to advance them, None matching any value
+    by_filter: dict[tuple[Optional[str], Optional[str]], tuple[AchievementRule, ...]]
+
+
+class AchievementEngine:
+    """
+    Grants achievements as discoveries come in, without rescanning anyone's history
+
+    Active achievements are compiled into rules indexed by the (category, rarity) filter they count,
+    so a discovery only looks at the rules it can advance: one query for the user's counters of those
+    rules, one write for the changed ones, and a skin grant for each rule it completes. Nothing is read
+    when no rule matches. The rule set is rebuilt when an Achievement is saved or deleted, or the item
+    catalog changes (COLLECTION targets depend on it).
+
+    Counters only see discoveries made while their achievement exists, run rebuild_achievement_progress
+    after adding one to count earlier discoveries.
+    """
+    VERSION = SharedVersion('achievements')
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, item_catalog: ItemCatalog, skin_service: SkinService):
+        self.__item_catalog = item_catalog
+        self.__skin_service = skin_service
+        self.__rule_set = None  # type: Optional[AchievementRuleSet]
+        self.__lock = threading.Lock()
+
+    def record_discovery(self, user_id: int, item: Item | CatalogItem, discovered_at: datetime) -> List[dict]:
+        """
+        Advance the user's counters for a new discovery, must run in the transaction recording it
+        with the user row locked. Returns the achievements it completed
+        """
+        rules = self.__matching_rules(item)
+        if not rules:
+            return []
+
+        progress = {entry.achievement_id: entry for entry in AchievementProgress.objects.filter(
+            user_id=user_id,
+            achievement_id__in=[rule.id for rule in rules]
+        )}
+        created, updated, completed = [], [], []
+        day = timezone.localtime(discovered_at).date()
+        for rule in rules:
+            entry = progress.get(rule.id)
+            if entry is None:
+                entry = AchievementProgress(user_id=user_id, achievement_id=rule.id)
+                created.append(entry)
+            elif entry.completed_at is not None:
+                continue
+            else:
+                updated.append(entry)
+
+            self.__advance(entry, rule, day)
+            if entry.value >= rule.target:
+                entry.completed_at = discovered_at
+                completed.append(rule)
+
+        AchievementProgress.objects.bulk_create(created)
+        AchievementProgress.objects.bulk_update(updated, ['value', 'last_day', 'completed_at'])
+        return [self.__reward(user_id, rule) for rule in completed]
+
+    def rebuild_progress(self, user_id: int, categories: List[dict], days: List[date]) -> List[dict]:
+        """
+        Recompute every counter of a user from their discovery totals per (category, rarity) and the days
+        they discovered anything on, as returned by DiscoveryRepository. Completed achievements stay
+        completed. Returns the achievements completed by the rebuild
+        """
+        rule_set = self.__rules()
+        progress = {entry.achievement_id: entry for entry in AchievementProgress.objects.filter(user_id=user_id)}
+        streak, last_day = self.__trailing_streak(days)
+        longest_streak = self.__longest_streak(days)
+        now = timezone.now()
+
+        changed, completed = [], []
+        for (category, rarity), rules in rule_set.by_filter.items():
+            count = sum(
+                total['count'] for total in categories
+                if category in (None, total['category']) and rarity in (None, total['rarity'])
+            )
+            for rule in rules:
+                entry = progress.get(rule.id) or AchievementProgress(user_id=user_id, achievement_id=rule.id)
+                if entry.completed_at is not None:
+                    continue
+                if rule.kind == Achievement.STREAK:
+                    # Only the streak still running can be continued, but any earlier one long enough counts
+                    entry.value, entry.last_day = streak, last_day
+                    reached = longest_streak >= rule.target
+                else:
+                    entry.value = count
+                    reached = count >= rule.target
+                if reached:
+                    entry.completed_at = now
+                    completed.append(rule)
+                changed.append(entry)
+
+        AchievementProgress.objects.bulk_create([entry for entry in changed if entry.pk is None])
+        AchievementProgress.objects.bulk_update(
+            [entry for entry in changed if entry.pk is not None],
+            ['value', 'last_day', 'completed_at']
+        )
+        return [self.__reward(user_id, rule) for rule in completed]
+
+    @classmethod
+    def invalidate(cls, *args, **kwargs) -> None:
+        """Signal receiver, makes every process recompile the rules once the change is committed"""
+        cls.VERSION.bump()
+
+    def __matching_rules(self, item: Item | CatalogItem) -> List[AchievementRule]:
+        by_filter = self.__rules().by_filter
+        return [
+            rule
+            for key in ((None, None), (item.category, None), (None, item.rarity), (item.category, item.rarity))
+            for rule in by_filter.get(key, ())
+        ]
+
+    def __rules(self) -> AchievementRuleSet:
+        catalog = self.__item_catalog.snapshot()
+        version = (self.VERSION.get(), catalog.version)
+        rule_set = self.__rule_set
+        if rule_set is None or rule_set.version != version:
+            with self.__lock:
+                rule_set = self.__rule_set
+                if rule_set is None or rule_set.version != version:
+                    rule_set = self.__rule_set = self.__compile(version, catalog.items)
+        return rule_set
+
+    @staticmethod
+    def __compile(version: tuple[int, int], items: Iterable[CatalogItem]) -> AchievementRuleSet:
+        items = list(items)
+        by_filter = {}
+        for achievement in Achievement.objects.filter(active=True).order_by('id'):
+            if achievement.kind == Achievement.COLLECTION:
+                target = sum(
+                    1 for item in items
+                    if achievement.category in (None, item.category) and achievement.rarity in (None, item.rarity)
+                )
+            else:
+                target = achievement.threshold or 1
+            if target == 0:
+                continue  # a collection of no items can't be completed by a discovery
+
+            # Any discovery continues a streak
+            key = (None, None) if achievement.kind == Achievement.STREAK else (achievement.category, achievement.rarity)
+            by_filter.setdefault(key, []).append(AchievementRule(
+                id=achievement.id,
+                code=achievement.code,
+                name=achievement.name,
+                kind=achievement.kind,
+                reward_skin_id=achievement.reward_skin_id,
+                target=target
+            ))
+        return AchievementRuleSet(
+            version=version,
+            by_filter={key: tuple(rules) for key, rules in by_filter.items()}
+        )
+
+    @staticmethod
+    def __advance(entry: AchievementProgress, rule: AchievementRule, day: date) -> None:
+        if rule.kind != Achievement.STREAK:
+            entry.value += 1
+        elif entry.last_day != day:
+            # Discoveries arrive in order, so the streak either continues from yesterday or starts over
+            entry.value = entry.value + 1 if entry.last_day == day - timedelta(days=1) else 1
+            entry.last_day = day
+
+    @staticmethod
+    def __trailing_streak(days: List[date]) -> tuple[int, Optional[date]]:
+        """Length and last day of the streak ending on the latest of the ascending `days`"""
+        if not days:
+            return 0, None
+        streak = 1
+        while streak < len(days) and (days[-streak] - days[-streak - 1]).days == 1:
+            streak += 1
+        return streak, days[-1]
+
+    @staticmethod
+    def __longest_streak(days: List[date]) -> int:
+        longest = current = min(len(days), 1)
+        for previous, day in zip(days, days[1:]):
+            current = current + 1 if (day - previous).days == 1 else 1
+            longest = max(longest, current)
+        return longest
+
+    def __reward(self, user_id: int, rule: AchievementRule) -> dict:
+        if rule.reward_skin_id is not None:
+            try:
+                # Savepoint, a failed grant must not abort the discovery's transaction
+                with transaction.atomic():
+                    self.__skin_service.award_skin(user_id, rule.reward_skin_id, "ACHIEVEMENT")
+            except (ValidationError, IntegrityError) as e:
+                # Already owned (bought or granted before, or by a purchase racing this grant), the
+                # achievement still counts
+                self.logger.info(f"Achievement {rule.code} of user {user_id} granted no skin: {e}")
+        return {
+            "code": rule.code,
+            "name": rule.name,
+            "reward_skin_id": rule.reward_skin_id
+        }
@@ -1,17 +1,21 @@
 import logging
+from django.conf import settings
+from django.utils import timezone
 from django.contrib.auth.hashers import check_password
 from rest_framework_simplejwt.tokens import RefreshToken
 from src.models.user import User
 from typing import Tuple
 from rest_framework.exceptions import ValidationError
 from src.repository.user_repository import UserRepository
+from src.service.task_runner import TaskRunner
 
 
 class AuthService:
     logger = logging.getLogger(__name__)
 
-    def __init__(self, user_repository: UserRepository):
+    def __init__(self, user_repository: UserRepository, task_runner: TaskRunner):
         self.__user_repository = user_repository
+        self.__task_runner = task_runner
 
     def login(self, username: str, password: str) -> Tuple[User, str]:
         """
@@ -31,8 +35,14 @@ class AuthService:
             self.logger.info(f"Login attempt for inactive user: {username}")
             raise ValidationError("Account is deactivated")
 
-        # Update last login
-        self.__user_repository.update_last_login(user.id)
+        # Update last login after responding, repeated logins within the coalescing window write once
+        self.__task_runner.submit(
+            ('last_login', user.id),
+            self.__user_repository.update_last_login,
+            user.id,
+            timezone.now(),
+            delay_seconds=settings.LAST_LOGIN_COALESCE_SECONDS
+        )
 
         # Generate token using Simple JWT
         refresh = RefreshToken.for_user(user)
@@ -1,22 +1,38 @@
 import base64
-from typing import List
-from django.db.models import Sum
+from typing import List, Optional
+from datetime import datetime
+from django.conf import settings
 from src.llm.llm_provider_factory import LLMProviderFactory
 from src.llm.llm_type import LlmType
 from src.models.items import Item
-from django.db.models import Count
+from src.cache.item_catalog import ItemCatalog
 from datetime import timedelta
 from django.utils import timezone
 from src.service.points_service import PointsService
-from src.models.user_discoveries import UserDiscovery
+from src.service.popularity_service import PopularityService
+from src.service.scan_analytics_service import ScanAnalyticsService
 from src.repository.user_repository import UserRepository
+from src.repository.discovery_repository import DiscoveryRepository
 from rest_framework.exceptions import ValidationError
+from src.util.cursor import encode_cursor, decode_cursor
 
 
 class DiscoveryService:
-    def __init__(self, user_repository: UserRepository, points_service: PointsService):
+    def __init__(
+            self,
+            user_repository: UserRepository,
+            discovery_repository: DiscoveryRepository,
+            points_service: PointsService,
+            item_catalog: ItemCatalog,
+            popularity_service: PopularityService,
+            scan_analytics_service: ScanAnalyticsService
+    ):
         self.__user_repository = user_repository
+        self.__discovery_repository = discovery_repository
         self.__points_service = points_service
+        self.__item_catalog = item_catalog
+        self.__popularity_service = popularity_service
+        self.__scan_analytics_service = scan_analytics_service
 
     def process_discovery(self, user_id: int, encoded_image: base64) -> dict:
         """
@@ -33,13 +49,14 @@ class DiscoveryService:
         except Exception as e:
             raise ValidationError({"detail": f"Error processing image: {str(e)}"})
 
-        try:
-            item = Item.objects.get(name__iexact=item_name)
-        except Item.DoesNotExist:
+        self.__scan_analytics_service.record_scan(user_id, item_name)
+
+        item = self.__item_catalog.find_by_name(item_name)
+        if item is None:
             raise ValidationError({"detail": f"Item '{item_name}' not recognized in our database"})
 
         # Check for existing discovery
-        if UserDiscovery.objects.filter(user_id=user_id, item_id=item.id).exists():
+        if item.id in self.__user_repository.get_discovered_items(user):
             raise ValidationError({"detail": f"You have already discovered {item_name}"})
 
         # Award points and record discovery
@@ -55,61 +72,71 @@ class DiscoveryService:
             "threat_level": item.threat_level
         }
 
-    def get_user_discoveries(self, user_id: int) -> List[dict]:
-        """Get all discoveries for a user"""
-        if not self.__user_repository.find_by_id(user_id):
-            raise ValidationError("User not found")
-
-        discoveries = UserDiscovery.objects.filter(user_id=user_id).order_by('-discovered_at')
+    def get_user_discoveries(
+            self,
+            user_id: int,
+            limit: int = 50,
+            cursor: Optional[str] = None,
+            category: Optional[str] = None,
+            rarity: Optional[str] = None
+    ) -> dict:
+        """
+        Get a page of a user's discoveries, newest first, optionally filtered by item category and rarity
+        Paged by keyset on (discovered_at, id), one query per page plus one when it reaches archived discoveries
+        """
+        limit = max(1, min(limit, settings.DISCOVERY_HISTORY_MAX_PAGE_SIZE))
+        self.__validate_choice('category', category)
+        self.__validate_choice('rarity', rarity)
+
+        values = decode_cursor(cursor, 2)
+        discoveries = self.__discovery_repository.history_page(
+            user_id,
+            limit + 1,
+            after=self.__parse_history_cursor(values) if values is not None else None,
+            category=category,
+            rarity=rarity
+        )
 
-        return [{
-            "item_name": discovery.item.name,
-            "category": discovery.item.category,
-            "points_awarded": discovery.points_awarded,
-            "discovered_at": discovery.discovered_at,
-            "rarity": discovery.item.rarity
-        } for discovery in discoveries]
+        page = discoveries[:limit]
+        return {
+            "results": [{
+                "item_name": discovery['item__name'],
+                "category": discovery['category'],
+                "points_awarded": discovery['points_awarded'],
+                "discovered_at": discovery['discovered_at'],
+                "rarity": discovery['rarity']
+            } for discovery in page],
+            "next_cursor": encode_cursor(
+                page[-1]['discovered_at'].isoformat(), page[-1]['id']
+            ) if len(discoveries) > limit else None
+        }
 
     def get_discovery_statistics(self, user_id: int) -> dict:
-        """Get statistics about user's discoveries"""
-        if not self.__user_repository.find_by_id(user_id):
-            raise ValidationError("User not found")
-
-        discoveries = UserDiscovery.objects.filter(user_id=user_id)
-
-        # Category breakdown
-        category_counts = discoveries.values('item__category').annotate(
-            count=Count('id')
-        )
-        # Rarity breakdown
-        rarity_counts = discoveries.values('item__rarity').annotate(
-            count=Count('id')
-        )
-        # Calculate environmental impact
-        total_decomposition_time = sum(
-            discovery.item.average_decomposition_time
-            for discovery in discoveries
-        )
-        # Recent discoveries
-        recent_discoveries = discoveries.filter(
-            discovered_at__gte=timezone.now() - timedelta(days=7)
-        ).count()
+        """
+        Get statistics about user's discoveries
+        Totals come grouped by (category, rarity), at most 16 rows each from recent discoveries and archived
+        rollups, the last 7 days are counted in the same grouped query over recent discoveries (never archived)
+        """
+        week_ago = timezone.now() - timedelta(days=7)
+        groups = self.__discovery_repository.totals_by_category_and_rarity(user_id, recent_since=week_ago)
+
+        categories, rarities = {}, {}
+        total_discoveries = total_points = total_decomposition_time = last_7_days = 0
+        for group in groups:
+            last_7_days += group['recent']
+            categories[group['category']] = categories.get(group['category'], 0) + group['count']
+            rarities[group['rarity']] = rarities.get(group['rarity'], 0) + group['count']
+            total_discoveries += group['count']
+            total_points += group['points']
+            total_decomposition_time += group['decomposition_time']
 
         return {
-            "total_discoveries": discoveries.count(),
-            "categories": {
-                item['item__category']: item['count']
-                for item in category_counts
-            },
-            "rarities": {
-                item['item__rarity']: item['count']
-                for item in rarity_counts
-            },
+            "total_discoveries": total_discoveries,
+            "categories": categories,
+            "rarities": rarities,
             "total_decomposition_years": round(total_decomposition_time / 365, 2),
-            "discoveries_last_7_days": recent_discoveries,
-            "total_points_from_discoveries": discoveries.aggregate(
-                total=Sum('points_awarded')
-            )['total'] or 0
+            "discoveries_last_7_days": last_7_days,
+            "total_points_from_discoveries": total_points
         }
 
     def get_unique_discoveries(self, user_id: int) -> List[str]:
@@ -117,36 +144,74 @@ class DiscoveryService:
         if not self.__user_repository.find_by_id(user_id):
             raise ValidationError("User not found")
 
-        return list(UserDiscovery.objects.filter(user_id=user_id)
-                    .values_list('item__name', flat=True))
+        catalog = self.__item_catalog.snapshot().by_id
+        return [catalog[item_id].name for item_id in self.__discovery_repository.item_ids_for_user(user_id)
+                if item_id in catalog]
 
     def get_undiscovered_items(self, user_id: int) -> List[dict]:
         """Get list of items not yet discovered by user"""
-        if not self.__user_repository.find_by_id(user_id):
+        user = self.__user_repository.find_by_id(user_id)
+        if not user:
             raise ValidationError("User not found")
 
-        discovered_items = UserDiscovery.objects.filter(user_id=user_id).values_list('item_id', flat=True)
-        undiscovered = Item.objects.exclude(id__in=discovered_items)
+        discovered_items = self.__user_repository.get_discovered_items(user)
 
         return [{
             "name": item.name,
             "category": item.category,
             "rarity": item.rarity,
             "point_value": item.point_value
-        } for item in undiscovered]
+        } for item in self.__item_catalog.all() if item.id not in discovered_items]
 
-    @staticmethod
-    def get_popular_discoveries() -> List[dict]:
+    def get_collection_progress(self, user_id: int) -> dict:
+        """Share of the item catalog the user has discovered, overall and per category"""
+        user = self.__user_repository.find_by_id(user_id)
+        if not user:
+            raise ValidationError("User not found")
+
+        discovered_items = self.__user_repository.get_discovered_items(user)
+
+        totals, discovered = {}, {}
+        for item in self.__item_catalog.all():
+            totals[item.category] = totals.get(item.category, 0) + 1
+            if item.id in discovered_items:
+                discovered[item.category] = discovered.get(item.category, 0) + 1
+
+        total_items = sum(totals.values())
+        total_discovered = sum(discovered.values())
+        return {
+            "discovered": total_discovered,
+            "total": total_items,
+            "completion_percentage": round(100 * total_discovered / total_items, 2) if total_items else 0,
+            "categories": {
+                category: {
+                    "discovered": discovered.get(category, 0),
+                    "total": total,
+                    "completion_percentage": round(100 * discovered.get(category, 0) / total, 2)
+                } for category, total in totals.items()
+            }
+        }
+
+    def get_popular_discoveries(self) -> List[dict]:
         """Get most commonly discovered items across all users"""
-        popular_items = UserDiscovery.objects.values(
-            'item__name',
-            'item__category'
-        ).annotate(
-            discovery_count=Count('id')
-        ).order_by('-discovery_count')[:10]
+        return self.__popularity_service.get_popular(limit=10)
 
-        return [{
-            "item_name": item['item__name'],
-            "category": item['item__category'],
-            "times_discovered": item['discovery_count']
-        } for item in popular_items]
+    def get_trending_discoveries(self) -> List[dict]:
+        """Get items discovered most often recently, older discoveries count for exponentially less"""
+        return self.__popularity_service.get_trending(limit=10)
+
+    @staticmethod
+    def __validate_choice(field: str, value: Optional[str]) -> None:
+        if value and value not in dict(Item._meta.get_field(field).choices):
+            raise ValidationError(f"Invalid {field}: {value}")
+
+    @staticmethod
+    def __parse_history_cursor(values: list) -> tuple[datetime, int]:
+        """(discovered_at, id) of the last discovery on the previous page"""
+        try:
+            discovered_at = datetime.fromisoformat(values[0])
+        except (TypeError, ValueError):
+            raise ValidationError("Invalid cursor")
+        if not isinstance(values[1], int):
+            raise ValidationError("Invalid cursor")
+        return discovered_at, values[1]
@@ -0,0 +1,125 @@
+import logging
+from typing import Callable
+from functools import partial
+from datetime import datetime, timedelta
+from concurrent.futures import Future, ThreadPoolExecutor
+from django.utils import timezone
+from django.db.models import Q
+from django.db import connections, transaction, IntegrityError
+from src.models.outbox_event import OutboxEvent
+from src.models.outbox_delivery import OutboxDelivery
+
+
+class EventBus:
+    """
+    Transactional outbox with in-process delivery
+
+    publish() writes an OutboxEvent in the caller's transaction, so an event exists exactly when the change
+    it describes was committed. Once it is, the event is handed to a thread pool that runs every handler
+    subscribed to its topic. Each handler runs in its own transaction together with an OutboxDelivery row
+    keyed by (event, handler name), which makes redeliveries skip handlers that already committed.
+
+    Delivery is at least once: events whose process died before delivering them, and events whose handlers
+    failed (retried with exponential backoff), are picked up by dispatch_due(), see the dispatch_events command.
+    Handlers must not depend on the order events are delivered in.
+    """
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, workers: int, lease_seconds: float, max_backoff_seconds: float):
+        self.__lease = timedelta(seconds=lease_seconds)
+        self.__max_backoff_seconds = max_backoff_seconds
+        self.__handlers = {}  # type: dict[str, dict[str, Callable[[dict], None]]]
+        self.__executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='event-bus')
+
+    def subscribe(self, topic: str, name: str, handler: Callable[[dict], None]) -> None:
+        """Run `handler` with the payload of every event of `topic`, `name` must never change once events exist"""
+        self.__handlers.setdefault(topic, {})[name] = handler
+
+    def publish(self, topic: str, payload: dict) -> OutboxEvent:
+        """Record an event in the current transaction, delivered in the background once it commits"""
+        event = OutboxEvent.objects.create(topic=topic, payload=payload)
+        transaction.on_commit(partial(self.__schedule, event.id))
+        return event
+
+    def dispatch(self, event_id: int) -> bool:
+        """Deliver one event to the handlers it hasn't reached yet, False when it wasn't due or not all succeeded"""
+        now = timezone.now()
+        claimed = OutboxEvent.objects.filter(
+            Q(lease_until__isnull=True) | Q(lease_until__lt=now),
+            id=event_id,
+            processed_at__isnull=True,
+            available_at__lte=now
+        ).update(lease_until=now + self.__lease)
+        if not claimed:
+            return False  # already delivered, backing off, or held by another dispatcher
+
+        event = OutboxEvent.objects.get(id=event_id)
+        delivered = set(OutboxDelivery.objects.filter(event_id=event_id).values_list('handler', flat=True))
+        failures = []
+        for name, handler in self.__handlers.get(event.topic, {}).items():
+            if name in delivered:
+                continue
+            try:
+                with transaction.atomic():
+                    if not self.__record_delivery(event_id, name):
+                        continue  # delivered by a dispatcher whose lease ran out meanwhile
+                    # Any error of the handler's own, constraint violations included, rolls back the
+                    # delivery record too and leaves the event to be retried
+                    handler(event.payload)
+            except Exception as e:
+                self.logger.exception(f"Handler {name} failed on event {event_id} ({event.topic})")
+                failures.append(f"{name}: {e!r}")
+
+        if failures:
+            backoff = min(2 ** event.attempts, self.__max_backoff_seconds)
+            OutboxEvent.objects.filter(id=event_id).update(
+                attempts=event.attempts + 1,
+                available_at=timezone.now() + timedelta(seconds=backoff),
+                lease_until=None,
+                last_error="\n".join(failures)
+            )
+            return False
+
+        OutboxEvent.objects.filter(id=event_id).update(processed_at=timezone.now(), lease_until=None, last_error="")
+        return True
+
+    def dispatch_due(self, limit: int = 500) -> int:
+        """Deliver up to `limit` events that are due and not held by a dispatcher, returns how many were completed"""
+        now = timezone.now()
+        due = OutboxEvent.objects.filter(
+            Q(lease_until__isnull=True) | Q(lease_until__lt=now),
+            processed_at__isnull=True,
+            available_at__lte=now
+        ).order_by('available_at', 'id').values_list('id', flat=True)[:limit]
+        return sum(self.dispatch(event_id) for event_id in list(due))
+
+    @staticmethod
+    def prune(before: datetime) -> int:
+        """Delete events delivered before `before` with their delivery records, returns the number of events"""
+        _, by_model = OutboxEvent.objects.filter(processed_at__lt=before).delete()
+        return by_model.get(OutboxEvent._meta.label, 0)
+
+    @staticmethod
+    def __record_delivery(event_id: int, handler: str) -> bool:
+        """Claim the delivery of an event to a handler in the current transaction, False if already claimed"""
+        try:
+            # Own savepoint, so only a conflict on this insert reads as "already delivered"
+            with transaction.atomic():
+                OutboxDelivery.objects.create(event_id=event_id, handler=handler)
+            return True
+        except IntegrityError:
+            return False
+
+    def __schedule(self, event_id: int) -> Future:
+        return self.__executor.submit(self.__dispatch_in_worker, event_id)
+
+    def __dispatch_in_worker(self, event_id: int) -> bool:
+        try:
+            return self.dispatch(event_id)
+        except Exception:
+            # Left undelivered, dispatch_due() retries it once the lease runs out
+            self.logger.exception(f"Dispatching event {event_id} failed")
+            raise
+        finally:
+            # Worker threads get their own connections, don't leave them open between jobs
+            connections.close_all()
@@ -0,0 +1,172 @@
+import json
+import time
+import asyncio
+import logging
+from typing import AsyncIterator, List, Optional
+from asgiref.sync import sync_to_async
+from src.cache.snapshot_cache import SnapshotCache
+from src.service.leaderboard_service import LeaderboardService
+
+
+class _Subscriber:
+    __slots__ = ('user_id', 'range', 'updates', 'nearby')
+
+    def __init__(self, user_id: int, range: int):
+        self.user_id = user_id
+        self.range = range
+        self.updates = asyncio.Queue(maxsize=1)  # only the newest pending update is kept
+        self.nearby = []  # type: List[dict]
+
+
+class LeaderboardBroadcaster:
+    """
+    Pushes leaderboard diffs to streaming subscribers of this process
+
+    A single loop wakes up every `interval_seconds`, and only when the leaderboard version moved (or
+    `refresh_seconds` passed) recomputes the top-K once and every subscriber's neighbourhood in one
+    batch, a fixed number of queries however many subscribers are in the shared leaderboard snapshot.
+    Bursts of point changes within an interval therefore collapse into one update, and an idle
+    subscriber costs one parked coroutine and a one-slot queue.
+
+    The version watched is the SnapshotCache's, kept in the Django cache backend. With the default
+    per-process LocMemCache only awards handled by this process bump it, awards handled by other
+    workers reach this process's subscribers on the next `refresh_seconds` rebuild.
+    """
+    logger = logging.getLogger(__name__)
+
+    def __init__(
+            self,
+            leaderboard_service: LeaderboardService,
+            snapshot_cache: SnapshotCache,
+            interval_seconds: float,
+            refresh_seconds: float,
+            top_k: int
+    ):
+        self.__leaderboard_service = leaderboard_service
+        self.__snapshot_cache = snapshot_cache
+        self.__interval_seconds = interval_seconds
+        self.__refresh_seconds = refresh_seconds
+        self.__top_k = top_k
+        self.__subscribers = set()  # type: set[_Subscriber]
+        self.__top = []  # type: List[dict]
+        self.__version = None  # type: Optional[int]
+        self.__refreshed_at = 0.0
+        self.__task = None  # type: Optional[asyncio.Task]
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self.__subscribers)
+
+    async def subscribe(self, user_id: int, range: int, heartbeat_seconds: float) -> AsyncIterator[Optional[dict]]:
+        """
+        Yield leaderboard events for one subscriber, the first one carries the full state
+        None is yielded whenever nothing happened for heartbeat_seconds, so idle connections can be kept alive
+        """
+        subscriber = _Subscriber(user_id, range)
+        top, nearby = await sync_to_async(self.__initial_state)(subscriber)
+        subscriber.nearby = nearby
+        self.__subscribers.add(subscriber)
+        self.__ensure_running()
+        try:
+            yield {
+                "version": self.__version,
+                "top": self.__diff([], top),
+                "nearby": self.__diff([], nearby)
+            }
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber.updates.get(), timeout=heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self.__subscribers.discard(subscriber)
+
+    def __ensure_running(self) -> None:
+        if self.__task is None or self.__task.done():
+            self.__task = asyncio.get_running_loop().create_task(self.__run())
+
+    async def __run(self) -> None:
+        while self.__subscribers:
+            await asyncio.sleep(self.__interval_seconds)
+            try:
+                await self.__tick()
+            except Exception as e:
+                self.logger.error(f"Leaderboard broadcast failed: {str(e)}")
+
+    async def __tick(self) -> None:
+        version = await sync_to_async(self.__snapshot_cache.version)()
+        if version == self.__version and time.monotonic() - self.__refreshed_at < self.__refresh_seconds:
+            return
+
+        subscribers = list(self.__subscribers)
+        top, nearby_by_subscriber = await sync_to_async(self.__compute)(subscribers)
+        top_diff = self.__diff(self.__top, top)
+        self.__top, self.__version, self.__refreshed_at = top, version, time.monotonic()
+
+        for subscriber, nearby in zip(subscribers, nearby_by_subscriber):
+            nearby_diff = self.__diff(subscriber.nearby, nearby)
+            subscriber.nearby = nearby
+            if not top_diff['changed'] and not top_diff['removed'] \
+                    and not nearby_diff['changed'] and not nearby_diff['removed']:
+                continue
+            self.__publish(subscriber, {"version": version, "top": top_diff, "nearby": nearby_diff})
+
+    def __initial_state(self, subscriber: _Subscriber) -> tuple[List[dict], List[dict]]:
+        if self.__version is None:
+            self.__top = self.__leaderboard_service.get_global_leaderboard(self.__top_k)['results']
+            self.__version = self.__snapshot_cache.version()
+            self.__refreshed_at = time.monotonic()
+        return self.__top, self.__nearby(subscriber)
+
+    def __compute(self, subscribers: List[_Subscriber]) -> tuple[List[dict], List[List[dict]]]:
+        top = self.__leaderboard_service.get_global_leaderboard(self.__top_k)['results']
+        return top, self.__leaderboard_service.get_nearby_rankings_for_many([
+            (subscriber.user_id, subscriber.range) for subscriber in subscribers
+        ])
+
+    def __nearby(self, subscriber: _Subscriber) -> List[dict]:
+        try:
+            return self.__leaderboard_service.get_nearby_rankings(subscriber.user_id, subscriber.range)
+        except Exception as e:
+            self.logger.info(f"No neighbourhood for user {subscriber.user_id}: {str(e)}")
+            return []
+
+    @classmethod
+    def __publish(cls, subscriber: _Subscriber, event: dict) -> None:
+        # Coalesce, a subscriber that hasn't drained the previous update receives both as one
+        if subscriber.updates.full():
+            pending = subscriber.updates.get_nowait()
+            event = {
+                "version": event["version"],
+                "top": cls.__merge(pending["top"], event["top"]),
+                "nearby": cls.__merge(pending["nearby"], event["nearby"])
+            }
+        subscriber.updates.put_nowait(event)
+
+    @staticmethod
+    def __diff(previous: List[dict], current: List[dict]) -> dict:
+        """Entries that are new or changed (keyed by username), and usernames that dropped out"""
+        before = {entry['username']: entry for entry in previous}
+        after = {entry['username'] for entry in current}
+        return {
+            "changed": [entry for entry in current if before.get(entry['username']) != entry],
+            "removed": [username for username in before if username not in after]
+        }
+
+    @staticmethod
+    def __merge(older: dict, newer: dict) -> dict:
+        """One diff with the effect of applying older then newer"""
+        changed = {entry['username']: entry for entry in older['changed']}
+        for username in newer['removed']:
+            changed.pop(username, None)
+        changed.update((entry['username'], entry) for entry in newer['changed'])
+        removed = dict.fromkeys(older['removed'] + newer['removed'])
+        return {
+            "changed": list(changed.values()),
+            "removed": [username for username in removed if username not in changed]
+        }
+
+    @staticmethod
+    def encode(event: dict) -> str:
+        """Server-Sent Events framing"""
+        return f"event: leaderboard\ndata: {json.dumps(event, default=str)}\n\n"
@@ -1,95 +1,182 @@
-from typing import List
+from typing import List, Optional, Callable
+from django.conf import settings
 from src.models.user import User
+from src.models.items import Item
+from src.cache.snapshot import Snapshot
+from src.cache.snapshot_cache import SnapshotCache
+from src.cache.leaderboard_snapshot import LeaderboardSnapshot, LeaderboardSnapshotReader
 from datetime import timedelta
 from django.utils import timezone
-from django.db.models.functions import Rank
 from rest_framework.exceptions import ValidationError
-from django.db.models import Count, Sum, Window, F
+from django.db.models import Sum, Q
+from src.util.cursor import encode_cursor, decode_int_cursor
 from src.models.user_discoveries import UserDiscovery
 from src.repository.user_repository import UserRepository
+from src.repository.discovery_repository import DiscoveryRepository
 
 
 class LeaderboardService:
-    def __init__(self, user_repository: UserRepository):
+    MAX_NEARBY_RANGE = 50
+
+    def __init__(
+            self,
+            user_repository: UserRepository,
+            discovery_repository: DiscoveryRepository,
+            snapshot_cache: SnapshotCache,
+            snapshot_reader: LeaderboardSnapshotReader
+    ):
         self.__user_repository = user_repository
+        self.__discovery_repository = discovery_repository
+        self.__snapshot_cache = snapshot_cache
+        self.__snapshot_reader = snapshot_reader
 
-    @staticmethod
-    def get_global_leaderboard(limit: int = 10) -> List[dict]:
-        """Get global leaderboard based on total points earned"""
-        leaderboard = User.objects.filter(
-            is_active=True
-        ).annotate(
-            leaderboard_rank=Window(
-                expression=Rank(),
-                order_by=F('total_points_earned').desc()
+    def refresh_shared_snapshot(self, path: str) -> int:
+        """
+        Write the memory-mapped global ranking every worker reads from, returns the number of users in it
+        Only one process (see the refresh_leaderboard_snapshot command) needs to do this
+        """
+        return LeaderboardSnapshot.write(path, self.__user_repository.iter_leaderboard())
+
+    def get_global_leaderboard_snapshot(self, limit: int = 10, cursor: Optional[str] = None) -> Snapshot:
+        """Versioned snapshot of a global leaderboard page, first pages are shared by every caller"""
+        limit = self.__bounded_page_size(limit)
+        return self.__page_snapshot(
+            ('global', limit),
+            lambda: self.get_global_leaderboard(limit, cursor),
+            cursor
+        )
+
+    def get_weekly_leaderboard_snapshot(self, limit: int = 10, cursor: Optional[str] = None) -> Snapshot:
+        """Versioned snapshot of a weekly leaderboard page, first pages are shared by every caller"""
+        limit = self.__bounded_page_size(limit)
+        return self.__page_snapshot(
+            ('weekly', limit),
+            lambda: self.get_weekly_leaderboard(limit, cursor),
+            cursor
+        )
+
+    def get_category_leaderboard_snapshot(
+            self, category: str, limit: int = 10, cursor: Optional[str] = None
+    ) -> Snapshot:
+        """Versioned snapshot of a category leaderboard page, first pages are shared by every caller"""
+        self.__validate_category(category)  # before it becomes part of a cache key
+        limit = self.__bounded_page_size(limit)
+        return self.__page_snapshot(
+            ('category', category, limit),
+            lambda: self.get_category_leaderboard(category, limit, cursor),
+            cursor
+        )
+
+    def get_global_leaderboard(self, limit: int = 10, cursor: Optional[str] = None) -> dict:
+        """
+        Get a page of the global leaderboard based on total points earned
+        Ordered by (total_points_earned desc, id asc) and paged by keyset, so deep pages cost the same as the first
+        """
+        limit = self.__bounded_page_size(limit)
+        points, last_id, position = self.__decode_page_cursor(cursor)
+
+        shared_snapshot = self.__snapshot_reader.current()
+        if shared_snapshot is not None:
+            return self.__global_page_from_snapshot(shared_snapshot, limit, position)
+
+        leaderboard = User.objects.filter(is_active=True)
+        if cursor:
+            leaderboard = leaderboard.filter(
+                Q(total_points_earned__lt=points) |
+                Q(total_points_earned=points, id__gt=last_id)
             )
-        ).order_by('leaderboard_rank')[:limit]
+        leaderboard = list(leaderboard.order_by(
+            '-total_points_earned', 'id'
+        ).only(
+            'id', 'username', 'display_name', 'total_points_earned', 'rank'
+        )[:limit + 1])
 
-        return [{
-            "rank": entry.leaderboard_rank,
-            "username": entry.username,
-            "display_name": entry.display_name,
-            "total_points": entry.total_points_earned,
-            "rank_title": entry.rank_title
-        } for entry in leaderboard]
+        page = leaderboard[:limit]
+        return {
+            "results": [{
+                "rank": position + idx + 1,
+                "username": entry.username,
+                "display_name": entry.display_name,
+                "total_points": entry.total_points_earned,
+                "rank_title": entry.rank_title
+            } for idx, entry in enumerate(page)],
+            "next_cursor": encode_cursor(
+                page[-1].total_points_earned, page[-1].id, position + len(page)
+            ) if len(leaderboard) > limit else None
+        }
 
-    @staticmethod
-    def get_weekly_leaderboard(limit: int = 10) -> List[dict]:
-        """Get weekly leaderboard based on points earned in the last 7 days"""
+    def get_weekly_leaderboard(self, limit: int = 10, cursor: Optional[str] = None) -> dict:
+        """
+        Get a page of the weekly leaderboard based on points earned in the last 7 days
+        Ordered by (weekly points desc, user id asc) and paged by keyset on the aggregate
+        """
+        limit = self.__bounded_page_size(limit)
+        points, last_id, position = self.__decode_page_cursor(cursor)
         week_ago = timezone.now() - timedelta(days=7)
 
         # Get points earned from discoveries in last week
-        weekly_points = (
-            UserDiscovery.objects.filter(
-                discovered_at__gte=week_ago
-            ).values(
-                'user'
-            ).annotate(
-                weekly_total=Sum('points_awarded')
-            ).order_by('-weekly_total')[:limit]
+        weekly_points = UserDiscovery.objects.filter(
+            discovered_at__gte=week_ago
+        ).values(
+            'user'
+        ).annotate(
+            weekly_total=Sum('points_awarded')
         )
+        if cursor:
+            weekly_points = weekly_points.filter(
+                Q(weekly_total__lt=points) |
+                Q(weekly_total=points, user__gt=last_id)
+            )
+        weekly_points = list(weekly_points.order_by('-weekly_total', 'user')[:limit + 1])
 
-        # Fetch user details for these users
-        users = User.objects.filter(
-            id__in=[entry['user'] for entry in weekly_points]
-        )
-        user_map = {user.id: user for user in users}
+        page = weekly_points[:limit]
+        user_map = self.__user_map([entry['user'] for entry in page])
 
-        return [{
-            "rank": idx + 1,  # 1 based indexing
-            "username": user_map[entry['user']].username,
-            "display_name": user_map[entry['user']].display_name,
-            "weekly_points": entry['weekly_total'],
-            "rank_title": user_map[entry['user']].rank_title
-        } for idx, entry in enumerate(weekly_points)]
+        return {
+            "results": [{
+                "rank": position + idx + 1,  # 1 based indexing
+                "username": user_map[entry['user']].username,
+                "display_name": user_map[entry['user']].display_name,
+                "weekly_points": entry['weekly_total'],
+                "rank_title": user_map[entry['user']].rank_title
+            } for idx, entry in enumerate(page)],
+            "next_cursor": encode_cursor(
+                page[-1]['weekly_total'], page[-1]['user'], position + len(page)
+            ) if len(weekly_points) > limit else None
+        }
 
-    @staticmethod
-    def get_category_leaderboard(category: str, limit: int = 10) -> List[dict]:
-        """Get leaderboard for specific item category discoveries"""
-        category_discoveries = (
-            UserDiscovery.objects.filter(
-                item__category=category
-            ).values(
-                'user'
-            ).annotate(
-                discoveries=Count('id'),
-                points=Sum('points_awarded')
-            ).order_by('-points')[:limit]
-        )
+    def get_category_leaderboard(self, category: str, limit: int = 10, cursor: Optional[str] = None) -> dict:
+        """
+        Get a page of the leaderboard for specific item category discoveries
+        Ordered by (category points desc, user id asc) and paged by keyset on the aggregate
+        """
+        self.__validate_category(category)
+        limit = self.__bounded_page_size(limit)
+        points, last_id, position = self.__decode_page_cursor(cursor)
 
-        users = User.objects.filter(
-            id__in=[entry['user'] for entry in category_discoveries]
+        # Totals span recent discoveries and archived rollups, see DiscoveryRepository
+        category_discoveries = self.__discovery_repository.category_points_page(
+            category,
+            limit + 1,
+            after=(points, last_id) if cursor else None
         )
-        user_map = {user.id: user for user in users}
 
-        return [{
-            "rank": idx + 1,
-            "username": user_map[entry['user']].username,
-            "display_name": user_map[entry['user']].display_name,
-            "discoveries": entry['discoveries'],
-            "points": entry['points'],
-            "category": category
-        } for idx, entry in enumerate(category_discoveries)]
+        page = category_discoveries[:limit]
+        user_map = self.__user_map([entry['user'] for entry in page])
+
+        return {
+            "results": [{
+                "rank": position + idx + 1,
+                "username": user_map[entry['user']].username,
+                "display_name": user_map[entry['user']].display_name,
+                "discoveries": entry['discoveries'],
+                "points": entry['points'],
+                "category": category
+            } for idx, entry in enumerate(page)],
+            "next_cursor": encode_cursor(
+                page[-1]['points'], page[-1]['user'], position + len(page)
+            ) if len(category_discoveries) > limit else None
+        }
 
     def get_user_ranking_details(self, user_id: int) -> dict:
         """Get detailed ranking information for a user"""
@@ -98,7 +185,12 @@ class LeaderboardService:
             raise ValidationError("User not found")
 
         # Get global rank
-        global_rank = self.__user_repository.get_user_rank_position(user_id)
+        shared_snapshot = self.__snapshot_reader.current()
+        snapshot_position = shared_snapshot.position_of(user_id) if shared_snapshot is not None else None
+        if snapshot_position is not None:
+            global_rank = snapshot_position + 1
+        else:
+            global_rank = self.__user_repository.get_user_leaderboard_position(user)
 
         # Get weekly points
         week_ago = timezone.now() - timedelta(days=7)
@@ -108,19 +200,10 @@ class LeaderboardService:
         ).aggregate(total=Sum('points_awarded'))['total'] or 0
 
         # Get category breakdown
-        category_rankings = {}
-        for category in ['PLASTIC', 'METAL', 'GLASS', 'OTHER']:
-            category_rank = UserDiscovery.objects.filter(
-                item__category=category,
-                points_awarded__gt=(
-                        UserDiscovery.objects.filter(
-                            user_id=user_id,
-                            item__category=category
-                        ).aggregate(total=Sum('points_awarded'))['total'] or 0
-                )
-            ).values('user').distinct().count() + 1
-
-            category_rankings[category] = category_rank
+        category_rankings = {
+            category: self.__discovery_repository.count_users_ahead_in_category(user_id, category) + 1
+            for category in ['PLASTIC', 'METAL', 'GLASS', 'OTHER']
+        }
 
         return {
             "username": user.username,
@@ -130,29 +213,151 @@ class LeaderboardService:
             "weekly_points": weekly_points,
             "rank_title": user.rank_title,
             "category_rankings": category_rankings,
-            "total_discoveries": UserDiscovery.objects.filter(user_id=user_id).count()
+            "total_discoveries": self.__discovery_repository.count_for_user(user_id)
         }
 
     def get_nearby_rankings(self, user_id: int, range: int = 2) -> List[dict]:
-        """Get rankings for users nearby in rank (above and below)"""
-        user_rank = self.__user_repository.get_user_rank_position(user_id)
+        """
+        Get rankings for users nearby in rank (above and below)
 
-        nearby_users = User.objects.filter(
-            is_active=True
-        ).annotate(
-            leaderboard_rank=Window(
-                expression=Rank(),
-                order_by=F('total_points_earned').desc()
-            )
-        ).filter(
-            rank__range=(max(1, user_rank - range), user_rank + range)
-        ).order_by('leaderboard_rank')
+        Seeks into the (total_points_earned desc, id asc) index from the user's score, so only
+        about 2 * range rows are read regardless of how many users there are
+        """
+        user = self.__user_repository.find_by_id(user_id)
+        if not user:
+            raise ValidationError("User not found")
 
-        return [{
-            "rank": user.leaderboard_rank,
+        range = max(0, min(range, self.MAX_NEARBY_RANGE))
+
+        shared_snapshot = self.__snapshot_reader.current()
+        if shared_snapshot is not None and shared_snapshot.position_of(user_id) is not None:
+            return self.__nearby_from_snapshot(shared_snapshot, user_id, range)
+
+        position = self.__user_repository.get_user_leaderboard_position(user)
+        return self.__nearby_from_database(user, range, position)
+
+    def get_nearby_rankings_for_many(self, requests: List[tuple[int, int]]) -> List[List[dict]]:
+        """
+        get_nearby_rankings for many (user_id, range) pairs at once, an empty list for unknown users
+
+        Users in the shared snapshot are sliced out of it, with one query for the names of all their
+        neighbours together. The others share one user lookup and one batched position count, only
+        their neighbour seeks are made one user at a time
+        """
+        shared_snapshot = self.__snapshot_reader.current()
+        results = [[] for _ in requests]
+        windows, missing = {}, []
+        for index, (user_id, range) in enumerate(requests):
+            range = max(0, min(range, self.MAX_NEARBY_RANGE))
+            position = shared_snapshot.position_of(user_id) if shared_snapshot is not None else None
+            if position is None:
+                missing.append((index, user_id, range))
+                continue
+            first_position = max(0, position - range)
+            windows[index] = (user_id, first_position, shared_snapshot.top(
+                first_position, position - first_position + range + 1
+            ))
+
+        user_map = self.__user_map([
+            entry_id for _, _, entries in windows.values() for entry_id, _ in entries
+        ])
+        for index, (user_id, first_position, entries) in windows.items():
+            results[index] = self.__nearby_entries(user_map, user_id, first_position, entries)
+
+        if missing:
+            users = self.__user_repository.find_by_ids([user_id for _, user_id, _ in missing])
+            positions = self.__user_repository.get_leaderboard_positions(list(users.values()))
+            for index, user_id, range in missing:
+                if user_id in users:
+                    results[index] = self.__nearby_from_database(users[user_id], range, positions[user_id])
+        return results
+
+    def __nearby_from_database(self, user: User, range: int, position: int) -> List[dict]:
+        above = self.__user_repository.find_ranked_above(user, range)
+        below = self.__user_repository.find_ranked_below(user, range)
+        current = {
+            "id": user.id,
             "username": user.username,
             "display_name": user.display_name,
-            "total_points": user.total_points_earned,
-            "is_current_user": user.id == user_id
-        } for user in nearby_users]
-    
\ No newline at end of file
+            "total_points_earned": user.total_points_earned
+        }
+        nearby_users = list(reversed(above)) + [current] + below
+        first_position = position - len(above)
+
+        return [{
+            "rank": first_position + idx,
+            "username": entry['username'],
+            "display_name": entry['display_name'],
+            "total_points": entry['total_points_earned'],
+            "is_current_user": entry['id'] == user.id
+        } for idx, entry in enumerate(nearby_users)]
+
+    def __global_page_from_snapshot(self, snapshot: LeaderboardSnapshot, limit: int, position: int) -> dict:
+        """Slice a page straight out of the shared snapshot, only the page's users are read from the database"""
+        entries = snapshot.top(position, limit)
+        user_map = self.__user_map([user_id for user_id, _ in entries])
+
+        return {
+            "results": [{
+                "rank": position + idx + 1,
+                "username": user_map[user_id].username,
+                "display_name": user_map[user_id].display_name,
+                "total_points": total_points,
+                "rank_title": user_map[user_id].rank_title
+            } for idx, (user_id, total_points) in enumerate(entries) if user_id in user_map],
+            "next_cursor": encode_cursor(
+                entries[-1][1], entries[-1][0], position + len(entries)
+            ) if entries and position + len(entries) < snapshot.count else None
+        }
+
+    def __nearby_from_snapshot(self, snapshot: LeaderboardSnapshot, user_id: int, range: int) -> List[dict]:
+        position = snapshot.position_of(user_id)
+        first_position = max(0, position - range)
+        entries = snapshot.top(first_position, position - first_position + range + 1)
+        user_map = self.__user_map([entry_id for entry_id, _ in entries])
+        return self.__nearby_entries(user_map, user_id, first_position, entries)
+
+    @staticmethod
+    def __nearby_entries(
+            user_map: dict[int, User], user_id: int, first_position: int, entries: List[tuple[int, int]]
+    ) -> List[dict]:
+        """Nearby rankings from a slice of the snapshot starting at 0-based first_position"""
+        return [{
+            "rank": first_position + idx + 1,
+            "username": user_map[entry_id].username,
+            "display_name": user_map[entry_id].display_name,
+            "total_points": total_points,
+            "is_current_user": entry_id == user_id
+        } for idx, (entry_id, total_points) in enumerate(entries) if entry_id in user_map]
+
+    def __page_snapshot(self, key: tuple, compute: Callable[[], dict], cursor: Optional[str]) -> Snapshot:
+        """First pages are what clients poll, so only those are cached"""
+        if cursor:
+            return self.__snapshot_cache.build(compute)
+        return self.__snapshot_cache.get(key, compute)
+
+    @staticmethod
+    def __validate_category(category: str) -> None:
+        if category not in dict(Item._meta.get_field('category').choices):
+            raise ValidationError("Unknown category")
+
+    @staticmethod
+    def __bounded_page_size(limit: int) -> int:
+        return max(1, min(limit, settings.LEADERBOARD_MAX_PAGE_SIZE))
+
+    @staticmethod
+    def __decode_page_cursor(cursor: Optional[str]) -> tuple[int, int, int]:
+        """(points, id, position) of the last row on the previous page"""
+        values = decode_int_cursor(cursor, 3)
+        if values is None:
+            return 0, 0, 0
+        return values[0], values[1], values[2]
+
+    @staticmethod
+    def __user_map(user_ids: List[int]) -> dict[int, User]:
+        users = User.objects.filter(
+            id__in=user_ids
+        ).only(
+            'id', 'username', 'display_name', 'rank'
+        )
+        return {user.id: user for user in users}
@@ -0,0 +1,75 @@
+from django.conf import settings
+from src.models.user import User
+from src.cache.snapshot_cache import SnapshotCache
+from src.repository.user_repository import UserRepository
+from src.models.points_histogram_bucket import PointsHistogramBucket
+
+
+class PercentileService:
+    """
+    Approximate leaderboard standing from the points histogram
+
+    Users ahead of a score are counted exactly for every bucket above the score's bucket and
+    interpolated linearly inside it, so the estimate is off by at most the number of users in
+    that one bucket. The reported `top_percent_error` is that bound in percentage points
+    (100 * users_in_bucket / total_users). Zero-point users have a bucket of their own and
+    always get an exact answer.
+    """
+
+    def __init__(self, user_repository: UserRepository, snapshot_cache: SnapshotCache):
+        self.__user_repository = user_repository
+        self.__snapshot_cache = snapshot_cache
+
+    def get_standing(self, user: User) -> dict:
+        """
+        Percentile standing of a user, plus their exact leaderboard position when they are close
+        enough to the top (settings.EXACT_LEADERBOARD_POSITION_LIMIT) for the count to be cheap
+        """
+        users_ahead, error = self.estimate_users_ahead(user.total_points_earned)
+        total_users = max(1, self.__histogram()['total_users'])
+
+        leaderboard_position = None
+        if users_ahead <= settings.EXACT_LEADERBOARD_POSITION_LIMIT:
+            leaderboard_position = self.__user_repository.get_user_leaderboard_position(user)
+
+        return {
+            "leaderboard_position": leaderboard_position,
+            "top_percent": round(min(100.0, 100 * (users_ahead + 1) / total_users), 2),
+            "top_percent_error": round(100 * error / total_users, 2)
+        }
+
+    def estimate_users_ahead(self, total_points: int) -> tuple[float, int]:
+        """
+        Estimated number of users with more points than total_points in O(1)
+        Returns tuple of (estimate, max_absolute_error)
+        """
+        histogram = self.__histogram()
+        bucket = PointsHistogramBucket.bucket_for(total_points)
+        lower, upper = PointsHistogramBucket.bounds(bucket)
+        in_bucket = histogram['users'][bucket]
+
+        # Share of the bucket's range strictly above total_points, assuming users spread evenly in it.
+        # The last bucket is open ended, scores past its upper bound have nobody modelled above them
+        share_above = min(1.0, max(0.0, (upper - 1 - total_points) / (upper - lower)))
+        return histogram['users_above'][bucket] + in_bucket * share_above, in_bucket
+
+    def __histogram(self) -> dict:
+        return self.__snapshot_cache.get(('points_histogram',), self.__load_histogram).value
+
+    @staticmethod
+    def __load_histogram() -> dict:
+        """Dense bucket counts and suffix sums, users_above[b] counts users in buckets above b"""
+        size = len(PointsHistogramBucket.LOWER_BOUNDS) - 1
+        users = [0] * size
+        for bucket, count in PointsHistogramBucket.objects.counts().items():
+            users[bucket] = max(0, count)
+
+        users_above = [0] * size
+        for bucket in range(size - 2, -1, -1):
+            users_above[bucket] = users_above[bucket + 1] + users[bucket + 1]
+
+        return {
+            "users": users,
+            "users_above": users_above,
+            "total_users": users_above[0] + users[0]
+        }
@@ -1,22 +1,45 @@
 from typing import List
-from datetime import timedelta
+from itertools import chain
+from datetime import date, timedelta
 from django.utils import timezone
 from src.models.user import User
 from src.models.items import Item
+from src.cache.item_catalog import CatalogItem
+from django.db import transaction
+from src.cache.snapshot_cache import SnapshotCache
 from rest_framework.exceptions import ValidationError
 from src.models.user_discoveries import UserDiscovery
 from src.repository.user_repository import UserRepository
+from src.repository.discovery_repository import DiscoveryRepository
+from src.service.percentile_service import PercentileService
+from src.service.season_service import SeasonService
+from src.service.event_bus import EventBus
+from src.models.outbox_event import OutboxEvent
+from src.service.achievement_engine import AchievementEngine
 from src.rest.dto.points_breakdown_dto import PointsBreakdownDto
 from src.rest.dto.points_history_dto import PointsHistoryDto
-from django.db.models import Sum, Count, Avg, QuerySet
-from django.db.models.functions import Trunc, ExtractHour, TruncDate
 
 
 class PointsService:
-    def __init__(self, user_repository: UserRepository):
+    def __init__(
+            self,
+            user_repository: UserRepository,
+            discovery_repository: DiscoveryRepository,
+            leaderboard_snapshot_cache: SnapshotCache,
+            percentile_service: PercentileService,
+            season_service: SeasonService,
+            event_bus: EventBus,
+            achievement_engine: AchievementEngine
+    ):
         self.__user_repository = user_repository
-
-    def award_points_for_discovery(self, user_id: int, item: Item) -> tuple[int, int]:
+        self.__discovery_repository = discovery_repository
+        self.__leaderboard_snapshot_cache = leaderboard_snapshot_cache
+        self.__percentile_service = percentile_service
+        self.__season_service = season_service
+        self.__event_bus = event_bus
+        self.__achievement_engine = achievement_engine
+
+    def award_points_for_discovery(self, user_id: int, item: Item | CatalogItem) -> tuple[int, int]:
         """
         Award points to user for discovering an item
         Returns tuple of (points_awarded, new_total_points)
@@ -25,36 +48,56 @@ class PointsService:
         - Item rarity
         - Item threat level
         """
-        user = self.__user_repository.find_by_id(user_id)
-        if not user:
-            raise ValidationError("User not found")
-
-        # Check if user already discovered this item
-        if UserDiscovery.objects.filter(user_id=user_id, item_id=item.id).exists():
-            raise ValidationError("Item already discovered by user")
-
-        # Calculate points based on item properties
-        points = self.__calculate_points_for_item(item)
-
-        # Update user's points
-        new_balance = user.points_balance + points
-        new_total = user.total_points_earned + points
-
-        updated_user = self.__user_repository.update_points(
-            user_id=user_id,
-            points_balance=new_balance,
-            total_points=new_total
-        )
-
-        # Update user's rank if needed
-        self.__check_and_update_rank(updated_user)
-
-        # Record the discovery
-        UserDiscovery.objects.create(
-            user_id=user_id,
-            item_id=item.id,
-            points_awarded=points
-        )
+        with transaction.atomic():
+            # Lock the user so concurrent awards can't both pass the duplicate check or lose a bit
+            user = self.__user_repository.find_by_id_for_update(user_id)
+            if not user:
+                raise ValidationError("User not found")
+
+            # Check if user already discovered this item
+            discovered_items = self.__user_repository.get_discovered_items(user)
+            if item.id in discovered_items:
+                raise ValidationError("Item already discovered by user")
+
+            # Calculate points based on item properties
+            points = self.__calculate_points_for_item(item)
+
+            # Update user's points
+            new_balance = user.points_balance + points
+            new_total = user.total_points_earned + points
+
+            updated_user = self.__user_repository.update_points(
+                user_id=user_id,
+                points_balance=new_balance,
+                total_points=new_total
+            )
+
+            # Update user's rank if needed
+            self.__check_and_update_rank(updated_user)
+
+            # Record the discovery
+            discovery = UserDiscovery.objects.create(
+                user_id=user_id,
+                item_id=item.id,
+                points_awarded=points,
+                category=item.category,
+                rarity=item.rarity
+            )
+            discovered_items.add(item.id)
+            self.__user_repository.update_discovered_items(user_id, discovered_items)
+            self.__season_service.record_discovery(user_id, points)
+            # Derived counters that can lag behind are updated by event handlers, outside this transaction
+            self.__event_bus.publish(OutboxEvent.DISCOVERY_RECORDED, {
+                "discovery_id": discovery.id,
+                "user_id": user_id,
+                "item_id": item.id,
+                "points": points,
+                "discovered_at": discovery.discovered_at
+            })
+            self.__achievement_engine.record_discovery(user_id, item, discovery.discovered_at)
+
+            # Leaderboards changed, outdate cached snapshots once the discovery is visible
+            transaction.on_commit(self.__leaderboard_snapshot_cache.bump_version)
 
         return points, new_total
 
@@ -70,16 +113,10 @@ class PointsService:
         if points < 0:
             raise ValidationError("Points to deduct must be positive")
 
-        if user.points_balance < points:
+        new_balance = self.__user_repository.debit_points(user_id, points)
+        if new_balance is None:
             raise ValidationError("Insufficient points balance")
 
-        new_balance = user.points_balance - points
-        self.__user_repository.update_points(
-            user_id=user_id,
-            points_balance=new_balance,
-            total_points=user.total_points_earned  # Total earned doesn't change
-        )
-
         return new_balance, "Points deducted successfully"
 
     def get_points_summary(self, user_id: int) -> dict:
@@ -88,7 +125,7 @@ class PointsService:
         if not user:
             raise ValidationError("User not found")
 
-        rank_position = self.__user_repository.get_user_rank_position(user_id)
+        standing = self.__percentile_service.get_standing(user)
         next_rank_info = self.__get_next_rank_info(user)
 
         return {
@@ -96,14 +133,15 @@ class PointsService:
             "total_earned": user.total_points_earned,
             "current_rank": user.rank,
             "rank_title": user.rank_title,
-            "leaderboard_position": rank_position,
+            "leaderboard_position": standing["leaderboard_position"],
+            "top_percent": standing["top_percent"],
+            "top_percent_error": standing["top_percent_error"],
             "next_rank": next_rank_info["next_rank"],
             "points_to_next_rank": next_rank_info["points_needed"],
-            "discoveries_count": UserDiscovery.objects.filter(user_id=user_id).count()
+            "discoveries_count": self.__discovery_repository.count_for_user(user_id)
         }
 
-    @staticmethod
-    def get_points_history(user_id: int, timeframe: str) -> List[PointsHistoryDto]:
+    def get_points_history(self, user_id: int, timeframe: str) -> List[PointsHistoryDto]:
         """
         Get points history for a specific timeframe ('week', 'month', or 'year')
         """
@@ -114,11 +152,6 @@ class PointsService:
             'year': timezone.now() - timedelta(days=365)
         }[timeframe]
 
-        discoveries = UserDiscovery.objects.filter(
-            user_id=user_id,
-            discovered_at__gte=from_date
-        )
-
         # Group points by appropriate time unit
         group_by = {
             'week': 'day',  # Daily breakdown for week
@@ -126,12 +159,7 @@ class PointsService:
             'year': 'month'  # Monthly breakdown for year
         }[timeframe]
 
-        points_over_time = discoveries.annotate(
-            period=Trunc('discovered_at', group_by)
-        ).values('period').annotate(
-            points=Sum('points_awarded'),
-            discoveries=Count('id')
-        ).order_by('period')
+        points_over_time = self.__discovery_repository.points_by_period(user_id, from_date, group_by)
 
         return [{
             "period": entry['period'],
@@ -146,61 +174,34 @@ class PointsService:
         """
         Get detailed breakdown of how points were earned
         """
-        discoveries = UserDiscovery.objects.filter(user_id=user_id)
-
-        # Breakdown by item category
-        category_breakdown = discoveries.values(
-            'item__category'
-        ).annotate(
-            total_points=Sum('points_awarded'),
-            count=Count('id'),
-            avg_points=Avg('points_awarded')
-        )
-
-        # Breakdown by item rarity
-        rarity_breakdown = discoveries.values(
-            'item__rarity'
-        ).annotate(
-            total_points=Sum('points_awarded'),
-            count=Count('id'),
-            avg_points=Avg('points_awarded')
-        )
+        totals = self.__discovery_repository.totals_by_category_and_rarity(user_id)
+
+        # Breakdown by item category and by item rarity
+        category_breakdown, rarity_breakdown = {}, {}
+        for total in totals:
+            for breakdown, key in ((category_breakdown, total['category']), (rarity_breakdown, total['rarity'])):
+                entry = breakdown.setdefault(key, {"points": 0, "count": 0})
+                entry['points'] += total['points']
+                entry['count'] += total['count']
+        for entry in chain(category_breakdown.values(), rarity_breakdown.values()):
+            entry['average_points'] = round(entry['points'] / entry['count'], 2)
 
         # Time-based patterns
-        time_patterns = discoveries.annotate(
-            hour=ExtractHour('discovered_at')
-        ).values('hour').annotate(
-            total_points=Sum('points_awarded'),
-            count=Count('id')
-        ).order_by('hour')
+        time_patterns = self.__discovery_repository.totals_by_hour(user_id)
 
         # Calculate streaks
-        daily_discoveries = discoveries.annotate(
-            date=TruncDate('discovered_at')
-        ).values('date').distinct()
+        discovery_days = self.__discovery_repository.discovery_days(user_id)
 
-        current_streak = self.__calculate_current_streak(daily_discoveries)
-        longest_streak = self.__calculate_longest_streak(daily_discoveries)
+        current_streak = self.__calculate_current_streak(discovery_days)
+        longest_streak = self.__calculate_longest_streak(discovery_days)
 
+        total_discoveries = sum(total['count'] for total in totals)
+        total_points = sum(total['points'] for total in totals)
         return {
-            "total_discoveries": discoveries.count(),
-            "total_points": discoveries.aggregate(
-                total=Sum('points_awarded')
-            )['total'] or 0,
-            "category_breakdown": {
-                item['item__category']: {
-                    "points": item['total_points'],
-                    "count": item['count'],
-                    "average_points": round(item['avg_points'], 2)
-                } for item in category_breakdown
-            },
-            "rarity_breakdown": {
-                item['item__rarity']: {
-                    "points": item['total_points'],
-                    "count": item['count'],
-                    "average_points": round(item['avg_points'], 2)
-                } for item in rarity_breakdown
-            },
+            "total_discoveries": total_discoveries,
+            "total_points": total_points,
+            "category_breakdown": category_breakdown,
+            "rarity_breakdown": rarity_breakdown,
             "time_patterns": {
                 item['hour']: {
                     "points": item['total_points'],
@@ -210,12 +211,7 @@ class PointsService:
             "engagement_stats": {
                 "current_streak": current_streak,
                 "longest_streak": longest_streak,
-                "daily_average_points": round(
-                    discoveries.aggregate(
-                        avg=Avg('points_awarded')
-                    )['avg'] or 0,
-                    2
-                ),
+                "daily_average_points": round(total_points / total_discoveries, 2) if total_discoveries else 0,
                 "most_productive_hour": max(
                     time_patterns,
                     key=lambda x: x['total_points']
@@ -224,23 +220,10 @@ class PointsService:
         }
 
     @staticmethod
-    def __calculate_points_for_item(item: Item) -> int:
+    def __calculate_points_for_item(item: Item | CatalogItem) -> int:
         """Calculate points for discovering an item based on its properties"""
-        # Base points from item's point_value
-        points = item.point_value
-
-        # Multiply based on rarity
-        rarity_multipliers = {
-            'COMMON': 1,
-            'UNCOMMON': 1.5,
-            'RARE': 2,
-            'EPIC': 3
-        }
-        points *= rarity_multipliers[item.rarity]
-        # Add bonus for threat level (more threatening items = more points)
-        points += (item.threat_level - 1) * 10
-
-        return int(points)  # Round down to nearest integer
+        # Precomputed for catalog items, derived from the row for model instances
+        return item.award_points
 
     def __check_and_update_rank(self, user: User) -> None:
         """Check and update user's rank based on total points"""
@@ -262,12 +245,10 @@ class PointsService:
 
     @staticmethod
     def __calculate_current_streak(
-            daily_discoveries: QuerySet
+            discovery_days: List[date]
     ) -> int:
         """Calculate current consecutive days streak"""
-        dates = [
-            d['date'] for d in daily_discoveries.order_by('-date')
-        ]
+        dates = discovery_days[::-1]
         if not dates:
             return 0
 
@@ -281,12 +262,10 @@ class PointsService:
 
     @staticmethod
     def __calculate_longest_streak(
-            daily_discoveries: QuerySet
+            discovery_days: List[date]
     ) -> int:
         """Calculate longest consecutive days streak"""
-        dates = [
-            d['date'] for d in daily_discoveries.order_by('date')
-        ]
+        dates = discovery_days
         if not dates:
             return 0
 
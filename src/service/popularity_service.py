@@ -0,0 +1,158 @@
+import math
+import random
+from typing import List
+from datetime import datetime, timezone as dt_timezone
+from django.conf import settings
+from django.utils import timezone
+from django.db.models import F, Sum, Case, When, Value, FloatField
+from django.db.models.functions import Greatest, Power
+from src.cache.item_catalog import ItemCatalog
+from src.cache.snapshot_cache import SnapshotCache
+from src.models.user_discoveries import UserDiscovery
+from src.repository.discovery_repository import DiscoveryRepository
+from src.models.item_popularity_counter import ItemPopularityCounter
+
+
+class PopularityService:
+    """
+    Per-item discovery counters and a time-decayed trending score, both updated for every discovery
+
+    The trending score of an item is sum(exp(-decay * age)) over its discoveries. Stored scores are
+    anchored at the start of a day-long epoch, so an award only adds exp(decay * (now - epoch start))
+    and nothing ever has to be decayed in place. A write re-anchors whichever of the stored score and the
+    discovery is older to the newer epoch, so counters end up the same whatever order discoveries arrive
+    in. Reads rescale scores from the previous epoch, older ones have decayed to nothing and are dropped.
+    """
+    EPOCH_SECONDS = 24 * 60 * 60
+
+    def __init__(self, discovery_repository: DiscoveryRepository, item_catalog: ItemCatalog, snapshot_cache: SnapshotCache):
+        self.__discovery_repository = discovery_repository
+        self.__item_catalog = item_catalog
+        self.__snapshot_cache = snapshot_cache
+        self.__decay = math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 60 * 60)
+        # Scores re-anchored this many epochs or more have decayed below 1e-30 of a fresh discovery
+        self.__horizon = math.ceil(30 * math.log(10) / (self.__decay * self.EPOCH_SECONDS))
+
+    def record_discovery(self, item_id: int, discovered_at: datetime | None = None) -> None:
+        """Count a discovery on a random shard of the item's counters"""
+        epoch, weight = self.__epoch_and_weight(discovered_at or timezone.now())
+        shard = random.randrange(settings.POPULARITY_COUNTER_SHARDS)
+
+        counter = ItemPopularityCounter.objects.filter(item_id=item_id, shard=shard)
+        if not counter.update(**self.__increment(epoch, weight)):
+            ItemPopularityCounter.objects.get_or_create(item_id=item_id, shard=shard)
+            counter.update(**self.__increment(epoch, weight))
+
+    def on_discovery_recorded(self, payload: dict) -> None:
+        """EventBus handler of OutboxEvent.DISCOVERY_RECORDED"""
+        self.record_discovery(payload['item_id'], datetime.fromisoformat(payload['discovered_at']))
+
+    def get_popular(self, limit: int = 10) -> List[dict]:
+        """Most discovered items of all time"""
+        return self.__snapshot_cache.get(('popular', limit), lambda: self.__compute_popular(limit)).value
+
+    def get_trending(self, limit: int = 10) -> List[dict]:
+        """Items discovered most in the last few half-lives"""
+        return self.__snapshot_cache.get(('trending', limit), lambda: self.__compute_trending(limit)).value
+
+    def rebuild(self) -> int:
+        """Recompute every counter from recent and archived discoveries, returns the number of items counted"""
+        epoch, _ = self.__epoch_and_weight(timezone.now())
+        epoch_start = datetime.fromtimestamp((epoch - 1) * self.EPOCH_SECONDS, tz=dt_timezone.utc)
+
+        counters = {
+            item_id: ItemPopularityCounter(item_id=item_id, shard=0, discoveries=discoveries)
+            for item_id, discoveries in self.__discovery_repository.count_by_item().items()
+        }
+        recent = UserDiscovery.objects.filter(
+            discovered_at__gte=epoch_start
+        ).values_list('item_id', 'discovered_at').iterator()
+        for item_id, discovered_at in recent:
+            _, weight = self.__epoch_and_weight(discovered_at, epoch)
+            counters[item_id].trending += weight
+            counters[item_id].trending_epoch = epoch
+
+        ItemPopularityCounter.objects.all().delete()
+        ItemPopularityCounter.objects.bulk_create(counters.values(), batch_size=1000)
+        self.__snapshot_cache.bump_version()
+        return len(counters)
+
+    def __compute_popular(self, limit: int) -> List[dict]:
+        popular_items = ItemPopularityCounter.objects.values(
+            'item_id'
+        ).annotate(
+            discovery_count=Sum('discoveries')
+        ).order_by('-discovery_count', 'item_id')[:limit]
+        return self.__labelled(popular_items, 'discovery_count', 'times_discovered')
+
+    def __compute_trending(self, limit: int) -> List[dict]:
+        epoch, _ = self.__epoch_and_weight(timezone.now())
+        trending_items = ItemPopularityCounter.objects.filter(
+            trending_epoch__gte=epoch - 1
+        ).values(
+            'item_id'
+        ).annotate(
+            score=Sum(self.__rescaled_trending(epoch))
+        ).filter(
+            score__gt=0
+        ).order_by('-score', 'item_id')[:limit]
+
+        # Express the score as "discoveries weighted by recency, as of now"
+        now_weight = self.__epoch_and_weight(timezone.now(), epoch)[1]
+        trending = self.__labelled(trending_items, 'score', 'trending_score')
+        for entry in trending:
+            entry['trending_score'] = round(entry['trending_score'] / now_weight, 2)
+        return trending
+
+    def __labelled(self, rows, source: str, target: str) -> List[dict]:
+        catalog = self.__item_catalog.snapshot().by_id
+        return [{
+            "item_name": catalog[row['item_id']].name,
+            "category": catalog[row['item_id']].category,
+            target: row[source]
+        } for row in rows if row['item_id'] in catalog]
+
+    def __increment(self, epoch: int, weight: float) -> dict:
+        """
+        Add a discovery of `epoch` to a counter, re-anchoring whichever of the stored score and the
+        discovery is older. Events can arrive late (see EventBus), so the stored epoch may be the newer one.
+        Anything past the horizon counts as 0, which also keeps Power() clear of underflow
+        """
+        return {
+            "discoveries": F('discoveries') + 1,
+            "trending": Case(
+                When(trending_epoch=epoch, then=F('trending') + weight),
+                When(trending_epoch__gte=epoch + self.__horizon, then=F('trending')),
+                When(
+                    trending_epoch__gt=epoch,
+                    then=F('trending') + weight * self.__epochs_decay(F('trending_epoch') - epoch)
+                ),
+                When(
+                    trending_epoch__gt=epoch - self.__horizon,
+                    then=F('trending') * self.__epochs_decay(epoch - F('trending_epoch')) + weight
+                ),
+                default=Value(weight),
+                output_field=FloatField()
+            ),
+            "trending_epoch": Greatest(F('trending_epoch'), Value(epoch))
+        }
+
+    def __epochs_decay(self, epochs) -> Power:
+        """exp(-decay * epochs * EPOCH_SECONDS), the factor re-anchoring a score `epochs` epochs later"""
+        return Power(Value(math.exp(-self.__decay * self.EPOCH_SECONDS)), epochs, output_field=FloatField())
+
+    def __rescaled_trending(self, epoch: int) -> Case:
+        """The stored score re-anchored to the start of `epoch`"""
+        return Case(
+            When(trending_epoch=epoch, then=F('trending')),
+            When(trending_epoch=epoch - 1, then=F('trending') * math.exp(-self.__decay * self.EPOCH_SECONDS)),
+            default=Value(0.0),
+            output_field=FloatField()
+        )
+
+    def __epoch_and_weight(self, at: datetime, epoch: int | None = None) -> tuple[int, float]:
+        """Epoch containing `at` (unless given) and exp(decay * seconds since that epoch started)"""
+        timestamp = at.timestamp()
+        if epoch is None:
+            epoch = int(timestamp // self.EPOCH_SECONDS)
+        return epoch, math.exp(self.__decay * (timestamp - epoch * self.EPOCH_SECONDS))
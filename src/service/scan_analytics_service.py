@@ -0,0 +1,163 @@
+import os
+import time
+import uuid
+import socket
+import threading
+from typing import List
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.utils import timezone
+from src.models.scan_sketch import ScanSketch
+from src.service.task_runner import TaskRunner
+from src.util.hyperloglog import HyperLogLog
+from src.util.count_min_sketch import CountMinSketch
+
+
+class ScanAnalyticsService:
+    """
+    Approximate scan analytics for ops dashboards, without a row per scan
+
+    Every label the vision model returns (recognized or not) goes into a CountMinSketch for the current
+    ANALYTICS_LABEL_BUCKET_SECONDS bucket, and every scanning user into a HyperLogLog for the current UTC day.
+    Each worker process keeps its sketches in memory and writes them to its own ScanSketch row at most every
+    ANALYTICS_FLUSH_SECONDS, readers merge the rows of all workers. Label counts are overestimated by at most
+    e / width of the scans in the window with probability 1 - exp(-depth), unique scanner counts have a
+    relative standard error of 1.04 / sqrt(2^precision).
+    """
+    LABEL_SKETCH_WIDTH = 1024
+    LABEL_SKETCH_DEPTH = 4
+    LABEL_SKETCH_TOP_K = 50
+    SCANNER_SKETCH_PRECISION = 14
+    MAX_LABEL_LENGTH = 100
+
+    def __init__(self, task_runner: TaskRunner):
+        self.__task_runner = task_runner
+        self.__worker = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.__lock = threading.Lock()
+        self.__labels = {}  # type: dict[datetime, CountMinSketch]
+        self.__scanners = {}  # type: dict[datetime, HyperLogLog]
+        self.__dirty = set()  # type: set[tuple[str, datetime]]
+        self.__last_flush = time.monotonic()
+
+    def record_scan(self, user_id: int, label: str) -> None:
+        """Count one scan of `label` by the user, never raises so analytics can't fail a scan"""
+        now = timezone.now()
+        label_bucket, day = self.__label_bucket(now), self.__day(now)
+        label = label.strip().casefold()[:self.MAX_LABEL_LENGTH]
+
+        with self.__lock:
+            if label_bucket not in self.__labels:
+                self.__labels[label_bucket] = self.__new_label_sketch()
+            if day not in self.__scanners:
+                self.__scanners[day] = HyperLogLog(self.SCANNER_SKETCH_PRECISION)
+            self.__labels[label_bucket].add(label)
+            self.__scanners[day].add(str(user_id))
+            self.__dirty.update({(ScanSketch.LABELS, label_bucket), (ScanSketch.SCANNERS, day)})
+
+            if time.monotonic() - self.__last_flush < settings.ANALYTICS_FLUSH_SECONDS:
+                return
+        # Off the scan's request path, a flush that fails is retried after the next scan
+        self.__task_runner.submit('scan_analytics_flush', self.flush)
+
+    def flush(self) -> None:
+        """Write this worker's changed sketches, then forget buckets no scan can land in anymore"""
+        now = timezone.now()
+        with self.__lock:
+            sketches = [(kind, bucket, self.__sketch(kind, bucket)) for kind, bucket in self.__dirty]
+            pending = [(kind, bucket, sketch, sketch.to_bytes()) for kind, bucket, sketch in sketches]
+            self.__dirty.clear()
+            self.__last_flush = time.monotonic()
+            self.__labels = {bucket: sketch for bucket, sketch in self.__labels.items()
+                             if bucket >= self.__label_bucket(now)}
+            self.__scanners = {day: sketch for day, sketch in self.__scanners.items() if day >= self.__day(now)}
+
+        written = 0
+        try:
+            for kind, bucket, _, data in pending:
+                ScanSketch.objects.update_or_create(
+                    kind=kind,
+                    bucket_start=bucket,
+                    worker=self.__worker,
+                    defaults={"data": data}
+                )
+                written += 1
+        except Exception:
+            # Keep what wasn't written for the next flush, including buckets just trimmed from memory
+            with self.__lock:
+                for kind, bucket, sketch, _ in pending[written:]:
+                    self.__dirty.add((kind, bucket))
+                    (self.__labels if kind == ScanSketch.LABELS else self.__scanners).setdefault(bucket, sketch)
+            raise
+
+        ScanSketch.objects.filter(
+            kind=ScanSketch.LABELS,
+            bucket_start__lt=now - timedelta(hours=settings.ANALYTICS_LABEL_RETENTION_HOURS)
+        ).delete()
+        ScanSketch.objects.filter(
+            kind=ScanSketch.SCANNERS,
+            bucket_start__lt=self.__day(now) - timedelta(days=settings.ANALYTICS_SCANNER_RETENTION_DAYS)
+        ).delete()
+
+    def get_scan_analytics(self, minutes: int = 60, days: int = 7, limit: int = 20) -> dict:
+        """
+        Most scanned labels over the last `minutes` (rounded up to whole buckets) and unique scanners
+        for each of the last `days` UTC days, merged across every worker
+        """
+        minutes = max(1, min(minutes, settings.ANALYTICS_LABEL_RETENTION_HOURS * 60))
+        days = max(1, min(days, settings.ANALYTICS_SCANNER_RETENTION_DAYS))
+        limit = max(1, min(limit, self.LABEL_SKETCH_TOP_K))
+        self.flush()
+
+        now = timezone.now()
+        labels = self.__new_label_sketch()
+        for data in ScanSketch.objects.filter(
+            kind=ScanSketch.LABELS,
+            bucket_start__gte=self.__label_bucket(now - timedelta(minutes=minutes))
+        ).values_list('data', flat=True).iterator():
+            labels.merge(CountMinSketch.from_bytes(bytes(data)))
+
+        first_day = self.__day(now) - timedelta(days=days - 1)
+        scanners_by_day = {first_day + timedelta(days=offset): HyperLogLog(self.SCANNER_SKETCH_PRECISION)
+                           for offset in range(days)}
+        for day, data in ScanSketch.objects.filter(
+            kind=ScanSketch.SCANNERS,
+            bucket_start__gte=first_day
+        ).values_list('bucket_start', 'data').iterator():
+            scanners_by_day[day].merge(HyperLogLog.from_bytes(bytes(data)))
+
+        scanners = HyperLogLog(self.SCANNER_SKETCH_PRECISION)
+        for sketch in scanners_by_day.values():
+            scanners.merge(sketch)
+
+        overcount, failure_probability = labels.error_bound()
+        return {
+            "window_minutes": minutes,
+            "total_scans": labels.total,
+            "top_labels": [{
+                "label": label,
+                "scans": scans
+            } for label, scans in labels.heavy_hitters()[:limit]],
+            "label_overcount_bound": round(overcount, 2),
+            "label_overcount_probability": round(failure_probability, 4),
+            "unique_scanners": scanners.count(),
+            "unique_scanners_by_day": [{
+                "date": day.date(),
+                "unique_scanners": sketch.count()
+            } for day, sketch in sorted(scanners_by_day.items())],
+            "unique_scanners_relative_error": round(scanners.relative_error(), 4)
+        }
+
+    def __sketch(self, kind: str, bucket: datetime) -> CountMinSketch | HyperLogLog:
+        return self.__labels[bucket] if kind == ScanSketch.LABELS else self.__scanners[bucket]
+
+    def __new_label_sketch(self) -> CountMinSketch:
+        return CountMinSketch(self.LABEL_SKETCH_WIDTH, self.LABEL_SKETCH_DEPTH, self.LABEL_SKETCH_TOP_K)
+
+    @staticmethod
+    def __label_bucket(at: datetime) -> datetime:
+        seconds = settings.ANALYTICS_LABEL_BUCKET_SECONDS
+        return datetime.fromtimestamp(at.timestamp() // seconds * seconds, tz=dt_timezone.utc)
+
+    @staticmethod
+    def __day(at: datetime) -> datetime:
+        return at.astimezone(dt_timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
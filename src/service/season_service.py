@@ -0,0 +1,269 @@
+from typing import List, Optional
+from datetime import datetime
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import F, Q
+from rest_framework.exceptions import ValidationError
+from src.models.season import Season
+from src.cache.snapshot import Snapshot
+from src.models.season_score import SeasonScore
+from src.cache.snapshot_cache import SnapshotCache
+from src.cache.shared_version import SharedVersion
+from src.models.season_standing import SeasonStanding
+from src.util.cursor import encode_cursor, decode_int_cursor
+
+
+class SeasonService:
+    ARCHIVE_BATCH_SIZE = 5000
+    # Bumped whenever a Season is saved or deleted (see SrcConfig.ready), so a season ended or archived
+    # by another process stops being handed out here too
+    VERSION = SharedVersion('seasons')
+
+    def __init__(self, snapshot_cache: SnapshotCache):
+        self.__snapshot_cache = snapshot_cache
+        self.__current_season = None  # type: Optional[Season]
+        self.__current_version = None  # type: Optional[int]
+
+    def get_current_season(self) -> Optional[Season]:
+        """
+        Season running right now, None if the calendar has a gap
+        With settings.SEASONS_AUTO_MONTHLY a season is opened for the calendar month when none is configured
+        """
+        now = timezone.now()
+        version = self.VERSION.get()
+        season = self.__current_season
+        if season is not None and self.__current_version == version and self.__is_running(season, now):
+            return season
+
+        season = Season.objects.filter(
+            starts_at__lte=now,
+            ends_at__gt=now,
+            archived_at__isnull=True
+        ).order_by('-starts_at').first()
+
+        if season is None and settings.SEASONS_AUTO_MONTHLY:
+            season = self.__open_monthly_season(now)
+
+        self.__current_season, self.__current_version = season, version
+        return season
+
+    @classmethod
+    def invalidate(cls, *args, **kwargs) -> None:
+        """Signal receiver, makes every process look the current season up again"""
+        cls.VERSION.bump()
+
+    def __open_monthly_season(self, now: datetime) -> Season:
+        """
+        The automatic season of the current month, named after it. When that name belongs to a season
+        that no longer runs (ended early or archived) the month goes on under "<month>-2", "<month>-3"...
+        starting now. Every process walks the same names, so concurrent callers end up in the same season
+        """
+        starts_at = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        ends_at = self.__next_month(starts_at)
+        suffix = 1
+        while True:
+            season, _ = Season.objects.get_or_create(
+                name=f"{now:%Y-%m}" if suffix == 1 else f"{now:%Y-%m}-{suffix}",
+                defaults={
+                    "starts_at": starts_at if suffix == 1 else now,
+                    "ends_at": ends_at
+                }
+            )
+            # Another process may have opened it a moment ago, so only require that it hasn't ended
+            if season.archived_at is None and now < season.ends_at:
+                return season
+            suffix += 1
+
+    def record_discovery(self, user_id: int, points: int) -> None:
+        """
+        Add a discovery's points to the user's score in the running season
+        Scores are only written while the season is open in the database, whatever this process last saw
+        of it, so nothing lands in a season archived meanwhile
+        """
+        season = self.get_current_season()
+        if season is None:
+            return
+
+        now = timezone.now()
+        increment = {
+            "points": F('points') + points,
+            "discoveries": F('discoveries') + 1
+        }
+        updated = SeasonScore.objects.filter(
+            season=season,
+            user_id=user_id,
+            season__archived_at__isnull=True,
+            season__ends_at__gt=now
+        ).update(**increment)
+        if updated:
+            return
+
+        # The user's first score of the season, only created while the season row is locked open.
+        # archive_season() locks the same row, so the two can't interleave
+        with transaction.atomic():
+            if not Season.objects.select_for_update().filter(
+                id=season.id,
+                archived_at__isnull=True,
+                ends_at__gt=now
+            ).exists():
+                return
+            SeasonScore.objects.get_or_create(season=season, user_id=user_id)
+            SeasonScore.objects.filter(season=season, user_id=user_id).update(**increment)
+
+    @staticmethod
+    def get_seasons() -> List[dict]:
+        """All seasons, most recent first"""
+        return [{
+            "name": season.name,
+            "starts_at": season.starts_at,
+            "ends_at": season.ends_at,
+            "archived": season.archived_at is not None
+        } for season in Season.objects.order_by('-starts_at')]
+
+    def get_season_leaderboard_snapshot(
+            self, season_name: str, limit: int = 10, cursor: Optional[str] = None
+    ) -> Snapshot:
+        """Versioned snapshot of a season leaderboard page, first pages are shared by every caller"""
+        limit = max(1, min(limit, settings.LEADERBOARD_MAX_PAGE_SIZE))
+        season = self.__find_season(season_name)
+
+        def compute() -> dict:
+            return self.get_season_leaderboard(season, limit, cursor)
+
+        if cursor:
+            return self.__snapshot_cache.build(compute)
+        return self.__snapshot_cache.get(('season', season.id, limit), compute)
+
+    def get_season_leaderboard(self, season: Season, limit: int = 10, cursor: Optional[str] = None) -> dict:
+        """
+        Get a page of a season's leaderboard, ordered by (points desc, user id asc)
+        Archived seasons are read from their frozen standings, running ones from the live scores
+        """
+        limit = max(1, min(limit, settings.LEADERBOARD_MAX_PAGE_SIZE))
+        points, last_user_id, position = decode_int_cursor(cursor, 3) or (0, 0, 0)
+
+        if season.archived_at is not None:
+            entries = SeasonStanding.objects.filter(
+                season=season,
+                rank__gt=position
+            ).order_by('rank')
+        else:
+            entries = SeasonScore.objects.filter(season=season)
+            if cursor:
+                entries = entries.filter(
+                    Q(points__lt=points) |
+                    Q(points=points, user_id__gt=last_user_id)
+                )
+            entries = entries.order_by('-points', 'user_id')
+
+        entries = list(entries.select_related('user').only(
+            'user_id', 'points', 'discoveries', 'user__username', 'user__display_name'
+        )[:limit + 1])
+
+        page = entries[:limit]
+        return {
+            "results": [{
+                "rank": position + idx + 1,
+                "username": entry.user.username,
+                "display_name": entry.user.display_name,
+                "points": entry.points,
+                "discoveries": entry.discoveries,
+                "season": season.name
+            } for idx, entry in enumerate(page)],
+            "next_cursor": encode_cursor(
+                page[-1].points, page[-1].user_id, position + len(page)
+            ) if len(entries) > limit else None
+        }
+
+    def get_user_season_rank(self, season_name: str, user_id: int) -> dict:
+        """A user's final (archived) or current (running) rank in a season"""
+        season = self.__find_season(season_name)
+
+        if season.archived_at is not None:
+            standing = SeasonStanding.objects.filter(season=season, user_id=user_id).first()
+            rank = standing.rank if standing else None
+            points = standing.points if standing else 0
+            discoveries = standing.discoveries if standing else 0
+        else:
+            score = SeasonScore.objects.filter(season=season, user_id=user_id).first()
+            points = score.points if score else 0
+            discoveries = score.discoveries if score else 0
+            rank = SeasonScore.objects.filter(season=season).filter(
+                Q(points__gt=points) | Q(points=points, user_id__lt=user_id)
+            ).count() + 1 if score else None
+
+        return {
+            "season": season.name,
+            "rank": rank,
+            "points": points,
+            "discoveries": discoveries,
+            "archived": season.archived_at is not None
+        }
+
+    def close_ended_seasons(self) -> List[tuple[str, int]]:
+        """Archive every season that has ended, returns (season name, users ranked) for each"""
+        ended = Season.objects.filter(
+            ends_at__lte=timezone.now(),
+            archived_at__isnull=True
+        ).order_by('starts_at')
+        return [(season.name, self.archive_season(season)) for season in ended]
+
+    def archive_season(self, season: Season) -> int:
+        """
+        Freeze a season's live scores into ranked standings and drop the live rows
+        Returns the number of users ranked
+        """
+        with transaction.atomic():
+            season = Season.objects.select_for_update().get(id=season.id)
+            if season.archived_at is not None:
+                return SeasonStanding.objects.filter(season=season).count()
+
+            scores = SeasonScore.objects.filter(
+                season=season
+            ).order_by(
+                '-points', 'user_id'
+            ).values_list(
+                'user_id', 'points', 'discoveries'
+            ).iterator(chunk_size=self.ARCHIVE_BATCH_SIZE)
+
+            ranked, batch = 0, []
+            for user_id, points, discoveries in scores:
+                ranked += 1
+                batch.append(SeasonStanding(
+                    season=season,
+                    user_id=user_id,
+                    rank=ranked,
+                    points=points,
+                    discoveries=discoveries
+                ))
+                if len(batch) >= self.ARCHIVE_BATCH_SIZE:
+                    SeasonStanding.objects.bulk_create(batch)
+                    batch = []
+            SeasonStanding.objects.bulk_create(batch)
+
+            SeasonScore.objects.filter(season=season).delete()
+            season.archived_at = timezone.now()
+            season.save(update_fields=['archived_at'])
+
+        self.__snapshot_cache.bump_version()
+        return ranked
+
+    def __find_season(self, season_name: str) -> Season:
+        if season_name == 'current':
+            season = self.get_current_season()
+        else:
+            season = Season.objects.filter(name=season_name).first()
+        if season is None:
+            raise ValidationError("Season not found")
+        return season
+
+    @staticmethod
+    def __is_running(season: Season, now: datetime) -> bool:
+        return season.archived_at is None and season.starts_at <= now < season.ends_at
+
+    @staticmethod
+    def __next_month(starts_at: datetime) -> datetime:
+        if starts_at.month == 12:
+            return starts_at.replace(year=starts_at.year + 1, month=1)
+        return starts_at.replace(month=starts_at.month + 1)
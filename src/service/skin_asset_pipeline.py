@@ -0,0 +1,91 @@
+import logging
+from io import BytesIO
+from functools import partial
+from PIL import Image
+from concurrent.futures import Future, ThreadPoolExecutor
+from django.db import connections, transaction
+from src.models.skin import Skin
+from src.storage.blob_store import BlobStore
+from src.models.skin_variant import SkinVariant
+
+
+class SkinAssetPipeline:
+    """
+    Generates resized WebP variants of every skin image off the request path
+
+    Saving a skin schedules its image on a small thread pool once the transaction commits. Variants are
+    keyed by the image they were made from, so regenerating is a no-op until the image changes.
+    """
+    WEBP_QUALITY = 80
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, blob_store: BlobStore, sizes: list[int], workers: int):
+        self.__blob_store = blob_store
+        self.__sizes = sorted(set(sizes))
+        self.__executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='skin-assets')
+
+    @property
+    def sizes(self) -> list[int]:
+        return self.__sizes
+
+    def schedule(self, skin_id: int) -> Future:
+        return self.__executor.submit(self.__generate_in_worker, skin_id)
+
+    def generate(self, skin_id: int) -> int:
+        """Bring a skin's variants up to date with its current image, returns how many were generated"""
+        image_hash = Skin.objects.filter(id=skin_id).values_list('image_hash', flat=True).first()
+        if image_hash is None or not self.__blob_store.exists(image_hash):
+            return 0
+
+        current = set(SkinVariant.objects.filter(
+            skin_id=skin_id,
+            format=SkinVariant.WEBP,
+            source_hash=image_hash
+        ).values_list('size', flat=True))
+        missing = [size for size in self.__sizes if size not in current]
+        if not missing:
+            return 0
+
+        try:
+            with self.__blob_store.open(image_hash) as file, Image.open(file) as image:
+                source = image.convert('RGBA')
+        except (OSError, Image.DecompressionBombError) as e:
+            self.logger.warning(f"Skipping variants of skin {skin_id}, its image can't be decoded: {e}")
+            return 0
+
+        for size in missing:
+            variant = source.copy()
+            variant.thumbnail((size, size), Image.Resampling.LANCZOS)  # keeps the aspect ratio, never upscales
+            encoded = BytesIO()
+            variant.save(encoded, 'WEBP', quality=self.WEBP_QUALITY, method=6)
+            SkinVariant.objects.update_or_create(
+                skin_id=skin_id,
+                size=size,
+                format=SkinVariant.WEBP,
+                defaults={
+                    "source_hash": image_hash,
+                    "blob_hash": self.__blob_store.put(encoded.getvalue()),
+                    "byte_size": encoded.tell(),
+                    "width": variant.width,
+                    "height": variant.height
+                }
+            )
+        return len(missing)
+
+    @staticmethod
+    def on_skin_saved(sender, instance: Skin, update_fields=None, **kwargs) -> None:
+        """Signal receiver, queues variant generation once a saved image is committed"""
+        if update_fields is not None and 'image_hash' not in update_fields:
+            return
+        from src.service_module import ServiceModule
+        transaction.on_commit(partial(ServiceModule().skin_asset_pipeline.schedule, instance.id))
+
+    def __generate_in_worker(self, skin_id: int) -> int:
+        try:
+            return self.generate(skin_id)
+        except Exception:
+            self.logger.exception(f"Generating variants of skin {skin_id} failed")
+            raise
+        finally:
+            # Worker threads get their own connections, don't leave them open between jobs
+            connections.close_all()
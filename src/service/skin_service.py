@@ -1,56 +1,70 @@
-from typing import List
+from io import BytesIO
+from typing import List, BinaryIO, Optional
 from src.models.skin import Skin
-from django.db import transaction
-from django.db.models import Count, Sum
+from src.models.user import User
+from django.db import transaction, IntegrityError
+from django.conf import settings
+from django.utils import timezone
+from django.db.models import Count, Sum, F, Exists, OuterRef
 from src.models.user_skins import UserSkin
+from src.models.skin_stock import SkinStock
+from src.models.skin_variant import SkinVariant
 from rest_framework.exceptions import ValidationError
-from src.service.points_service import PointsService
 from src.repository.user_repository import UserRepository
+from src.cache.skin_catalog import SkinCatalog
+from src.util.image_type import sniff_image_type
+from src.storage.blob_store_factory import BlobStoreFactory
+from src.service.skin_asset_pipeline import SkinAssetPipeline
 
 
 class SkinService:
-    def __init__(self, user_repository: UserRepository, points_service: PointsService):
+    def __init__(self, user_repository: UserRepository, skin_catalog: SkinCatalog, asset_pipeline: SkinAssetPipeline):
         self.__user_repository = user_repository
-        self.__points_service = points_service
+        self.__skin_catalog = skin_catalog
+        self.__asset_pipeline = asset_pipeline
 
     def purchase_skin(self, user_id: int, skin_id: int) -> dict:
         """
         Purchase a skin for a user
         Returns purchase confirmation with updated points balance
-        """
-        user = self.__user_repository.find_by_id(user_id)
-        if not user:
-            raise ValidationError("User not found")
 
-        try:
-            skin = Skin.objects.get(id=skin_id)
-        except Skin.DoesNotExist:
+        The debit is a conditional UPDATE and ownership a single INSERT guarded by the (user, skin)
+        unique constraint, both in one transaction, so concurrent purchases can neither overdraw the
+        balance nor charge twice for the same skin. Limited editions also claim a unit of stock last,
+        keeping the contended stock row locked for as short as possible
+        """
+        skin = Skin.objects.only(
+            'id', 'name', 'price_points', 'rarity', 'available', 'stock'
+        ).filter(id=skin_id).first()
+        if skin is None:
             raise ValidationError("Skin not found")
 
         # Validate skin is available for purchase
         if not skin.available:
             raise ValidationError("This skin is not available for purchase")
 
-        # Check if user already owns this skin
-        if UserSkin.objects.filter(user_id=user_id, skin_id=skin_id).exists():
-            raise ValidationError("You already own this skin")
+        # Turn buyers away without a write transaction once a drop has sold out
+        if skin.is_limited and not SkinStock.objects.in_stock(skin.id):
+            raise ValidationError("This skin is sold out")
 
-        # Check if user has enough points
-        if user.points_balance < skin.price_points:
-            raise ValidationError(
-                f"Insufficient points. Need {skin.price_points} points, but you have {user.points_balance}"
-            )
+        try:
+            with transaction.atomic():
+                new_balance = self.__user_repository.debit_points(user_id, skin.price_points)
+                if new_balance is None:
+                    raise ValidationError(self.__insufficient_points_message(user_id, skin.price_points))
 
-        # Process purchase
-        with transaction.atomic():
-            # Deduct points
-            new_balance, _ = self.__points_service.deduct_points(user_id, skin.price_points)
-            # Record skin ownership
-            UserSkin.objects.create(
-                user_id=user_id,
-                skin_id=skin_id,
-                acquisition_type='PURCHASE'
-            )
+                # Record skin ownership
+                UserSkin.objects.create(
+                    user_id=user_id,
+                    skin_id=skin.id,
+                    acquisition_type='PURCHASE'
+                )
+
+                if skin.is_limited and not SkinStock.objects.claim(skin.id):
+                    raise ValidationError("This skin is sold out")
+        except IntegrityError:
+            # Rolled back together with the debit
+            raise ValidationError("You already own this skin")
 
         return {
             "skin_name": skin.name,
@@ -79,39 +93,121 @@ class SkinService:
         }
 
     def get_user_skins(self, user_id: int) -> List[dict]:
-        """Get all skins owned by user"""
-        if not self.__user_repository.find_by_id(user_id):
+        """
+        Get all skins owned by user
+        One query for the ownership rows and the equipped skin, names and rarities come from the catalog.
+        Skins added after this process loaded its catalog are read from the database in one more query
+        """
+        owned = list(UserSkin.objects.filter(
+            user_id=user_id
+        ).values_list(
+            'skin_id', 'acquired_at', 'acquisition_type', 'user__active_skin_id'
+        ))
+        if not owned and not self.__user_repository.find_by_id(user_id):
             raise ValidationError("User not found")
 
-        user_skins = UserSkin.objects.filter(user_id=user_id).select_related('skin')
+        catalog = self.__skin_catalog.snapshot()
+        skins = {skin_id: catalog.by_id.get(skin_id) for skin_id, *_ in owned}
+        missing = [skin_id for skin_id, skin in skins.items() if skin is None]
+        if missing:
+            skins.update(Skin.objects.only('id', 'name', 'rarity').in_bulk(missing))
 
         return [{
-            "skin_id": user_skin.skin.id,
-            "name": user_skin.skin.name,
-            "rarity": user_skin.skin.rarity,
-            "acquired_at": user_skin.acquired_at,
-            "acquisition_type": user_skin.acquisition_type,
-            "is_equipped": user_skin.skin_id == user_skin.user.active_skin_id
-        } for user_skin in user_skins]
-
-    @staticmethod
-    def get_available_skins(user_id: int) -> List[dict]:
-        """Get all skins available for purchase (not owned by user)"""
-        owned_skins = UserSkin.objects.filter(user_id=user_id).values_list('skin_id', flat=True)
-
-        available_skins = Skin.objects.filter(
-            available=True
-        ).exclude(
-            id__in=owned_skins
-        )
+            "skin_id": skin_id,
+            "name": skins[skin_id].name,
+            "rarity": skins[skin_id].rarity,
+            "acquired_at": acquired_at,
+            "acquisition_type": acquisition_type,
+            "is_equipped": skin_id == active_skin_id
+        } for skin_id, acquired_at, acquisition_type, active_skin_id in owned]
+
+    def get_available_skins(self, user_id: int) -> List[dict]:
+        """
+        Get all skins available for purchase (not owned by user, not sold out)
+        The catalog is cached, so this is one query for the user's owned skin ids, plus one for
+        remaining stock only while a limited edition the user doesn't own is on sale
+        """
+        owned_skins = set(UserSkin.objects.filter(user_id=user_id).values_list('skin_id', flat=True))
+        available_skins = [
+            skin for skin in self.__skin_catalog.all()
+            if skin.available and skin.id not in owned_skins
+        ]
+
+        remaining_stock = {}
+        limited = [skin.id for skin in available_skins if skin.is_limited]
+        if limited:
+            remaining_stock = dict(SkinStock.objects.filter(
+                skin_id__in=limited
+            ).values('skin_id').annotate(
+                remaining=Sum('remaining')
+            ).values_list('skin_id', 'remaining').order_by())
 
         return [{
             "skin_id": skin.id,
             "name": skin.name,
             "rarity": skin.rarity,
             "price_points": skin.price_points,
-            "description": skin.description
-        } for skin in available_skins]
+            "description": skin.description,
+            "remaining_stock": remaining_stock.get(skin.id, 0) if skin.is_limited else None,
+            "thumbnail_sizes": list(skin.thumbnail_sizes)
+        } for skin in available_skins if not skin.is_limited or remaining_stock.get(skin.id)]
+
+    def release_limited_edition(self, skin_id: int, quantity: int) -> dict:
+        """Put a fixed number of units of a skin on sale, replacing any stock it had left"""
+        if quantity < 0:
+            raise ValidationError("Stock must not be negative")
+        if not Skin.objects.filter(id=skin_id).exists():
+            raise ValidationError("Skin not found")
+
+        with transaction.atomic():
+            SkinStock.objects.release(skin_id, quantity, settings.SKIN_STOCK_SHARDS)
+            # release() sets Skin.stock with an UPDATE, which doesn't go through the save signals. The bump
+            # commits with the new stock, so every process reloads the catalog as soon as it's on sale
+            self.__skin_catalog.invalidate()
+        return {
+            "skin_id": skin_id,
+            "stock": quantity,
+            "remaining_stock": SkinStock.objects.remaining(skin_id)
+        }
+
+    def get_skin_asset_etag(self, skin_id: int, asset: str, size: Optional[int] = None) -> str:
+        """
+        Strong ETag of a skin's image or thumbnail, its blob store key, read without touching the blob
+        Assets still stored in the skins table are moved into the blob store on first request
+        """
+        return f'"{self.__asset_key(skin_id, asset, size)}"'
+
+    def get_skin_asset(self, skin_id: int, asset: str, size: Optional[int] = None) -> tuple[BinaryIO, str]:
+        """
+        A skin's image or thumbnail as an open binary file and its content type
+        Files come straight from the blob store, for the app to send when no front proxy can (get_skin_asset_location)
+        """
+        key = self.__asset_key(skin_id, asset, size)
+        blob_store = BlobStoreFactory.get_store()
+        if blob_store.exists(key):
+            file = blob_store.open(key)
+        else:
+            # Hashed before the blob store existed and not moved yet
+            file = BytesIO(bytes(Skin.objects.with_assets().filter(id=skin_id).values_list(asset, flat=True)[0]))
+
+        content_type = sniff_image_type(file.read(12))
+        file.seek(0)
+        return file, content_type
+
+    def get_skin_asset_location(
+        self, skin_id: int, asset: str, size: Optional[int] = None
+    ) -> Optional[tuple[str, str]]:
+        """
+        Where a skin's image or thumbnail lives relative to the blob store's root, and its content type
+        None when a front proxy can't send it from there, the asset then has to go through get_skin_asset
+        """
+        key = self.__asset_key(skin_id, asset, size)
+        blob_store = BlobStoreFactory.get_store()
+        location = blob_store.location(key)
+        if location is None or not blob_store.exists(key):
+            return None
+        with blob_store.open(key) as file:
+            return location, sniff_image_type(file.read(12))
 
     def award_skin(self, user_id: int, skin_id: int, reason: str = "ACHIEVEMENT") -> dict:
         """
@@ -145,6 +241,38 @@ class SkinService:
             "reason": reason
         }
 
+    def grant_skin_in_bulk(self, skin_id: int, user_ids: List[int], reason: str = "SPECIAL_EVENT") -> dict:
+        """
+        Award a skin to every listed user that exists and doesn't own it yet, for event-sized grants
+        One query and one multi-row INSERT per call, conflicts with concurrent grants are skipped,
+        so calling it again with the same users only reports them as owners
+        Returns how many users were granted the skin, already owned it, or don't exist
+        """
+        if self.__skin_catalog.get(skin_id) is None:
+            raise ValidationError("Skin not found")
+        if reason not in dict(UserSkin._meta.get_field('acquisition_type').choices):
+            raise ValidationError(f"Unknown acquisition type {reason}")
+
+        user_ids = set(user_ids)
+        with transaction.atomic():
+            users = list(User.objects.filter(
+                id__in=user_ids
+            ).annotate(
+                owns=Exists(UserSkin.objects.filter(user=OuterRef('pk'), skin_id=skin_id))
+            ).values_list('id', 'owns'))
+            now = timezone.now()
+            UserSkin.objects.bulk_create([
+                UserSkin(user_id=user_id, skin_id=skin_id, acquired_at=now, acquisition_type=reason)
+                for user_id, owns in users if not owns
+            ], ignore_conflicts=True)
+
+        already_owned = sum(owns for _, owns in users)
+        return {
+            "granted": len(users) - already_owned,
+            "already_owned": already_owned,
+            "unknown_users": len(user_ids) - len(users)
+        }
+
     def get_skin_statistics(self, user_id: int) -> dict:
         """Get statistics about user's skin collection"""
         if not self.__user_repository.find_by_id(user_id):
@@ -183,3 +311,38 @@ class SkinService:
             },
             "total_points_spent": total_points_spent
         }
+
+    def __insufficient_points_message(self, user_id: int, price_points: int) -> str:
+        user = self.__user_repository.find_by_id(user_id)
+        if not user:
+            return "User not found"
+        return f"Insufficient points. Need {price_points} points, but you have {user.points_balance}"
+
+    def __asset_key(self, skin_id: int, asset: str, size: Optional[int]) -> str:
+        """
+        Blob store key of a skin's image or thumbnail, or of its `size` variant when one was asked for
+        A variant that isn't generated from the current image yet falls back to the thumbnail
+        """
+        if size is not None:
+            if size not in self.__asset_pipeline.sizes:
+                raise ValidationError(f"Size must be one of {', '.join(map(str, self.__asset_pipeline.sizes))}")
+            variant = SkinVariant.objects.filter(
+                skin_id=skin_id,
+                size=size,
+                format=SkinVariant.WEBP,
+                source_hash=F('skin__image_hash')
+            ).values_list('blob_hash', flat=True).first()
+            if variant is not None:
+                return variant
+
+        keys = Skin.objects.filter(id=skin_id).values_list(f'{asset}_hash', flat=True)
+        if not keys:
+            raise ValidationError("Skin not found")
+        key = keys[0]
+        if key is None:
+            skin = Skin.objects.with_assets().only('id', asset, f'{asset}_hash').get(id=skin_id)
+            skin.save(update_fields=[asset, f'{asset}_hash'])
+            key = getattr(skin, f'{asset}_hash')
+            if key is None:
+                raise ValidationError(f"Skin has no {asset}")
+        return key
@@ -0,0 +1,144 @@
+import time
+import heapq
+import atexit
+import signal
+import logging
+import weakref
+import threading
+from typing import Any, Callable, Hashable
+from dataclasses import dataclass
+from django.db import connections
+
+
+@dataclass
+class PendingTask:
+    fn: Callable[..., Any]
+    args: tuple
+    due: float  # time.monotonic() it may run at
+
+
+class TaskRunner:
+    """
+    Runs non-critical writes (bookkeeping like last-login times) after the request that caused them
+
+    Tasks are keyed, and a task submitted while another with the same key is still waiting replaces its
+    arguments instead of queueing again, so with a delay of a few seconds a burst of logins by one user
+    becomes a single UPDATE. At most `max_pending` tasks wait at a time, beyond that the caller runs its
+    task itself. Whatever is still waiting when the process exits, or is sent SIGTERM once
+    install_signal_handler() ran, is run before it does.
+
+    Tasks live in memory and are lost if the process is killed outright. Work that must survive that belongs
+    on the EventBus, whose events are stored in the database with the change they belong to.
+    """
+    logger = logging.getLogger(__name__)
+    __runners = weakref.WeakSet()  # started runners, drained by the SIGTERM handler
+    __signal_handler_installed = False
+
+    def __init__(self, workers: int, max_pending: int, drain_timeout_seconds: float):
+        self.__workers = workers
+        self.__max_pending = max_pending
+        self.__drain_timeout_seconds = drain_timeout_seconds
+        self.__pending = {}  # type: dict[Hashable, PendingTask]
+        self.__schedule = []  # type: list[tuple[float, int, Hashable]]
+        self.__sequence = 0  # breaks ties between equally due tasks, keys needn't be comparable
+        self.__condition = threading.Condition()
+        self.__threads = []  # type: list[threading.Thread]
+        self.__stopping = False
+
+    def submit(self, key: Hashable, fn: Callable[..., Any], *args, delay_seconds: float = 0) -> None:
+        """Run fn(*args) in the background after `delay_seconds`, replacing a waiting task with the same key"""
+        with self.__condition:
+            pending = self.__pending.get(key)
+            if pending is not None:
+                pending.fn, pending.args = fn, args
+                return
+
+            if not self.__stopping and len(self.__pending) < self.__max_pending:
+                self.__start()
+                due = time.monotonic() + delay_seconds
+                self.__pending[key] = PendingTask(fn, args, due)
+                self.__sequence += 1
+                heapq.heappush(self.__schedule, (due, self.__sequence, key))
+                self.__condition.notify()
+                return
+
+        # Full or shutting down, don't grow without bound or drop the write
+        self.__run(key, fn, args)
+
+    def pending(self) -> int:
+        with self.__condition:
+            return len(self.__pending)
+
+    def shutdown(self) -> None:
+        """Run every waiting task now, regardless of its delay, and stop the workers once they are done"""
+        with self.__condition:
+            self.__stopping = True
+            self.__condition.notify_all()
+            threads = list(self.__threads)
+
+        deadline = time.monotonic() + self.__drain_timeout_seconds
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if self.pending():
+            self.logger.warning(f"Dropped {self.pending()} background tasks still waiting at shutdown")
+
+    @classmethod
+    def install_signal_handler(cls) -> None:
+        """
+        Drain every started runner on SIGTERM, which otherwise ends the process without running atexit
+        handlers, then hand the signal on to the handler it replaced. Only the main thread can set signal
+        handlers, called from any other this does nothing
+        """
+        if cls.__signal_handler_installed or threading.current_thread() is not threading.main_thread():
+            return
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def on_sigterm(signum, frame):
+            for runner in list(cls.__runners):
+                runner.shutdown()
+            if callable(previous):
+                previous(signum, frame)
+            elif previous != signal.SIG_IGN:
+                # Terminate the way SIGTERM would have without this handler
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.raise_signal(signal.SIGTERM)
+
+        signal.signal(signal.SIGTERM, on_sigterm)
+        cls.__signal_handler_installed = True
+
+    def __start(self) -> None:
+        """Start the workers on first use, so processes that never submit anything never run threads"""
+        if self.__threads:
+            return
+        for index in range(self.__workers):
+            thread = threading.Thread(target=self.__work, name=f'task-runner-{index}', daemon=True)
+            thread.start()
+            self.__threads.append(thread)
+        atexit.register(self.shutdown)
+        self.__runners.add(self)
+
+    def __work(self) -> None:
+        while True:
+            with self.__condition:
+                while True:
+                    if self.__schedule and (self.__stopping or self.__schedule[0][0] <= time.monotonic()):
+                        _, _, key = heapq.heappop(self.__schedule)
+                        task = self.__pending.pop(key)
+                        break
+                    if self.__stopping:
+                        return
+                    timeout = self.__schedule[0][0] - time.monotonic() if self.__schedule else None
+                    self.__condition.wait(timeout)
+
+            try:
+                self.__run(key, task.fn, task.args)
+            finally:
+                # Worker threads get their own connections, don't leave them open between tasks
+                connections.close_all()
+
+    def __run(self, key: Hashable, fn: Callable[..., Any], args: tuple) -> None:
+        try:
+            fn(*args)
+        except Exception:
+            # Nothing waits on these, a failure only costs the one write
+            self.logger.exception(f"Background task {key} failed")
@@ -2,11 +2,13 @@ from typing import Optional
 from src.models.user import User
 from rest_framework.exceptions import ValidationError
 from src.repository.user_repository import UserRepository
+from src.service.percentile_service import PercentileService
 
 
 class UserService:
-    def __init__(self, user_repository: UserRepository):
+    def __init__(self, user_repository: UserRepository, percentile_service: PercentileService):
         self.__user_repository = user_repository
+        self.__percentile_service = percentile_service
 
     def get_user(self, user_id: int) -> Optional[User]:
         """Get user by ID"""
@@ -55,7 +57,7 @@ class UserService:
         if not user:
             raise ValidationError("User not found")
 
-        rank_position = self.__user_repository.get_user_rank_position(user_id)
+        standing = self.__percentile_service.get_standing(user)
 
         return {
             "username": user.username,
@@ -64,30 +66,24 @@ class UserService:
             "rank_title": user.rank_title,
             "points_balance": user.points_balance,
             "total_points_earned": user.total_points_earned,
-            "leaderboard_position": rank_position,
-            "active_skin": user.active_skin.id if user.active_skin else None,
+            "leaderboard_position": standing["leaderboard_position"],
+            "top_percent": standing["top_percent"],
+            "top_percent_error": standing["top_percent_error"],
+            "active_skin": user.active_skin_id,
             "member_since": user.created_at,
             "last_login": user.last_login_at
         }
 
     def deactivate_user(self, user_id: int) -> None:
         """Deactivate a user account"""
-        user = self.__user_repository.find_by_id(user_id)
-        if not user:
+        if not self.__user_repository.set_active(user_id, False):
             raise ValidationError("User not found")
 
-        user.is_active = False
-        self.__user_repository.update(user)
-
     def reactivate_user(self, user_id: int) -> None:
         """Reactivate a user account"""
-        user = self.__user_repository.find_by_id(user_id)
-        if not user:
+        if not self.__user_repository.set_active(user_id, True):
             raise ValidationError("User not found")
 
-        user.is_active = True
-        self.__user_repository.update(user)
-
     @staticmethod
     def __validate_password(password: str) -> None:
         """Validate password strength"""
@@ -1,40 +1,144 @@
+from django.conf import settings
+from src.cache.item_catalog import ItemCatalog
+from src.cache.skin_catalog import SkinCatalog
+from src.cache.snapshot_cache import SnapshotCache
+from src.cache.leaderboard_snapshot import LeaderboardSnapshotReader
 from src.service.auth_service import AuthService
 from src.service.user_service import UserService
 from src.util.singleton import singleton
 from src.repository.user_repository import UserRepository
+from src.repository.discovery_repository import DiscoveryRepository
 from src.service.points_service import PointsService
+from src.service.percentile_service import PercentileService
+from src.service.season_service import SeasonService
+from src.service.popularity_service import PopularityService
+from src.service.scan_analytics_service import ScanAnalyticsService
+from src.service.event_bus import EventBus
+from src.service.task_runner import TaskRunner
+from src.models.outbox_event import OutboxEvent
 from src.service.discovery_service import DiscoveryService
 from src.service.leaderboard_service import LeaderboardService
+from src.service.leaderboard_broadcaster import LeaderboardBroadcaster
 from src.service.skin_service import SkinService
+from src.service.skin_asset_pipeline import SkinAssetPipeline
+from src.service.achievement_engine import AchievementEngine
+from src.storage.blob_store_factory import BlobStoreFactory
 
 
 @singleton
 class ServiceModule:
     def __init__(self):
         self.user_repository = UserRepository()
+        self.discovery_repository = DiscoveryRepository()
+
+        self.item_catalog = ItemCatalog()
+        self.skin_catalog = SkinCatalog()
+
+        self.leaderboard_snapshot_cache = SnapshotCache(
+            namespace="leaderboard",
+            ttl_seconds=settings.LEADERBOARD_SNAPSHOT_TTL_SECONDS,
+            max_stale_seconds=settings.LEADERBOARD_SNAPSHOT_MAX_STALE_SECONDS,
+            max_entries=settings.LEADERBOARD_SNAPSHOT_MAX_ENTRIES
+        )
+
+        self.leaderboard_snapshot_reader = LeaderboardSnapshotReader(
+            path=settings.LEADERBOARD_SHARED_SNAPSHOT_PATH,
+            max_age_seconds=settings.LEADERBOARD_SHARED_SNAPSHOT_MAX_AGE_SECONDS
+        )
+
+        self.percentile_service = PercentileService(
+            user_repository=self.user_repository,
+            snapshot_cache=self.leaderboard_snapshot_cache
+        )
+
+        self.season_service = SeasonService(
+            snapshot_cache=self.leaderboard_snapshot_cache
+        )
+
+        self.popularity_service = PopularityService(
+            discovery_repository=self.discovery_repository,
+            item_catalog=self.item_catalog,
+            snapshot_cache=self.leaderboard_snapshot_cache
+        )
+
+        self.task_runner = TaskRunner(
+            workers=settings.BACKGROUND_TASK_WORKERS,
+            max_pending=settings.BACKGROUND_TASK_MAX_PENDING,
+            drain_timeout_seconds=settings.BACKGROUND_TASK_DRAIN_TIMEOUT_SECONDS
+        )
+
+        self.scan_analytics_service = ScanAnalyticsService(
+            task_runner=self.task_runner
+        )
+
+        self.event_bus = EventBus(
+            workers=settings.EVENT_BUS_WORKERS,
+            lease_seconds=settings.EVENT_BUS_LEASE_SECONDS,
+            max_backoff_seconds=settings.EVENT_BUS_MAX_BACKOFF_SECONDS
+        )
+        self.event_bus.subscribe(
+            OutboxEvent.DISCOVERY_RECORDED,
+            'popularity_counters',
+            self.popularity_service.on_discovery_recorded
+        )
+
+        self.skin_asset_pipeline = SkinAssetPipeline(
+            blob_store=BlobStoreFactory.get_store(),
+            sizes=settings.SKIN_VARIANT_SIZES,
+            workers=settings.SKIN_ASSET_WORKERS
+        )
+
+        self.skin_service = SkinService(
+            user_repository=self.user_repository,
+            skin_catalog=self.skin_catalog,
+            asset_pipeline=self.skin_asset_pipeline
+        )
+
+        self.achievement_engine = AchievementEngine(
+            item_catalog=self.item_catalog,
+            skin_service=self.skin_service
+        )
 
         self.auth_service = AuthService(
-            user_repository=self.user_repository
+            user_repository=self.user_repository,
+            task_runner=self.task_runner
         )
 
         self.user_service = UserService(
-            user_repository=self.user_repository
+            user_repository=self.user_repository,
+            percentile_service=self.percentile_service
         )
 
         self.points_service = PointsService(
-            user_repository=self.user_repository
+            user_repository=self.user_repository,
+            discovery_repository=self.discovery_repository,
+            leaderboard_snapshot_cache=self.leaderboard_snapshot_cache,
+            percentile_service=self.percentile_service,
+            season_service=self.season_service,
+            event_bus=self.event_bus,
+            achievement_engine=self.achievement_engine
         )
 
         self.discovery_service = DiscoveryService(
             user_repository=self.user_repository,
-            points_service=self.points_service
+            discovery_repository=self.discovery_repository,
+            points_service=self.points_service,
+            item_catalog=self.item_catalog,
+            popularity_service=self.popularity_service,
+            scan_analytics_service=self.scan_analytics_service
         )
 
         self.leaderboard_service = LeaderboardService(
-            user_repository=self.user_repository
+            user_repository=self.user_repository,
+            discovery_repository=self.discovery_repository,
+            snapshot_cache=self.leaderboard_snapshot_cache,
+            snapshot_reader=self.leaderboard_snapshot_reader
         )
 
-        self.skin_service = SkinService(
-            user_repository=self.user_repository,
-            points_service=self.points_service
+        self.leaderboard_broadcaster = LeaderboardBroadcaster(
+            leaderboard_service=self.leaderboard_service,
+            snapshot_cache=self.leaderboard_snapshot_cache,
+            interval_seconds=settings.LEADERBOARD_STREAM_INTERVAL_SECONDS,
+            refresh_seconds=settings.LEADERBOARD_STREAM_REFRESH_SECONDS,
+            top_k=settings.LEADERBOARD_STREAM_TOP_K
         )
@@ -0,0 +1,39 @@
+import hashlib
+from abc import ABC, abstractmethod
+from typing import BinaryIO, ContextManager, Optional
+
+
+class BlobStore(ABC):
+    """
+    Immutable blobs addressed by the SHA-256 hex digest of their content
+
+    Writing the same bytes twice stores them once and yields the same key, so keys double as strong ETags
+    and blobs never need invalidating, only garbage collecting once nothing references them.
+    """
+
+    @staticmethod
+    def key_for(content: bytes) -> str:
+        return hashlib.sha256(content).hexdigest()
+
+    @abstractmethod
+    def put(self, content: bytes) -> str:
+        """Store content, returns its key"""
+
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        pass
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Binary file positioned at the start of the blob, raises FileNotFoundError for unknown keys"""
+
+    @abstractmethod
+    def mapped(self, key: str) -> ContextManager[memoryview]:
+        """Read-only view of the blob for the duration of the with block, without copying it into the heap"""
+
+    def location(self, key: str) -> Optional[str]:
+        """
+        Path of the blob relative to the store's root, for a front proxy serving the store's files itself
+        None when the store has no files a proxy could read
+        """
+        return None
@@ -0,0 +1,17 @@
+from functools import cache
+from django.conf import settings
+from src.util.singleton import singleton
+from src.storage.blob_store import BlobStore
+
+
+@singleton
+class BlobStoreFactory:
+    @staticmethod
+    @cache
+    def get_store() -> BlobStore:
+        match settings.BLOB_STORE_BACKEND:
+            case 'local':
+                from src.storage.local_blob_store import LocalBlobStore
+                return LocalBlobStore(settings.BLOB_STORE_ROOT)
+            case _:
+                raise ValueError(f"Unsupported blob store backend: {settings.BLOB_STORE_BACKEND}")
@@ -0,0 +1,69 @@
+import os
+import mmap
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+from contextlib import contextmanager
+from src.storage.blob_store import BlobStore
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Blobs as files under root/ab/cd/<key>, two levels of sharding keep directories small
+
+    Files are written to root/tmp and renamed into place, so readers only ever see complete blobs and
+    concurrent writers of the same content just replace one identical file with another.
+    """
+
+    def __init__(self, root: str):
+        self.__root = Path(root)
+        self.__tmp = self.__root / 'tmp'
+
+    def put(self, content: bytes) -> str:
+        key = self.key_for(content)
+        path = self.__path(key)
+        if path.exists():
+            return key
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.__tmp.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.__tmp)
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                tmp.write(content)
+                tmp.flush()
+                os.fsync(tmp.fileno())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return key
+
+    def exists(self, key: str) -> bool:
+        return self.__path(key).exists()
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self.__path(key), 'rb')
+
+    def location(self, key: str) -> Optional[str]:
+        return self.__path(key).relative_to(self.__root).as_posix()
+
+    @contextmanager
+    def mapped(self, key: str) -> Iterator[memoryview]:
+        with self.open(key) as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                # mmap refuses empty files
+                yield memoryview(b'')
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapping:
+                view = memoryview(mapping)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+    def __path(self, key: str) -> Path:
+        if len(key) < 5 or not key.isalnum():
+            raise FileNotFoundError(f"Invalid blob key: {key}")
+        return self.__root / key[:2] / key[2:4] / key
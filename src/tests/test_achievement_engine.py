@@ -0,0 +1,90 @@
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from src.models.user import User
+from src.models.items import Item
+from src.models.skin import Skin
+from src.models.user_skins import UserSkin
+from src.models.achievement import Achievement
+from src.models.achievement_progress import AchievementProgress
+from src.cache.item_catalog import ItemCatalog
+from src.cache.shared_version import SharedVersion
+from src.service.achievement_engine import AchievementEngine
+from src.service_module import ServiceModule
+
+
+def make_skin(name: str) -> Skin:
+    return Skin.objects.create(name=name, price_points=30, rarity='RARE', description="")
+
+
+class RacingSkinService:
+    """
+    Grants like SkinService.award_skin when a purchase of the reward commits between its ownership check
+    and its insert: an earlier write of the grant succeeds, then the insert hits the unique constraint
+    """
+
+    def __init__(self, extra_skin: Skin):
+        self.__extra_skin = extra_skin
+
+    def award_skin(self, user_id: int, skin_id: int, reason: str = "ACHIEVEMENT") -> dict:
+        UserSkin.objects.create(user_id=user_id, skin_id=self.__extra_skin.id, acquisition_type=reason)
+        UserSkin.objects.create(user_id=user_id, skin_id=skin_id, acquisition_type=reason)
+        return {}
+
+
+class AchievementRewardTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="finder", email="finder@example.com", password="!")
+        self.item = Item.objects.create(
+            name="Bottle",
+            environmental_impact_description="",
+            point_value=5,
+            category='PLASTIC',
+            average_decomposition_time=10,
+            threat_level=1
+        )
+        self.reward = make_skin("Reward")
+        self.achievement = Achievement.objects.create(
+            code="first-plastic",
+            name="First plastic",
+            kind=Achievement.DISCOVERIES,
+            category='PLASTIC',
+            threshold=1,
+            reward_skin=self.reward
+        )
+
+    def discover(self, engine: AchievementEngine) -> list[dict]:
+        # As DiscoveryService does, in the transaction recording the discovery
+        with transaction.atomic():
+            return engine.record_discovery(self.user.id, self.item, timezone.now())
+
+    def test_reward_is_granted(self):
+        completed = self.discover(AchievementEngine(ItemCatalog(), ServiceModule().skin_service))
+        self.assertEqual([entry['code'] for entry in completed], ["first-plastic"])
+        self.assertTrue(UserSkin.objects.filter(user=self.user, skin=self.reward, acquisition_type='ACHIEVEMENT').exists())
+
+    def test_reward_already_owned_still_completes(self):
+        UserSkin.objects.create(user=self.user, skin=self.reward, acquisition_type='PURCHASE')
+        completed = self.discover(AchievementEngine(ItemCatalog(), ServiceModule().skin_service))
+        self.assertEqual([entry['code'] for entry in completed], ["first-plastic"])
+        self.assertIsNotNone(AchievementProgress.objects.get(user=self.user).completed_at)
+
+    def test_grant_losing_a_race_rolls_back_alone(self):
+        UserSkin.objects.create(user=self.user, skin=self.reward, acquisition_type='PURCHASE')
+        extra = make_skin("Extra")
+        completed = self.discover(AchievementEngine(ItemCatalog(), RacingSkinService(extra)))
+
+        self.assertEqual([entry['code'] for entry in completed], ["first-plastic"])
+        # The discovery's own writes are kept, the failed grant's are not
+        self.assertIsNotNone(AchievementProgress.objects.get(user=self.user).completed_at)
+        self.assertFalse(UserSkin.objects.filter(user=self.user, skin=extra).exists())
+        self.assertEqual(UserSkin.objects.get(user=self.user, skin=self.reward).acquisition_type, 'PURCHASE')
+
+    @override_settings(SHARED_VERSION_CHECK_SECONDS=0)
+    def test_rule_change_from_another_process_is_picked_up(self):
+        engine = AchievementEngine(ItemCatalog(), ServiceModule().skin_service)
+        engine.rebuild_progress(self.user.id, [], [])  # compile the rules
+        Achievement.objects.filter(id=self.achievement.id).update(threshold=2)  # no signal
+        SharedVersion('achievements').bump()  # as another process's save would
+        self.assertEqual(self.discover(engine), [])
+        self.assertEqual([entry['code'] for entry in self.discover(engine)], ["first-plastic"])
@@ -0,0 +1,72 @@
+from unittest import mock
+from django.test import TestCase
+from rest_framework.exceptions import ValidationError
+from src.models.user import User
+from src.models.items import Item
+from src.models.user_discoveries import UserDiscovery
+from src.util.bitset import Bitset
+from src.repository.user_repository import UserRepository
+from src.repository.discovery_repository import DiscoveryRepository
+from src.service_module import ServiceModule
+
+
+class DiscoveredItemsTests(TestCase):
+    def setUp(self):
+        self.items = Item.objects.bulk_create([Item(
+            name=f"item{i}",
+            environmental_impact_description="",
+            point_value=5,
+            category='PLASTIC',
+            rarity='COMMON',
+            average_decomposition_time=365,
+            threat_level=1
+        ) for i in range(3)])
+        self.user = User.objects.create(username="collector", email="collector@example.com", password="!")
+        self.discover(self.items[0])
+        self.repository = UserRepository()
+
+    def discover(self, item: Item) -> None:
+        UserDiscovery.objects.create(
+            user=self.user, item=item, points_awarded=5, category=item.category, rarity=item.rarity
+        )
+
+    def stored(self) -> Bitset:
+        return Bitset(User.objects.values_list('discovered_items', flat=True).get(id=self.user.id))
+
+    def test_built_once_from_the_discoveries(self):
+        self.assertIsNone(User.objects.get(id=self.user.id).discovered_items)
+        discovered = self.repository.get_discovered_items(User.objects.get(id=self.user.id))
+        self.assertIn(self.items[0].id, discovered)
+        self.assertNotIn(self.items[1].id, discovered)
+        self.assertIn(self.items[0].id, self.stored())
+
+        # Stored now, so it is read from the user row instead of the discoveries
+        with self.assertNumQueries(1):
+            self.repository.get_discovered_items(User.objects.get(id=self.user.id))
+
+    def test_build_racing_an_award_does_not_overwrite_it(self):
+        item_ids_for_user = DiscoveryRepository.item_ids_for_user
+
+        def award_meanwhile(user_id: int):
+            item_ids = list(item_ids_for_user(user_id))
+            # An award commits between this build reading the discoveries and storing the bitset
+            self.discover(self.items[1])
+            User.objects.filter(id=user_id).update(
+                discovered_items=Bitset.of([self.items[0].id, self.items[1].id]).to_bytes()
+            )
+            return item_ids
+
+        with mock.patch.object(DiscoveryRepository, 'item_ids_for_user', side_effect=award_meanwhile):
+            self.repository.get_discovered_items(User.objects.get(id=self.user.id))
+
+        self.assertIn(self.items[1].id, self.stored())
+
+    def test_award_adds_the_item_and_rejects_it_again(self):
+        points_service = ServiceModule().points_service
+        points_service.award_points_for_discovery(self.user.id, self.items[2])
+        self.assertIn(self.items[2].id, self.stored())
+        self.assertIn(self.items[0].id, self.stored())
+
+        with self.assertRaises(ValidationError):
+            points_service.award_points_for_discovery(self.user.id, self.items[2])
+        self.assertEqual(UserDiscovery.objects.filter(user=self.user, item=self.items[2]).count(), 1)
@@ -0,0 +1,108 @@
+import os
+import time
+import random
+import unittest
+import tracemalloc
+from typing import Any, Callable
+from django.test import TransactionTestCase, override_settings
+from src.models.user import User
+from src.models.items import Item
+from src.models.user_discoveries import UserDiscovery
+from src.cache.item_catalog import ItemCatalog
+from src.repository.user_repository import UserRepository
+from src.service_module import ServiceModule
+
+
+@unittest.skipUnless(os.environ.get('RUN_BENCHMARKS'), "set RUN_BENCHMARKS=1 to run")
+@override_settings(SHARED_VERSION_CHECK_SECONDS=0)
+class DiscoveredItemsBenchmark(TransactionTestCase):
+    """
+    Memory and latency of a user's discovered items bitset as the catalog grows, against the set of ids
+    it stands for and the queries it replaced: an exists() per duplicate check and an exclude(id__in=...)
+    subquery for the undiscovered items
+
+    Sizes come from BENCHMARK_ITEMS (comma separated, default 1000,10000). The user has discovered
+    every other item. Lists are timed with the item catalog already loaded, as in a running worker.
+    """
+    CALLS = 50
+    LIST_CALLS = 5
+
+    def test_cost_by_catalog_size(self):
+        sizes = [int(size) for size in (os.environ.get('BENCHMARK_ITEMS') or '1000,10000').split(',')]
+        user = User.objects.create(username="bench", email="bench@example.com", password="!")
+        repository = UserRepository()
+        discovery_service = ServiceModule().discovery_service
+        rng = random.Random(36)
+        rows = []
+        for size in sizes:
+            self.__grow_to(user, size)
+            User.objects.filter(id=user.id).update(discovered_items=None)
+            ItemCatalog.invalidate()
+            item_ids = list(Item.objects.values_list('id', flat=True))
+            probes = [rng.choice(item_ids) for _ in range(self.CALLS)]
+
+            build_ms, bitset = self.__time(lambda: repository.get_discovered_items(User.objects.get(id=user.id)))
+            tracemalloc.start()
+            try:
+                before, _ = tracemalloc.get_traced_memory()
+                id_set = set(UserDiscovery.objects.filter(user=user).values_list('item_id', flat=True))
+                set_bytes = tracemalloc.get_traced_memory()[0] - before
+            finally:
+                tracemalloc.stop()
+            self.assertEqual(len(bitset), len(id_set))
+
+            # Awards and scans load the user row anyway, the bitset check only adds decoding it
+            loaded = User.objects.get(id=user.id)
+            bitset_check_ms, _ = self.__time(lambda: [
+                item_id in repository.get_discovered_items(loaded) for item_id in probes
+            ])
+            exists_check_ms, _ = self.__time(lambda: [
+                UserDiscovery.objects.filter(user_id=user.id, item_id=item_id).exists() for item_id in probes
+            ])
+            discovery_service.get_undiscovered_items(user.id)  # loads the grown catalog
+            bitset_list_ms, undiscovered = self.__time(lambda: [
+                discovery_service.get_undiscovered_items(user.id) for _ in range(self.LIST_CALLS)
+            ][-1])
+            subquery_list_ms, excluded = self.__time(lambda: [list(Item.objects.exclude(
+                id__in=UserDiscovery.objects.filter(user_id=user.id).values('item_id')
+            ).values('name', 'category', 'rarity', 'point_value')) for _ in range(self.LIST_CALLS)][-1])
+            self.assertEqual(len(undiscovered), len(excluded))
+
+            rows.append((
+                size, len(bitset.to_bytes()), set_bytes, build_ms,
+                bitset_check_ms / self.CALLS, exists_check_ms / self.CALLS,
+                bitset_list_ms / self.LIST_CALLS, subquery_list_ms / self.LIST_CALLS
+            ))
+
+        print(f"\n{'items':>7} {'bitset B':>9} {'id set B':>9} {'build ms':>9} {'check ms':>9} "
+              f"{'exists ms':>10} {'list ms':>8} {'subquery ms':>12}")
+        for size, bitset_bytes, set_bytes, build_ms, check_ms, exists_ms, list_ms, subquery_ms in rows:
+            print(f"{size:>7} {bitset_bytes:>9} {set_bytes:>9} {build_ms:>9.2f} {check_ms:>9.3f} "
+                  f"{exists_ms:>10.3f} {list_ms:>8.2f} {subquery_ms:>12.2f}")
+
+    @staticmethod
+    def __time(call: Callable[[], Any]) -> tuple[float, Any]:
+        started = time.perf_counter()
+        result = call()
+        return (time.perf_counter() - started) * 1000, result
+
+    @staticmethod
+    def __grow_to(user: User, size: int) -> None:
+        start = Item.objects.count()
+        for batch in range(start, size, 5000):
+            items = Item.objects.bulk_create([Item(
+                name=f"bench{i}",
+                environmental_impact_description="",
+                point_value=5,
+                category='PLASTIC',
+                rarity='COMMON',
+                average_decomposition_time=365,
+                threat_level=1
+            ) for i in range(batch, min(size, batch + 5000))])
+            UserDiscovery.objects.bulk_create([UserDiscovery(
+                user=user,
+                item=item,
+                points_awarded=item.point_value,
+                category=item.category,
+                rarity=item.rarity
+            ) for item in items[::2]])
@@ -0,0 +1,85 @@
+from datetime import timedelta
+from django.utils import timezone
+from django.test import TestCase
+from src.models.user import User
+from src.models.items import Item
+from src.models.user_discoveries import UserDiscovery
+from src.models.archived_discovery import ArchivedDiscovery
+from src.service_module import ServiceModule
+
+CATEGORIES = ['PLASTIC', 'METAL', 'GLASS', 'OTHER']
+RARITIES = ['COMMON', 'UNCOMMON', 'RARE', 'EPIC']
+
+
+class DiscoveryHistoryTests(TestCase):
+    HOT = 130
+    ARCHIVED = 25
+
+    def setUp(self):
+        items = Item.objects.bulk_create([Item(
+            name=f"item{i}",
+            environmental_impact_description="",
+            point_value=5,
+            category=CATEGORIES[i % 4],
+            rarity=RARITIES[i // 4 % 4],
+            average_decomposition_time=10,
+            threat_level=1
+        ) for i in range(self.HOT + self.ARCHIVED)])
+        self.user = User.objects.create(username="collector", email="collector@example.com", password="!")
+        now = timezone.now()
+
+        # Archived rows are older than every hot row and keep their ids, see ArchivedDiscovery
+        ArchivedDiscovery.objects.bulk_create([ArchivedDiscovery(
+            id=index + 1,
+            user=self.user,
+            item=item,
+            points_awarded=5,
+            category=item.category,
+            rarity=item.rarity,
+            discovered_at=now - timedelta(days=400 - index)
+        ) for index, item in enumerate(items[:self.ARCHIVED])])
+        UserDiscovery.objects.bulk_create([UserDiscovery(
+            id=self.ARCHIVED + index + 1,
+            user=self.user,
+            item=item,
+            points_awarded=5,
+            category=item.category,
+            rarity=item.rarity,
+            # Pairs share a timestamp so the id tie-break is exercised
+            discovered_at=now - timedelta(hours=self.HOT - index // 2)
+        ) for index, item in enumerate(items[self.ARCHIVED:])])
+
+        self.service = ServiceModule().discovery_service
+
+    def walk(self, limit: int, **filters) -> list[list[dict]]:
+        pages, cursor = [], None
+        while True:
+            page = self.service.get_user_discoveries(self.user.id, limit=limit, cursor=cursor, **filters)
+            pages.append(page['results'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                return pages
+
+    def test_hot_pages_take_one_query(self):
+        cursor = None
+        for _ in range(self.HOT // 20):
+            with self.assertNumQueries(1):
+                page = self.service.get_user_discoveries(self.user.id, limit=20, cursor=cursor)
+            cursor = page['next_cursor']
+        # Running out of hot rows continues into the archive with one more query
+        with self.assertNumQueries(2):
+            self.service.get_user_discoveries(self.user.id, limit=20, cursor=cursor)
+
+    def test_pages_cover_the_history_newest_first(self):
+        entries = [entry for page in self.walk(limit=17) for entry in page]
+        self.assertEqual(len(entries), self.HOT + self.ARCHIVED)
+        self.assertEqual(len({entry['item_name'] for entry in entries}), len(entries))
+        times = [entry['discovered_at'] for entry in entries]
+        self.assertEqual(times, sorted(times, reverse=True))
+
+    def test_filters(self):
+        entries = [entry for page in self.walk(limit=7, category='METAL', rarity='RARE') for entry in page]
+        expected = UserDiscovery.objects.filter(user=self.user, category='METAL', rarity='RARE').count() + \
+            ArchivedDiscovery.objects.filter(user=self.user, category='METAL', rarity='RARE').count()
+        self.assertEqual(len(entries), expected)
+        self.assertTrue(all(entry['category'] == 'METAL' and entry['rarity'] == 'RARE' for entry in entries))
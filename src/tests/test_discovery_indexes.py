@@ -0,0 +1,92 @@
+import unittest
+from datetime import timedelta
+from typing import Callable
+from django.db import connection
+from django.utils import timezone
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from src.models.user import User
+from src.models.items import Item
+from src.models.user_discoveries import UserDiscovery
+from src.repository.discovery_repository import DiscoveryRepository
+from src.service_module import ServiceModule
+
+
+def index_name(*fields: str) -> str:
+    """Name Django gave the UserDiscovery index on exactly these fields"""
+    return next(index.name for index in UserDiscovery._meta.indexes if tuple(index.fields) == fields)
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite', "query plans are asserted as SQLite reports them")
+class DiscoveryIndexTests(TestCase):
+    """
+    The hot analytics queries read user_discoveries through the indexes added for them, not by scanning it
+    Plans come from EXPLAIN QUERY PLAN (connection.ops.explain_query_prefix) of the SQL each call ran
+    """
+
+    def setUp(self):
+        items = Item.objects.bulk_create([Item(
+            name=f"item{i}",
+            environmental_impact_description="",
+            point_value=5,
+            category=['PLASTIC', 'METAL', 'GLASS', 'OTHER'][i % 4],
+            rarity=['COMMON', 'UNCOMMON', 'RARE', 'EPIC'][i // 4 % 4],
+            average_decomposition_time=10,
+            threat_level=1
+        ) for i in range(48)])
+        users = User.objects.bulk_create([
+            User(username=f"user{i}", email=f"user{i}@example.com", password="!") for i in range(40)
+        ])
+        now = timezone.now()
+        UserDiscovery.objects.bulk_create([UserDiscovery(
+            user=user,
+            item=item,
+            points_awarded=5,
+            category=item.category,
+            rarity=item.rarity,
+            # Mostly older than a week, like a real history
+            discovered_at=now - timedelta(days=index % 30, hours=user.id)
+        ) for user in users for index, item in enumerate(items)])
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        self.user = users[0]
+
+    @staticmethod
+    def plan(call: Callable[[], object]) -> str:
+        """Query plans of every statement `call` runs, one detail per line"""
+        with CaptureQueriesContext(connection) as queries:
+            call()
+        details = []
+        with connection.cursor() as cursor:
+            for query in queries.captured_queries:
+                cursor.execute(f"{connection.ops.explain_query_prefix()} {query['sql']}")
+                details += [str(row[-1]) for row in cursor.fetchall()]
+        return "\n".join(details)
+
+    def assert_no_table_scan(self, plan: str):
+        self.assertNotRegex(plan, r"SCAN user_discoveries(?! USING)", plan)
+
+    def test_history_page_seeks_the_user_index(self):
+        plan = self.plan(lambda: DiscoveryRepository.history_page(self.user.id, 20, category='METAL'))
+        self.assertIn(f"INDEX {index_name('user', '-discovered_at', '-id')} (user_id=?)", plan)
+        self.assertNotIn("TEMP B-TREE FOR ORDER BY", plan)  # rows come off the index already in page order
+
+    def test_breakdown_groups_on_the_user_index(self):
+        plan = self.plan(lambda: DiscoveryRepository.totals_by_category_and_rarity(self.user.id))
+        self.assertIn(f"INDEX {index_name('user', 'category', 'rarity', 'points_awarded')} (user_id=?)", plan)
+        self.assert_no_table_scan(plan)
+
+    def test_category_leaderboard_reads_a_covering_index(self):
+        plan = self.plan(lambda: DiscoveryRepository.category_points_page('METAL', 10))
+        self.assertIn(f"COVERING INDEX {index_name('category', 'user', 'points_awarded')} (category=?)", plan)
+        self.assert_no_table_scan(plan)
+
+    def test_category_rank_reads_covering_indexes(self):
+        plan = self.plan(lambda: DiscoveryRepository.count_users_ahead_in_category(self.user.id, 'METAL'))
+        self.assertIn(f"COVERING INDEX {index_name('category', 'user', 'points_awarded')} (category=? AND user_id=?)", plan)
+        self.assert_no_table_scan(plan)
+
+    def test_weekly_leaderboard_reads_only_the_last_week(self):
+        plan = self.plan(lambda: ServiceModule().leaderboard_service.get_weekly_leaderboard(10))
+        self.assertRegex(plan, r"SEARCH user_discoveries USING (COVERING )?INDEX \w+ \(.*discovered_at>\?\)")
+        self.assert_no_table_scan(plan)
@@ -0,0 +1,63 @@
+from datetime import timedelta
+from django.utils import timezone
+from django.test import TestCase
+from src.models.user import User
+from src.models.items import Item
+from src.models.user_discoveries import UserDiscovery
+from src.models.discovery_rollup import DiscoveryRollup
+from src.service_module import ServiceModule
+
+CATEGORIES = ['PLASTIC', 'METAL', 'GLASS', 'OTHER']
+RARITIES = ['COMMON', 'UNCOMMON', 'RARE', 'EPIC']
+
+
+class DiscoveryStatisticsTests(TestCase):
+    def setUp(self):
+        self.items = Item.objects.bulk_create([Item(
+            name=f"item{i}",
+            environmental_impact_description="",
+            point_value=5,
+            category=CATEGORIES[i % 4],
+            rarity=RARITIES[i // 4 % 4],
+            average_decomposition_time=365,
+            threat_level=1
+        ) for i in range(20)])
+        self.user = User.objects.create(username="collector", email="collector@example.com", password="!")
+        now = timezone.now()
+        # One discovery a day for 20 days, the last 7 of them within the week
+        UserDiscovery.objects.bulk_create([UserDiscovery(
+            user=self.user,
+            item=item,
+            points_awarded=5,
+            category=item.category,
+            rarity=item.rarity,
+            discovered_at=now - timedelta(days=day, hours=1)
+        ) for day, item in enumerate(self.items)])
+        DiscoveryRollup.objects.create(
+            user=self.user,
+            day=(now - timedelta(days=400)).date(),
+            category='METAL',
+            rarity='EPIC',
+            discoveries=3,
+            points=30,
+            decomposition_time=3 * 365
+        )
+        self.service = ServiceModule().discovery_service
+
+    def test_one_grouped_query_per_table(self):
+        # The grouped query over recent discoveries and the one over archived rollups, nothing else
+        with self.assertNumQueries(2):
+            statistics = self.service.get_discovery_statistics(self.user.id)
+
+        self.assertEqual(statistics['total_discoveries'], 23)
+        self.assertEqual(statistics['discoveries_last_7_days'], 7)
+        self.assertEqual(statistics['total_points_from_discoveries'], 20 * 5 + 30)
+        self.assertEqual(statistics['total_decomposition_years'], 23)
+        self.assertEqual(statistics['categories']['METAL'], 5 + 3)
+        self.assertEqual(statistics['rarities']['EPIC'], 4 + 3)
+
+    def test_user_without_discoveries(self):
+        other = User.objects.create(username="new", email="new@example.com", password="!")
+        statistics = self.service.get_discovery_statistics(other.id)
+        self.assertEqual(statistics['total_discoveries'], 0)
+        self.assertEqual(statistics['discoveries_last_7_days'], 0)
@@ -0,0 +1,95 @@
+import os
+import time
+import random
+import unittest
+from typing import Any, Callable
+from datetime import timedelta
+from django.db import connection
+from django.utils import timezone
+from django.db.models import Sum, Count
+from django.test import TransactionTestCase
+from src.models.user import User
+from src.models.items import Item
+from src.models.user_discoveries import UserDiscovery
+from src.service_module import ServiceModule
+
+
+@unittest.skipUnless(os.environ.get('RUN_BENCHMARKS'), "set RUN_BENCHMARKS=1 to run")
+class DiscoveryStatisticsBenchmark(TransactionTestCase):
+    """
+    Latency and query count of one user's discovery statistics as their history grows, grouped
+    (what get_discovery_statistics runs) against the per-discovery item lookups it replaced
+
+    Sizes come from BENCHMARK_DISCOVERIES (comma separated, default 1000,10000). A user discovers
+    each item once, so every size needs that many items.
+    """
+    CALLS = 5
+
+    def test_latency_by_history_size(self):
+        sizes = [int(size) for size in (os.environ.get('BENCHMARK_DISCOVERIES') or '1000,10000').split(',')]
+        user = User.objects.create(username="bench", email="bench@example.com", password="!")
+        service = ServiceModule().discovery_service
+        rng = random.Random(34)
+        rows = []
+        for size in sizes:
+            self.__grow_to(user, size, rng)
+
+            grouped_queries, grouped_ms, statistics = self.__measure(
+                lambda: [service.get_discovery_statistics(user.id) for _ in range(self.CALLS)][-1]
+            )
+            self.assertEqual(statistics['total_discoveries'], size)
+            per_row_queries, per_row_ms, _ = self.__measure(lambda: self.__per_discovery_statistics(user.id))
+            rows.append((size, grouped_queries // self.CALLS, grouped_ms / self.CALLS, per_row_queries, per_row_ms))
+
+        print(f"\n{'discoveries':>12} {'grouped queries':>16} {'grouped ms':>11} "
+              f"{'per-row queries':>16} {'per-row ms':>11}")
+        for size, grouped_queries, grouped_ms, per_row_queries, per_row_ms in rows:
+            print(f"{size:>12} {grouped_queries:>16} {grouped_ms:>11.2f} {per_row_queries:>16} {per_row_ms:>11.2f}")
+
+    @staticmethod
+    def __measure(call: Callable[[], Any]) -> tuple[int, float, Any]:
+        """(queries run, milliseconds taken, result) of call(), counted without the capped query log"""
+        queries = []
+
+        def count(execute, *args):
+            queries.append(None)
+            return execute(*args)
+
+        with connection.execute_wrapper(count):
+            started = time.perf_counter()
+            result = call()
+            return len(queries), (time.perf_counter() - started) * 1000, result
+
+    @staticmethod
+    def __per_discovery_statistics(user_id: int) -> None:
+        """The statistics as computed before they were grouped, kept only as the benchmark's reference"""
+        discoveries = UserDiscovery.objects.filter(user_id=user_id)
+        list(discoveries.values('item__category').annotate(count=Count('id')))
+        list(discoveries.values('item__rarity').annotate(count=Count('id')))
+        sum(discovery.item.average_decomposition_time for discovery in discoveries)
+        discoveries.filter(discovered_at__gte=timezone.now() - timedelta(days=7)).count()
+        discoveries.count()
+        discoveries.aggregate(total=Sum('points_awarded'))
+
+    @staticmethod
+    def __grow_to(user: User, size: int, rng: random.Random) -> None:
+        start = Item.objects.count()
+        now = timezone.now()
+        for batch in range(start, size, 5000):
+            items = Item.objects.bulk_create([Item(
+                name=f"bench{i}",
+                environmental_impact_description="",
+                point_value=5,
+                category=rng.choice(['PLASTIC', 'METAL', 'GLASS', 'OTHER']),
+                rarity=rng.choice(['COMMON', 'UNCOMMON', 'RARE', 'EPIC']),
+                average_decomposition_time=rng.randrange(1, 1000),
+                threat_level=1
+            ) for i in range(batch, min(size, batch + 5000))])
+            UserDiscovery.objects.bulk_create([UserDiscovery(
+                user=user,
+                item=item,
+                points_awarded=item.point_value,
+                category=item.category,
+                rarity=item.rarity,
+                discovered_at=now - timedelta(minutes=rng.randrange(60 * 24 * 60))
+            ) for item in items])
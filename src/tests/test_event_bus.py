@@ -0,0 +1,46 @@
+from django.test import TestCase
+from src.models.user import User
+from src.models.outbox_event import OutboxEvent
+from src.models.outbox_delivery import OutboxDelivery
+from src.service.event_bus import EventBus
+
+TOPIC = 'test.topic'
+
+
+class EventBusDeliveryTests(TestCase):
+    def setUp(self):
+        self.bus = EventBus(workers=1, lease_seconds=60, max_backoff_seconds=0)
+        self.calls = []
+        self.bus.subscribe(TOPIC, 'counting', lambda payload: self.calls.append(('counting', payload['n'])))
+        # Published in a transaction that never commits (TestCase), so nothing is scheduled behind our back
+        self.event = self.bus.publish(TOPIC, {"n": 1})
+
+    def test_handler_hitting_a_constraint_is_retried(self):
+        User.objects.create(username="taken", email="taken@example.com", password="!")
+
+        def creating(payload: dict) -> None:
+            self.calls.append(('creating', payload['n']))
+            # The first attempt collides with an existing row, the retry succeeds
+            username = "taken" if self.calls.count(('creating', payload['n'])) == 1 else "fresh"
+            User.objects.create(username=username, email=f"{username}+{payload['n']}@example.com", password="!")
+
+        self.bus.subscribe(TOPIC, 'creating', creating)
+
+        self.assertFalse(self.bus.dispatch(self.event.id))
+        event = OutboxEvent.objects.get(id=self.event.id)
+        self.assertIsNone(event.processed_at)
+        self.assertEqual(event.attempts, 1)
+        self.assertIn("IntegrityError", event.last_error)
+        self.assertEqual(list(OutboxDelivery.objects.values_list('handler', flat=True)), ['counting'])
+
+        self.assertTrue(self.bus.dispatch(self.event.id))
+        self.assertIsNotNone(OutboxEvent.objects.get(id=self.event.id).processed_at)
+        self.assertTrue(User.objects.filter(username="fresh").exists())
+        # The handler that succeeded the first time isn't run again
+        self.assertEqual(self.calls, [('counting', 1), ('creating', 1), ('creating', 1)])
+
+    def test_delivery_claimed_elsewhere_is_skipped(self):
+        # Another dispatcher, whose lease ran out, delivered the event meanwhile
+        OutboxDelivery.objects.create(event=self.event, handler='counting')
+        self.assertTrue(self.bus.dispatch(self.event.id))
+        self.assertEqual(self.calls, [])
@@ -0,0 +1,101 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+from src.models.user import User
+from src.models.skin import Skin
+from src.models.user_skins import UserSkin
+
+
+# The shared catalog may hold a snapshot from another test under the same version, always reload it
+@override_settings(CATALOG_MAX_AGE_SECONDS=0)
+class GrantSkinCommandTests(TestCase):
+    def setUp(self):
+        self.skin = Skin.objects.create(name="Aurora", price_points=0, rarity='EPIC', description="")
+        self.users = User.objects.bulk_create([User(
+            username=f"player{i}",
+            email=f"player{i}@example.com",
+            password="!",
+            total_points_earned=100 * i,
+            is_active=i != 4
+        ) for i in range(6)])
+        # Bought it before the event
+        UserSkin.objects.create(user=self.users[1], skin=self.skin, acquisition_type='PURCHASE')
+
+    def grant(self, *args) -> str:
+        out = StringIO()
+        call_command('grant_skin', self.skin.id, *args, stdout=out)
+        return out.getvalue()
+
+    def users_file(self, user_ids: list[int]) -> str:
+        fd, path = tempfile.mkstemp(suffix='.txt')
+        with os.fdopen(fd, 'w') as file:
+            file.write('\n'.join(map(str, user_ids)) + '\n')
+        self.addCleanup(os.remove, path)
+        return path
+
+    def grants(self) -> list[tuple]:
+        return list(UserSkin.objects.filter(skin=self.skin).order_by('id').values_list('id', 'user_id', 'acquired_at'))
+
+    def owners(self) -> dict[int, str]:
+        return dict(UserSkin.objects.filter(skin=self.skin).values_list('user_id', 'acquisition_type'))
+
+    def test_owners_are_skipped_and_keep_their_skin(self):
+        path = self.users_file([self.users[0].id, self.users[1].id, self.users[2].id, 999999])
+        output = self.grant('--users-file', path)
+
+        self.assertIn("Granted skin", output)
+        self.assertIn("to 2 users, 1 already owned it and 1 don't exist", output)
+        self.assertEqual(self.owners(), {
+            self.users[0].id: 'SPECIAL_EVENT',
+            self.users[1].id: 'PURCHASE',  # not replaced by the grant
+            self.users[2].id: 'SPECIAL_EVENT'
+        })
+
+    def test_rerunning_a_grant_changes_nothing(self):
+        path = self.users_file([user.id for user in self.users[:3]])
+        self.grant('--users-file', path)
+        before = self.grants()
+
+        output = self.grant('--users-file', path)
+        self.assertIn("to 0 users, 3 already owned it", output)
+        self.assertEqual(self.grants(), before)
+
+    def test_grant_racing_another_grant_skips_the_conflict(self):
+        # Another grant inserts one of the users' rows after this one checked who owns the skin
+        bulk_create = UserSkin.objects.bulk_create
+
+        def racing_bulk_create(objs, **kwargs):
+            UserSkin.objects.create(user=self.users[2], skin=self.skin, acquisition_type='ACHIEVEMENT')
+            return bulk_create(objs, **kwargs)
+
+        path = self.users_file([self.users[0].id, self.users[2].id])
+        with mock.patch.object(UserSkin.objects, 'bulk_create', side_effect=racing_bulk_create):
+            self.grant('--users-file', path)
+
+        self.assertEqual(UserSkin.objects.filter(skin=self.skin, user=self.users[2]).count(), 1)
+        self.assertEqual(self.owners()[self.users[2].id], 'ACHIEVEMENT')
+        self.assertEqual(self.owners()[self.users[0].id], 'SPECIAL_EVENT')
+
+    def test_all_active_users_in_batches_and_resumed(self):
+        output = self.grant('--all-active', '--min-points', '200', '--batch-size', '1', '--after-user-id',
+                            str(self.users[2].id))
+        # players 3 and 5, player 4 is inactive and the rest are before the resume point or below the minimum
+        self.assertEqual(output.count("Up to user"), 2)
+        self.assertEqual(set(self.owners()), {self.users[1].id, self.users[3].id, self.users[5].id})
+
+        output = self.grant('--all-active', '--batch-size', '2')
+        self.assertEqual(output.count("Up to user"), 3)
+        self.assertIn("to 2 users, 3 already owned it", output)
+        self.assertNotIn(self.users[4].id, self.owners())
+
+    def test_unknown_skins_and_reasons_are_refused(self):
+        path = self.users_file([self.users[0].id])
+        with self.assertRaisesMessage(CommandError, "Skin not found"):
+            call_command('grant_skin', 999999, '--users-file', path, stdout=StringIO())
+        with self.assertRaisesMessage(CommandError, "Unknown acquisition type"):
+            self.grant('--users-file', path, '--reason', 'GIVEAWAY')
+        self.assertEqual(self.owners(), {self.users[1].id: 'PURCHASE'})
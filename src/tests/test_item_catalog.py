@@ -0,0 +1,74 @@
+from django.test import TestCase, override_settings
+from src.models.items import Item
+from src.cache.item_catalog import ItemCatalog
+from src.cache.shared_version import SharedVersion
+
+
+def make_item(name: str, **fields) -> Item:
+    return Item.objects.create(**{
+        "name": name,
+        "environmental_impact_description": "",
+        "point_value": 5,
+        "category": 'PLASTIC',
+        "average_decomposition_time": 10,
+        "threat_level": 1,
+        **fields
+    })
+
+
+class SharedVersionTests(TestCase):
+    @override_settings(SHARED_VERSION_CHECK_SECONDS=60)
+    def test_bump_reaches_other_processes_after_the_check_interval(self):
+        # Two instances of one key stand in for two worker processes
+        worker, other_worker = SharedVersion('test'), SharedVersion('test')
+        self.assertEqual(worker.get(), 1)
+
+        other_worker.bump()
+        self.assertEqual(other_worker.get(), 2)
+        self.assertEqual(worker.get(), 1)  # not re-read yet
+        with self.settings(SHARED_VERSION_CHECK_SECONDS=0):
+            self.assertEqual(worker.get(), 2)
+
+    def test_bump_before_first_read(self):
+        SharedVersion('fresh').bump()
+        self.assertEqual(SharedVersion('fresh').get(), 2)
+
+    @override_settings(SHARED_VERSION_CHECK_SECONDS=60)
+    def test_reads_are_throttled(self):
+        version = SharedVersion('throttled')
+        version.get()
+        with self.assertNumQueries(0):
+            version.get()
+
+
+class ItemCatalogTests(TestCase):
+    def setUp(self):
+        self.bottle = make_item("Bottle")
+        self.catalog = ItemCatalog()
+
+    def test_saving_an_item_reloads_the_catalog(self):
+        self.assertEqual(self.catalog.get(self.bottle.id).point_value, 5)
+        self.bottle.point_value = 7
+        self.bottle.save()
+        self.assertEqual(self.catalog.get(self.bottle.id).point_value, 7)
+        make_item("Can", category='METAL')
+        self.assertEqual(self.catalog.find_by_name("can").category, 'METAL')
+
+    @override_settings(SHARED_VERSION_CHECK_SECONDS=0)
+    def test_bump_from_another_process_reloads_the_catalog(self):
+        self.catalog.snapshot()
+        Item.objects.filter(id=self.bottle.id).update(point_value=9)  # no signal
+        SharedVersion('item_catalog').bump()  # as another process's save would
+        self.assertEqual(self.catalog.get(self.bottle.id).point_value, 9)
+
+    @override_settings(SHARED_VERSION_CHECK_SECONDS=60, CATALOG_MAX_AGE_SECONDS=60)
+    def test_lookups_are_served_from_memory(self):
+        self.catalog.snapshot()
+        with self.assertNumQueries(0):
+            self.catalog.get(self.bottle.id)
+
+    @override_settings(CATALOG_MAX_AGE_SECONDS=0)
+    def test_old_snapshots_are_reloaded_without_a_bump(self):
+        self.catalog.snapshot()
+        Item.objects.filter(id=self.bottle.id).update(point_value=11)
+        self.assertEqual(self.catalog.get(self.bottle.id).point_value, 11)
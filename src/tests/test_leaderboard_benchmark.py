@@ -0,0 +1,74 @@
+import os
+import time
+import random
+import tempfile
+import unittest
+from django.test import TransactionTestCase
+from src.models.user import User
+from src.models.points_histogram_bucket import PointsHistogramBucket
+from src.repository.user_repository import UserRepository
+from src.cache.leaderboard_snapshot import LeaderboardSnapshot, LeaderboardSnapshotReader
+
+
+@unittest.skipUnless(os.environ.get('RUN_BENCHMARKS'), "set RUN_BENCHMARKS=1 to run")
+class NearbyRankingsBenchmark(TransactionTestCase):
+    """
+    Latency of a deep-tail user's nearby rankings as the users table grows, through the database
+    (histogram position plus two index seeks) and through the shared snapshot
+
+    Sizes come from BENCHMARK_USERS (comma separated, default 10000,100000,1000000). Scores follow a
+    long tailed distribution, so most users sit in crowded low buckets like they do in production.
+    """
+    RANGE = 5
+    CALLS = 20
+
+    def test_latency_by_table_size(self):
+        sizes = [int(size) for size in (os.environ.get('BENCHMARK_USERS') or '10000,100000,1000000').split(',')]
+        repository = UserRepository()
+        rng = random.Random(26)
+        rows = []
+        for size in sizes:
+            self.__grow_to(size, rng)
+            # 90% of the way down, where counting everyone ahead used to be slowest
+            user = User.objects.order_by('-total_points_earned', 'id')[int(size * 0.9)]
+
+            started = time.perf_counter()
+            for _ in range(self.CALLS):
+                repository.get_user_leaderboard_position(user)
+                repository.find_ranked_above(user, self.RANGE)
+                repository.find_ranked_below(user, self.RANGE)
+            database_ms = (time.perf_counter() - started) * 1000 / self.CALLS
+
+            started = time.perf_counter()
+            for _ in range(self.CALLS):
+                User.objects.filter(is_active=True, total_points_earned__gt=user.total_points_earned).count()
+            full_count_ms = (time.perf_counter() - started) * 1000 / self.CALLS
+
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'leaderboard.snapshot')
+                LeaderboardSnapshot.write(path, repository.iter_leaderboard())
+                snapshot = LeaderboardSnapshotReader(path, max_age_seconds=60).current()
+                started = time.perf_counter()
+                for _ in range(self.CALLS):
+                    position = snapshot.position_of(user.id)
+                    snapshot.top(max(0, position - self.RANGE), 2 * self.RANGE + 1)
+                snapshot_ms = (time.perf_counter() - started) * 1000 / self.CALLS
+                self.assertEqual(position + 1, repository.get_user_leaderboard_position(user))
+
+            rows.append((size, database_ms, full_count_ms, snapshot_ms))
+
+        print(f"\n{'users':>10} {'database ms':>12} {'full count ms':>14} {'snapshot ms':>12}")
+        for size, database_ms, full_count_ms, snapshot_ms in rows:
+            print(f"{size:>10} {database_ms:>12.2f} {full_count_ms:>14.2f} {snapshot_ms:>12.3f}")
+
+    @staticmethod
+    def __grow_to(size: int, rng: random.Random) -> None:
+        start = User.objects.count()
+        for batch in range(start, size, 10000):
+            User.objects.bulk_create([User(
+                username=f"bench{i}",
+                email=f"bench{i}@example.com",
+                password="!",
+                total_points_earned=int(rng.paretovariate(1.2) * 10) - 10
+            ) for i in range(batch, min(size, batch + 10000))])
+        PointsHistogramBucket.objects.rebuild()
@@ -0,0 +1,219 @@
+import os
+import random
+import asyncio
+import tempfile
+from django.db import connection
+from django.test import TestCase, SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from src.models.user import User
+from src.cache.snapshot_cache import SnapshotCache
+from src.cache.leaderboard_snapshot import LeaderboardSnapshotReader
+from src.service.leaderboard_service import LeaderboardService
+from src.repository.user_repository import UserRepository
+from src.repository.discovery_repository import DiscoveryRepository
+from src.models.points_histogram_bucket import PointsHistogramBucket
+from src.service.leaderboard_broadcaster import LeaderboardBroadcaster
+
+
+class NearbyRankingsFanOutTests(TestCase):
+    def setUp(self):
+        rng = random.Random(32)
+        User.objects.bulk_create([User(
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            password="!",
+            total_points_earned=rng.choice([0, 5, 5, 40, 300, rng.randrange(2000)])
+        ) for i in range(300)])
+        PointsHistogramBucket.objects.rebuild()
+        self.user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'leaderboard.snapshot')
+
+    def service(self) -> LeaderboardService:
+        return LeaderboardService(
+            user_repository=UserRepository(),
+            discovery_repository=DiscoveryRepository(),
+            snapshot_cache=SnapshotCache(namespace="fan-out-test", ttl_seconds=60, max_stale_seconds=60),
+            snapshot_reader=LeaderboardSnapshotReader(self.path, max_age_seconds=60)
+        )
+
+    def queries_for(self, service: LeaderboardService, subscribers: int) -> int:
+        requests = [(user_id, 3) for user_id in self.user_ids[:subscribers]]
+        with CaptureQueriesContext(connection) as queries:
+            service.get_nearby_rankings_for_many(requests)
+        return len(queries)
+
+    def test_batch_matches_one_user_at_a_time(self):
+        requests = [(user_id, 1 + user_id % 4) for user_id in self.user_ids[::7]] + [(-1, 2)]
+        for with_snapshot in (False, True):
+            service = self.service()
+            if with_snapshot:
+                service.refresh_shared_snapshot(self.path)
+            nearby = service.get_nearby_rankings_for_many(requests)
+            self.assertEqual(nearby[-1], [])
+            for (user_id, range), entries in zip(requests[:-1], nearby):
+                self.assertEqual(entries, service.get_nearby_rankings(user_id, range))
+
+    def test_cost_with_snapshot_does_not_grow_with_subscribers(self):
+        service = self.service()
+        service.refresh_shared_snapshot(self.path)
+        self.assertEqual(self.queries_for(service, 5), 1)
+        self.assertEqual(self.queries_for(service, 250), 1)
+
+    def test_cost_without_snapshot_is_only_the_neighbour_seeks(self):
+        service = self.service()
+        few, many = self.queries_for(service, 5), self.queries_for(service, 85)
+        # One user lookup, one histogram read and one position count shared by all subscribers,
+        # then at most two seeks on each side per subscriber
+        self.assertLessEqual(few, 3 + 4 * 5)
+        self.assertLessEqual(many - few, 4 * 80)
+
+
+class FakeLeaderboard:
+    """Points by username standing in for the users table, and the version a points change would bump"""
+
+    def __init__(self):
+        self.points = {"ann": 50, "bob": 40, "cid": 30}
+        self.current_version = 1
+        self.computes = 0
+
+    def award(self, username: str, points: int) -> None:
+        self.points[username] = points
+        self.current_version += 1
+
+    def version(self) -> int:
+        return self.current_version
+
+    def entries(self) -> list[dict]:
+        ranked = sorted(self.points.items(), key=lambda item: -item[1])
+        return [{"rank": rank, "username": username, "points": points}
+                for rank, (username, points) in enumerate(ranked, start=1)]
+
+    def get_global_leaderboard(self, limit: int) -> dict:
+        self.computes += 1
+        return {"results": self.entries()[:limit]}
+
+    def get_nearby_rankings(self, user_id: int, range: int) -> list[dict]:
+        return self.entries()
+
+    def get_nearby_rankings_for_many(self, requests: list[tuple[int, int]]) -> list[list[dict]]:
+        return [self.entries() for _ in requests]
+
+
+class LeaderboardBroadcasterTests(SimpleTestCase):
+    HEARTBEAT = 0.1
+
+    def setUp(self):
+        self.leaderboard = FakeLeaderboard()
+        self.broadcaster = LeaderboardBroadcaster(
+            leaderboard_service=self.leaderboard,
+            snapshot_cache=self.leaderboard,
+            interval_seconds=0.01,
+            refresh_seconds=60,
+            top_k=2
+        )
+
+    async def next_event(self, stream):
+        return await asyncio.wait_for(stream.__anext__(), timeout=5)
+
+    @staticmethod
+    def points_of(entries: list[dict]) -> dict:
+        return {entry['username']: entry['points'] for entry in entries}
+
+    async def ticks(self) -> None:
+        await asyncio.sleep(0.05)
+
+    async def test_first_event_carries_the_full_state(self):
+        stream = self.broadcaster.subscribe(user_id=1, range=1, heartbeat_seconds=self.HEARTBEAT)
+        event = await self.next_event(stream)
+        self.assertEqual(event['version'], 1)
+        self.assertEqual(self.points_of(event['top']['changed']), {"ann": 50, "bob": 40})
+        self.assertEqual(self.points_of(event['nearby']['changed']), {"ann": 50, "bob": 40, "cid": 30})
+        self.assertEqual(self.broadcaster.subscriber_count, 1)
+        await stream.aclose()
+        self.assertEqual(self.broadcaster.subscriber_count, 0)
+
+    async def test_changes_are_pushed_as_diffs(self):
+        stream = self.broadcaster.subscribe(user_id=1, range=1, heartbeat_seconds=self.HEARTBEAT)
+        await self.next_event(stream)
+        self.leaderboard.award("cid", 60)
+
+        event = await self.next_event(stream)
+        self.assertEqual(event['version'], 2)
+        self.assertEqual(event['top']['changed'], [
+            {"rank": 1, "username": "cid", "points": 60},
+            {"rank": 2, "username": "ann", "points": 50}
+        ])
+        self.assertEqual(event['top']['removed'], ["bob"])
+        await stream.aclose()
+
+    async def test_nothing_is_sent_without_a_difference(self):
+        stream = self.broadcaster.subscribe(user_id=1, range=1, heartbeat_seconds=self.HEARTBEAT)
+        await self.next_event(stream)
+        computes = self.leaderboard.computes
+
+        # The version didn't move, so nothing is even recomputed
+        self.assertIsNone(await self.next_event(stream))
+        self.assertEqual(self.leaderboard.computes, computes)
+
+        # It moved but the standings are the same, recomputed but only the heartbeat goes out
+        self.leaderboard.award("ann", 50)
+        self.assertIsNone(await self.next_event(stream))
+        self.assertGreater(self.leaderboard.computes, computes)
+        await stream.aclose()
+
+    async def test_updates_a_slow_subscriber_missed_are_coalesced(self):
+        stream = self.broadcaster.subscribe(user_id=1, range=1, heartbeat_seconds=self.HEARTBEAT)
+        await self.next_event(stream)
+
+        # Two ticks with different changes while the subscriber isn't reading
+        self.leaderboard.award("cid", 35)
+        await self.ticks()
+        self.leaderboard.award("ann", 55)
+        await self.ticks()
+
+        event = await self.next_event(stream)
+        self.assertEqual(event['version'], 3)
+        self.assertEqual(self.points_of(event['nearby']['changed']), {"cid": 35, "ann": 55})
+        self.assertEqual(self.points_of(event['top']['changed']), {"ann": 55})
+        self.assertIsNone(await self.next_event(stream))  # the first update isn't delivered again
+        await stream.aclose()
+
+    async def test_entries_leaving_and_returning_while_coalesced(self):
+        stream = self.broadcaster.subscribe(user_id=1, range=1, heartbeat_seconds=self.HEARTBEAT)
+        await self.next_event(stream)
+
+        self.leaderboard.award("cid", 45)  # bob drops out of the top 2
+        await self.ticks()
+        self.leaderboard.award("cid", 30)  # and is back
+        await self.ticks()
+
+        event = await self.next_event(stream)
+        self.assertEqual(self.points_of(event['top']['changed']), {"bob": 40})
+        self.assertEqual(event['top']['removed'], ["cid"])
+        await stream.aclose()
+
+    async def test_disconnected_subscribers_are_dropped(self):
+        stream = self.broadcaster.subscribe(user_id=1, range=1, heartbeat_seconds=60)
+        await self.next_event(stream)
+
+        async def read_forever():
+            async for _ in stream:
+                pass
+
+        # The server cancels the response's iterator when the client goes away
+        reader = asyncio.ensure_future(read_forever())
+        await self.ticks()
+        reader.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await reader
+        self.assertEqual(self.broadcaster.subscriber_count, 0)
+
+        # With nobody left the loop stops waking up
+        await self.ticks()
+        computes = self.leaderboard.computes
+        self.leaderboard.award("bob", 90)
+        await self.ticks()
+        self.assertEqual(self.leaderboard.computes, computes)
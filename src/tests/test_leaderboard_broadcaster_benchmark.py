@@ -0,0 +1,126 @@
+import os
+import time
+import random
+import asyncio
+import tempfile
+import unittest
+import tracemalloc
+from typing import Optional
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import TransactionTestCase
+from src.models.user import User
+from src.cache.snapshot_cache import SnapshotCache
+from src.cache.leaderboard_snapshot import LeaderboardSnapshotReader
+from src.service.leaderboard_service import LeaderboardService
+from src.service.leaderboard_broadcaster import LeaderboardBroadcaster
+from src.repository.user_repository import UserRepository
+from src.repository.discovery_repository import DiscoveryRepository
+from src.models.points_histogram_bucket import PointsHistogramBucket
+
+
+@unittest.skipUnless(os.environ.get('RUN_BENCHMARKS'), "set RUN_BENCHMARKS=1 to run")
+class LeaderboardBroadcasterBenchmark(TransactionTestCase):
+    """
+    Cost of idle stream subscribers in one process as they grow: Python memory each, time to subscribe,
+    and the time and queries of one broadcast tick that changes the top of the leaderboard for everyone
+
+    Sizes come from BENCHMARK_SUBSCRIBERS (comma separated, default 1000,5000). Neighbourhoods are read
+    from the shared leaderboard snapshot, the way production workers do once the snapshot is written.
+    Subscribing is timed while tracemalloc traces it, so it reads several times slower than it runs.
+    """
+    USERS = 20000
+
+    def setUp(self):
+        self.queries = None  # type: Optional[list]
+
+    def __count(self, execute, *args):
+        if self.queries is not None:
+            self.queries.append(None)
+        return execute(*args)
+
+    def test_cost_by_subscriber_count(self):
+        sizes = [int(size) for size in (os.environ.get('BENCHMARK_SUBSCRIBERS') or '1000,5000').split(',')]
+        rng = random.Random(32)
+        User.objects.bulk_create([User(
+            username=f"bench{i}",
+            email=f"bench{i}@example.com",
+            password="!",
+            total_points_earned=int(rng.paretovariate(1.2) * 10) - 10
+        ) for i in range(max(self.USERS, max(sizes)))])
+        PointsHistogramBucket.objects.rebuild()
+        user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+
+        rows = []
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'leaderboard.snapshot')
+            for size in sizes:
+                snapshot_cache = SnapshotCache(
+                    namespace=f"broadcast-bench-{size}", ttl_seconds=60, max_stale_seconds=60
+                )
+                service = LeaderboardService(
+                    user_repository=UserRepository(),
+                    discovery_repository=DiscoveryRepository(),
+                    snapshot_cache=snapshot_cache,
+                    snapshot_reader=LeaderboardSnapshotReader(path, max_age_seconds=3600)
+                )
+                service.refresh_shared_snapshot(path)
+                # ORM calls of the broadcaster run back on this thread, so its connection sees their queries
+                with connection.execute_wrapper(self.__count):
+                    measured = async_to_sync(self.__measure)(service, snapshot_cache, path, user_ids[:size])
+                rows.append((size, *measured))
+
+        print(f"\n{'subscribers':>12} {'bytes each':>11} {'subscribe ms':>13} {'tick ms':>9} "
+              f"{'tick queries':>13} {'delivered':>10}")
+        for size, bytes_each, subscribe_ms, tick_ms, tick_queries, delivered in rows:
+            print(f"{size:>12} {bytes_each:>11.0f} {subscribe_ms:>13.1f} {tick_ms:>9.1f} "
+                  f"{tick_queries:>13} {delivered:>10}")
+
+    async def __measure(
+            self, service: LeaderboardService, snapshot_cache: SnapshotCache, path: str, user_ids: list[int]
+    ) -> tuple[float, float, float, int, int]:
+        """(bytes per idle subscriber, ms to subscribe all, ms of one tick, its queries, subscribers it reached)"""
+        broadcaster = LeaderboardBroadcaster(
+            leaderboard_service=service,
+            snapshot_cache=snapshot_cache,
+            interval_seconds=3600,  # ticks are driven by hand below
+            refresh_seconds=3600,
+            top_k=10
+        )
+        streams = [broadcaster.subscribe(user_id, 2, heartbeat_seconds=3600) for user_id in user_ids]
+
+        tracemalloc.start()
+        try:
+            before, _ = tracemalloc.get_traced_memory()
+            started = time.perf_counter()
+            for stream in streams:
+                await stream.__anext__()
+            subscribe_ms = (time.perf_counter() - started) * 1000
+            # Every subscriber parked waiting for its next update, as idle connections are
+            readers = [asyncio.ensure_future(stream.__anext__()) for stream in streams]
+            await asyncio.sleep(0)
+            after, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(broadcaster.subscriber_count, len(user_ids))
+
+        # A new leader, which changes the top for every subscriber
+        await User.objects.filter(id=user_ids[-1]).aupdate(total_points_earned=10 ** 9)
+        await asyncio.to_thread(service.refresh_shared_snapshot, path)
+        snapshot_cache.bump_version()
+        self.queries = []
+        started = time.perf_counter()
+        await broadcaster._LeaderboardBroadcaster__tick()
+        tick_ms = (time.perf_counter() - started) * 1000
+        tick_queries, self.queries = len(self.queries), None
+        await asyncio.wait(readers, timeout=5)
+        delivered = sum(reader.done() for reader in readers)
+
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+        for stream in streams:
+            await stream.aclose()
+        broadcaster._LeaderboardBroadcaster__task.cancel()
+        self.assertEqual(broadcaster.subscriber_count, 0)
+        return (after - before) / len(user_ids), subscribe_ms, tick_ms, tick_queries, delivered
@@ -0,0 +1,80 @@
+import random
+from django.test import TestCase
+from src.models.user import User
+from src.models.points_histogram_bucket import PointsHistogramBucket
+from src.repository.user_repository import UserRepository
+
+
+class LeaderboardPositionTests(TestCase):
+    def setUp(self):
+        rng = random.Random(26)
+        points = (
+            [0] * 40 +
+            [rng.randrange(1, 1000) for _ in range(150)] +
+            [rng.randrange(1000, 100000) for _ in range(80)] +
+            [500] * 15 +  # ties broken by id
+            [2 * 10 ** 9] * 3  # past the last bound, in the open ended last bucket
+        )
+        rng.shuffle(points)
+        User.objects.bulk_create([User(
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            password="!",
+            total_points_earned=total,
+            is_active=rng.random() > 0.1
+        ) for i, total in enumerate(points)])
+        PointsHistogramBucket.objects.rebuild()
+        self.repository = UserRepository()
+
+    @staticmethod
+    def expected_positions() -> dict[int, int]:
+        """Position of every user, counting only active users ahead of them"""
+        users = list(User.objects.values_list('id', 'total_points_earned', 'is_active'))
+        ranked = sorted((-total, user_id) for user_id, total, is_active in users if is_active)
+        return {
+            user_id: sum(1 for key in ranked if key < (-total, user_id)) + 1
+            for user_id, total, _ in users
+        }
+
+    def assert_positions_exact(self):
+        expected = self.expected_positions()
+        for user in User.objects.all():
+            self.assertEqual(self.repository.get_user_leaderboard_position(user), expected[user.id], user.username)
+            self.assertEqual(self.repository.get_user_rank_position(user.id), expected[user.id], user.username)
+
+    def test_positions_match_the_leaderboard_ordering(self):
+        self.assert_positions_exact()
+
+    def test_neighbours_are_seeked_in_leaderboard_order(self):
+        ranked = list(User.objects.filter(is_active=True).order_by('-total_points_earned', 'id').values_list('id', flat=True))
+        for user in User.objects.filter(id__in=ranked):
+            index = ranked.index(user.id)
+            above = [entry['id'] for entry in self.repository.find_ranked_above(user, 4)]
+            below = [entry['id'] for entry in self.repository.find_ranked_below(user, 4)]
+            self.assertEqual(above, ranked[max(0, index - 4):index][::-1])
+            self.assertEqual(below, ranked[index + 1:index + 5])
+
+    def test_position_reads_the_histogram_and_one_bucket(self):
+        user = User.objects.order_by('total_points_earned', 'id').last()
+        with self.assertNumQueries(2):
+            self.repository.get_user_leaderboard_position(user)
+        user = User.objects.order_by('total_points_earned', 'id').first()
+        with self.assertNumQueries(2):
+            self.repository.get_user_leaderboard_position(user)
+
+    def test_histogram_follows_activation(self):
+        users = list(User.objects.order_by('id')[:30])
+        for user in users:
+            self.assertTrue(self.repository.set_active(user.id, not user.is_active))
+        self.assertFalse(self.repository.set_active(-1, True))
+        for user in users[:5]:
+            self.repository.update_points(user.id, user.points_balance + 70, user.total_points_earned + 70)
+
+        kept = {bucket: users for bucket, users in PointsHistogramBucket.objects.counts().items() if users}
+        PointsHistogramBucket.objects.rebuild()
+        self.assertEqual(kept, PointsHistogramBucket.objects.counts())
+        self.assert_positions_exact()
+
+    def test_unknown_user_has_no_rank_position(self):
+        with self.assertRaises(ValueError):
+            self.repository.get_user_rank_position(-1)
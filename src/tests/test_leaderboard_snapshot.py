@@ -0,0 +1,113 @@
+import os
+import time
+import tempfile
+from django.test import TestCase
+from src.models.user import User
+from src.cache.snapshot_cache import SnapshotCache
+from src.cache.leaderboard_snapshot import LeaderboardSnapshot, LeaderboardSnapshotReader
+from src.service.leaderboard_service import LeaderboardService
+from src.repository.user_repository import UserRepository
+from src.repository.discovery_repository import DiscoveryRepository
+from src.models.points_histogram_bucket import PointsHistogramBucket
+
+
+class SharedSnapshotTests(TestCase):
+    MAX_AGE_SECONDS = 60
+
+    def setUp(self):
+        self.ann, self.bob, self.cid = User.objects.bulk_create([
+            User(username=username, email=f"{username}@example.com", password="!", total_points_earned=points)
+            for username, points in (("ann", 300), ("bob", 200), ("cid", 100))
+        ])
+        PointsHistogramBucket.objects.rebuild()
+
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'leaderboard.snapshot')
+        self.reader = LeaderboardSnapshotReader(self.path, max_age_seconds=self.MAX_AGE_SECONDS)
+        self.service = LeaderboardService(
+            user_repository=UserRepository(),
+            discovery_repository=DiscoveryRepository(),
+            snapshot_cache=SnapshotCache(namespace="shared-snapshot-test", ttl_seconds=60, max_stale_seconds=60),
+            snapshot_reader=self.reader
+        )
+
+    def standings(self) -> list[str]:
+        return [entry['username'] for entry in self.service.get_global_leaderboard(10)['results']]
+
+    def nearby(self, user: User) -> list[str]:
+        return [entry['username'] for entry in self.service.get_nearby_rankings(user.id, 1)]
+
+    def overtake(self) -> None:
+        """cid moves to the top in the database, which a snapshot written before doesn't know"""
+        User.objects.filter(id=self.cid.id).update(total_points_earned=1000)
+        PointsHistogramBucket.objects.rebuild()
+
+    def write(self, age_seconds: float = 0) -> None:
+        self.service.refresh_shared_snapshot(self.path)
+        if age_seconds:
+            with open(self.path, 'r+b') as file:
+                header = LeaderboardSnapshot.HEADER.unpack(file.read(LeaderboardSnapshot.HEADER.size))
+                file.seek(0)
+                file.write(LeaderboardSnapshot.HEADER.pack(*header[:3], header[3] - age_seconds))
+
+    def test_rankings_come_from_the_snapshot_while_it_is_fresh(self):
+        self.write()
+        self.overtake()
+        self.assertIsNotNone(self.reader.current())
+        self.assertEqual(self.standings(), ["ann", "bob", "cid"])
+        self.assertEqual(self.nearby(self.cid), ["bob", "cid"])
+
+    def test_snapshot_too_old_falls_back_to_the_database(self):
+        self.write(age_seconds=self.MAX_AGE_SECONDS + 1)
+        self.overtake()
+        self.assertIsNone(self.reader.current())
+        self.assertEqual(self.standings(), ["cid", "ann", "bob"])
+        self.assertEqual(self.nearby(self.cid), ["cid", "ann"])
+
+    def test_missing_snapshot_falls_back_to_the_database(self):
+        self.overtake()
+        self.assertIsNone(self.reader.current())
+        self.assertEqual(self.standings(), ["cid", "ann", "bob"])
+
+        # The refresher writing one later is picked up without a restart
+        self.write()
+        self.assertIsNotNone(self.reader.current())
+        os.remove(self.path)
+        self.assertIsNone(self.reader.current())
+
+    def test_corrupt_snapshot_falls_back_to_the_database(self):
+        self.overtake()
+        with open(self.path, 'wb') as file:
+            file.write(b'not a leaderboard snapshot at all, just some bytes')
+        with self.assertLogs('src.cache.leaderboard_snapshot', level='ERROR'):
+            self.assertIsNone(self.reader.current())
+        self.assertEqual(self.standings(), ["cid", "ann", "bob"])
+        self.assertEqual(self.nearby(self.ann), ["cid", "ann", "bob"])
+
+    def test_truncated_snapshot_falls_back_to_the_database(self):
+        self.write()
+        self.overtake()
+        with open(self.path, 'r+b') as file:
+            file.truncate(os.path.getsize(self.path) - 8)
+        with self.assertLogs('src.cache.leaderboard_snapshot', level='ERROR'):
+            self.assertEqual(self.standings(), ["cid", "ann", "bob"])
+
+        # Replaced by a good one on the next refresh
+        self.write()
+        self.assertEqual(self.standings(), ["cid", "ann", "bob"])
+        self.assertIsNotNone(self.reader.current())
+
+    def test_empty_snapshot_file_falls_back_to_the_database(self):
+        open(self.path, 'wb').close()
+        self.assertIsNone(self.reader.current())
+        self.assertEqual(self.standings(), ["ann", "bob", "cid"])
+
+    def test_refreshed_snapshot_is_remapped(self):
+        self.write()
+        first = self.reader.current()
+        self.overtake()
+        time.sleep(0.01)  # a distinct mtime even on coarse clocks
+        self.write()
+        self.assertIsNot(self.reader.current(), first)
+        self.assertEqual(self.standings(), ["cid", "ann", "bob"])
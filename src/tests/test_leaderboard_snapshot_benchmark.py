@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import random
+import tempfile
+import unittest
+import subprocess
+from django.test import SimpleTestCase
+from src.cache.leaderboard_snapshot import LeaderboardSnapshot
+
+# A worker answering every user's position from the snapshot, either mapped as the app does or copied into its heap
+WORKER = """
+import sys, json
+from src.cache.leaderboard_snapshot import LeaderboardSnapshot, LeaderboardSnapshotReader
+
+def memory_kib():
+    with open('/proc/self/smaps_rollup') as file:
+        fields = dict(line.split()[:2] for line in file if line.split()[0].endswith(':'))
+    return {
+        "rss": int(fields['Rss:']),
+        "pss": int(fields['Pss:']),
+        "private": int(fields['Private_Clean:']) + int(fields['Private_Dirty:'])
+    }
+
+path, mode = sys.argv[1], sys.argv[2]
+before = memory_kib()
+if mode == 'mapped':
+    snapshot = LeaderboardSnapshotReader(path, max_age_seconds=3600).current()
+else:
+    with open(path, 'rb') as file:
+        snapshot = LeaderboardSnapshot(bytearray(file.read()))  # the same view, over a private copy
+
+# Touch every page, as a worker does over time serving positions and pages for all users
+for offset in range(0, snapshot.count, 1000):
+    for user_id, _ in snapshot.top(offset, 1000):
+        snapshot.position_of(user_id)
+after = memory_kib()
+print(json.dumps({key: after[key] - before[key] for key in after}), flush=True)
+sys.stdin.read()
+"""
+
+
+@unittest.skipUnless(os.environ.get('RUN_BENCHMARKS'), "set RUN_BENCHMARKS=1 to run")
+@unittest.skipUnless(os.path.exists('/proc/self/smaps_rollup'), "needs Linux smaps_rollup")
+class LeaderboardSnapshotMemoryBenchmark(SimpleTestCase):
+    """
+    Memory each worker process adds for the shared leaderboard snapshot once it has touched all of it,
+    memory-mapped (what LeaderboardSnapshotReader does) against the same arrays copied into the heap
+
+    Sizes come from BENCHMARK_USERS (comma separated, default 100000,1000000), BENCHMARK_WORKERS
+    processes (default 4) stay alive together so PSS splits the shared pages between them. RSS counts
+    shared pages in full, PSS and private memory are what a worker really costs.
+    """
+
+    def test_memory_per_worker(self):
+        sizes = [int(size) for size in (os.environ.get('BENCHMARK_USERS') or '100000,1000000').split(',')]
+        workers = int(os.environ.get('BENCHMARK_WORKERS') or 4)
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        rng = random.Random(30)
+        rows = []
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'leaderboard.snapshot')
+            for size in sizes:
+                scores = sorted((int(rng.paretovariate(1.2) * 10) for _ in range(size)), reverse=True)
+                LeaderboardSnapshot.write(path, zip(rng.sample(range(1, 10 * size), size), scores))
+                file_mib = os.path.getsize(path) / 2 ** 20
+                for mode in ('mapped', 'copied'):
+                    processes = [subprocess.Popen(
+                        [sys.executable, '-c', WORKER, path, mode],
+                        stdin=subprocess.PIPE,
+                        stdout=subprocess.PIPE,
+                        text=True,
+                        cwd=root,
+                        env={**os.environ, 'PYTHONPATH': root}
+                    ) for _ in range(workers)]
+                    try:
+                        # Every worker reports only once it touched the whole snapshot, all are alive at once
+                        measured = [json.loads(process.stdout.readline()) for process in processes]
+                    finally:
+                        for process in processes:
+                            process.stdin.close()
+                            process.wait(timeout=30)
+                            process.stdout.close()
+                    rows.append((size, file_mib, mode, *(
+                        sum(memory[key] for memory in measured) / workers / 1024
+                        for key in ('rss', 'pss', 'private')
+                    )))
+
+        print(f"\n{'users':>10} {'file MiB':>9} {'mode':>7} {'RSS MiB':>8} {'PSS MiB':>8} {'private MiB':>12}"
+              f"   (per worker, {workers} workers)")
+        for size, file_mib, mode, rss, pss, private in rows:
+            print(f"{size:>10} {file_mib:>9.1f} {mode:>7} {rss:>8.1f} {pss:>8.1f} {private:>12.1f}")
@@ -0,0 +1,11 @@
+from django.test import TestCase
+
+
+class LeaderboardStreamTests(TestCase):
+    def test_wsgi_requests_are_refused(self):
+        response = self.client.get('/api/v1/leaderboard/stream/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 501)
+
+    async def test_asgi_requests_need_credentials(self):
+        response = await self.async_client.get('/api/v1/leaderboard/stream/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,88 @@
+import random
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, override_settings
+from src.models.user import User
+from src.cache.snapshot_cache import SnapshotCache
+from src.service.percentile_service import PercentileService
+from src.repository.user_repository import UserRepository
+from src.models.points_histogram_bucket import PointsHistogramBucket
+
+
+class PercentileServiceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        rng = random.Random(29)
+        # Long tailed like real scores, with clusters so some buckets are crowded
+        points = [int(rng.paretovariate(1.1) * 10) - 10 for _ in range(1500)] + [250] * 40 + [5000] * 25
+        User.objects.bulk_create([User(
+            username=f"user{i}",
+            email=f"user{i}@example.com",
+            password="!",
+            total_points_earned=total,
+            is_active=rng.random() > 0.15
+        ) for i, total in enumerate(points)])
+        PointsHistogramBucket.objects.rebuild()
+        self.repository = UserRepository()
+        self.service = PercentileService(self.repository, SnapshotCache(
+            namespace="percentile-test",
+            ttl_seconds=60,
+            max_stale_seconds=60
+        ))
+
+    def test_estimate_is_within_the_reported_error(self):
+        scores = sorted(User.objects.filter(is_active=True).values_list('total_points_earned', flat=True))
+        for total_points in sorted(set(scores)) + [1, 9, 10, 11, 999, 1000, 1001, 10 ** 10]:
+            exact = sum(1 for score in scores if score > total_points)
+            estimate, error = self.service.estimate_users_ahead(total_points)
+            self.assertLessEqual(abs(estimate - exact), error, total_points)
+
+    def test_zero_points_are_exact(self):
+        estimate, error = self.service.estimate_users_ahead(0)
+        self.assertEqual(estimate, User.objects.filter(is_active=True, total_points_earned__gt=0).count())
+
+    def test_standing_counts_active_users_only(self):
+        active = User.objects.filter(is_active=True)
+        leader = active.order_by('-total_points_earned', 'id').first()
+        standing = self.service.get_standing(leader)
+        self.assertEqual(standing["leaderboard_position"], 1)
+        # Estimated, but out of the active users only
+        self.assertLessEqual(
+            abs(standing["top_percent"] - 100 / active.count()),
+            standing["top_percent_error"] + 0.01
+        )
+
+        inactive = User.objects.filter(is_active=False).order_by('-total_points_earned').first()
+        self.assertEqual(
+            self.repository.get_user_rank_position(inactive.id),
+            self.repository.get_user_leaderboard_position(inactive)
+        )
+
+    def test_scores_past_the_last_bound_are_not_negative(self):
+        top = PointsHistogramBucket.LOWER_BOUNDS[-1]
+        User.objects.create(username="whale", email="whale@example.com", password="!", total_points_earned=top + 5)
+        PointsHistogramBucket.objects.rebuild()
+        for total_points in (top - 1, top, top + 5, 10 * top):
+            estimate, _ = self.service.estimate_users_ahead(total_points)
+            self.assertGreaterEqual(estimate, 0, total_points)
+        whale = User.objects.get(username="whale")
+        self.assertEqual(self.service.get_standing(whale)["leaderboard_position"], 1)
+        self.assertGreater(self.service.get_standing(whale)["top_percent"], 0)
+
+
+class ShardedHistogramTests(TestCase):
+    @override_settings(POINTS_HISTOGRAM_SHARDS=4)
+    def test_changes_spread_over_shards_and_sum_up(self):
+        users = [UserRepository().create(f"user{i}", f"user{i}@example.com", "secret") for i in range(40)]
+        for user in users[:25]:
+            UserRepository().update_points(user.id, 15, 15)
+        UserRepository.set_active(users[-1].id, False)
+
+        self.assertGreater(PointsHistogramBucket.objects.filter(bucket=0).count(), 1)
+        zero, fifteen = PointsHistogramBucket.bucket_for(0), PointsHistogramBucket.bucket_for(15)
+        counts = PointsHistogramBucket.objects.counts()
+        self.assertEqual((counts[zero], counts[fifteen]), (14, 25))
+
+        PointsHistogramBucket.objects.filter(bucket=zero).update(users=F('users') + 3)  # drifted
+        PointsHistogramBucket.objects.rebuild()
+        self.assertEqual(PointsHistogramBucket.objects.counts(), {zero: 14, fifteen: 25})
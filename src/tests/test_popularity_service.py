@@ -0,0 +1,153 @@
+import math
+import random
+from datetime import datetime, timezone
+from django.conf import settings
+from django.test import TestCase, override_settings
+from src.models.items import Item
+from src.cache.item_catalog import ItemCatalog
+from src.cache.snapshot_cache import SnapshotCache
+from src.service.popularity_service import PopularityService
+from src.repository.discovery_repository import DiscoveryRepository
+from src.models.item_popularity_counter import ItemPopularityCounter
+from src.models.outbox_event import OutboxEvent
+from src.models.outbox_delivery import OutboxDelivery
+from src.service.event_bus import EventBus
+
+EPOCH = 20000  # any day, discoveries are placed relative to its start
+
+
+def at(epoch: int, hours: float) -> datetime:
+    return datetime.fromtimestamp((EPOCH + epoch) * PopularityService.EPOCH_SECONDS + hours * 3600, tz=timezone.utc)
+
+
+def make_service() -> PopularityService:
+    return PopularityService(
+        discovery_repository=DiscoveryRepository(),
+        item_catalog=ItemCatalog(),
+        snapshot_cache=SnapshotCache(namespace="popularity-test", ttl_seconds=60, max_stale_seconds=60)
+    )
+
+
+@override_settings(POPULARITY_COUNTER_SHARDS=1)
+class TrendingScoreTests(TestCase):
+    def setUp(self):
+        self.item = Item.objects.create(
+            name="Bottle",
+            environmental_impact_description="",
+            point_value=5,
+            category='PLASTIC',
+            average_decomposition_time=10,
+            threat_level=1
+        )
+        self.service = make_service()
+        self.decay = math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 60 * 60)
+
+    def weight(self, hours: float, epochs_back: int = 0) -> float:
+        """Weight of a discovery `hours` into its epoch, re-anchored `epochs_back` epochs later"""
+        return math.exp(self.decay * (hours * 3600 - epochs_back * PopularityService.EPOCH_SECONDS))
+
+    def record(self, *times: datetime) -> None:
+        for discovered_at in times:
+            self.service.record_discovery(self.item.id, discovered_at)
+
+    def assert_counter(self, epoch: int, trending: float, discoveries: int):
+        counter = ItemPopularityCounter.objects.get(item=self.item)
+        self.assertEqual(counter.trending_epoch, EPOCH + epoch)
+        self.assertAlmostEqual(counter.trending, trending, places=9)
+        self.assertEqual(counter.discoveries, discoveries)
+
+    def test_same_epoch_adds_up(self):
+        self.record(at(0, 1), at(0, 5))
+        self.assert_counter(0, self.weight(1) + self.weight(5), 2)
+
+    def test_next_epoch_rescales_the_stored_score(self):
+        self.record(at(0, 1), at(1, 2))
+        self.assert_counter(1, self.weight(1, 1) + self.weight(2), 2)
+
+    def test_gap_rescales_the_stored_score(self):
+        self.record(at(0, 1), at(3, 2))
+        self.assert_counter(3, self.weight(1, 3) + self.weight(2), 2)
+
+    def test_discoveries_past_the_horizon_count_as_nothing(self):
+        self.record(at(0, 1), at(400, 2), at(1, 3))
+        self.assert_counter(400, self.weight(2), 3)
+
+    def test_late_discovery_is_rescaled_into_the_stored_epoch(self):
+        self.record(at(1, 2), at(0, 1))
+        self.assert_counter(1, self.weight(2) + self.weight(1, 1), 2)
+
+    def test_very_late_discovery_keeps_the_stored_score(self):
+        self.record(at(3, 2), at(0, 1))
+        self.assert_counter(3, self.weight(2) + self.weight(1, 3), 2)
+
+    def test_order_does_not_matter(self):
+        times = [at(0, 1), at(1, 2), at(1, 20), at(2, 3)]
+        self.record(*times)
+        in_order = ItemPopularityCounter.objects.get(item=self.item)
+        ItemPopularityCounter.objects.all().delete()
+        self.record(*reversed(times))
+        self.assert_counter(2, in_order.trending, 4)
+
+
+@override_settings(POPULARITY_COUNTER_SHARDS=1)
+class OutOfOrderDeliveryTests(TestCase):
+    """Discovery events reach the popularity counters through the EventBus in whatever order they're dispatched"""
+
+    def setUp(self):
+        self.items = Item.objects.bulk_create([Item(
+            name=f"item{i}",
+            environmental_impact_description="",
+            point_value=5,
+            category='PLASTIC',
+            average_decomposition_time=10,
+            threat_level=1
+        ) for i in range(3)])
+        self.bus = EventBus(workers=1, lease_seconds=60, max_backoff_seconds=1)
+        self.bus.subscribe(OutboxEvent.DISCOVERY_RECORDED, 'popularity_counters', make_service().on_discovery_recorded)
+
+        # Published in discovery order, not delivered yet: TestCase never commits, so nothing is scheduled
+        rng = random.Random(49)
+        self.event_ids = [self.bus.publish(OutboxEvent.DISCOVERY_RECORDED, {
+            "item_id": rng.choice(self.items).id,
+            "discovered_at": at(epoch, rng.uniform(0, 24))
+        }).id for epoch in sorted(rng.choice([0, 0, 1, 2, 2, 5]) for _ in range(40))]
+
+    def deliver(self, event_ids: list[int]) -> dict[int, tuple[float, int, int]]:
+        """Counters per item after delivering every event in the given order, starting from none"""
+        ItemPopularityCounter.objects.all().delete()
+        OutboxDelivery.objects.all().delete()
+        OutboxEvent.objects.update(processed_at=None, lease_until=None)
+        for event_id in event_ids:
+            self.assertTrue(self.bus.dispatch(event_id))
+        return self.counters()
+
+    @staticmethod
+    def counters() -> dict[int, tuple[float, int, int]]:
+        return {
+            item_id: (trending, epoch, discoveries) for item_id, trending, epoch, discoveries in
+            ItemPopularityCounter.objects.values_list('item_id', 'trending', 'trending_epoch', 'discoveries')
+        }
+
+    def assert_same_counters(self, actual: dict, expected: dict):
+        self.assertEqual(actual.keys(), expected.keys())
+        for item_id, (trending, epoch, discoveries) in expected.items():
+            self.assertEqual(actual[item_id][1:], (epoch, discoveries))
+            self.assertAlmostEqual(actual[item_id][0], trending, places=9)
+
+    def test_any_delivery_order_gives_the_in_order_counters(self):
+        in_order = self.deliver(self.event_ids)
+        self.assertEqual(sum(discoveries for _, _, discoveries in in_order.values()), len(self.event_ids))
+
+        rng = random.Random(0)
+        orders = [list(reversed(self.event_ids))]
+        for _ in range(5):
+            orders.append(rng.sample(self.event_ids, len(self.event_ids)))
+        for order in orders:
+            self.assert_same_counters(self.deliver(order), in_order)
+
+    def test_redelivery_is_not_counted_twice(self):
+        in_order = self.deliver(self.event_ids)
+        # A dispatcher whose lease ran out delivers the oldest event again after newer ones
+        OutboxEvent.objects.filter(id=self.event_ids[0]).update(processed_at=None)
+        self.assertTrue(self.bus.dispatch(self.event_ids[0]))
+        self.assert_same_counters(self.counters(), in_order)
@@ -0,0 +1,57 @@
+from datetime import timedelta
+from unittest import mock
+from django.db import DatabaseError
+from django.utils import timezone
+from django.test import TestCase, override_settings
+from src.models.scan_sketch import ScanSketch
+from src.service.task_runner import TaskRunner
+from src.service.scan_analytics_service import ScanAnalyticsService
+
+
+@override_settings(ANALYTICS_FLUSH_SECONDS=3600)
+class ScanAnalyticsFlushTests(TestCase):
+    def setUp(self):
+        self.service = ScanAnalyticsService(TaskRunner(workers=1, max_pending=10, drain_timeout_seconds=1))
+        for user_id, label in [(1, "Bottle"), (2, "bottle"), (2, "can")]:
+            self.service.record_scan(user_id, label)
+
+    def failing_writes(self):
+        return mock.patch.object(ScanSketch.objects, 'update_or_create', side_effect=DatabaseError("connection lost"))
+
+    def test_failed_flush_is_written_by_the_next_one(self):
+        with self.failing_writes(), self.assertRaises(DatabaseError):
+            self.service.flush()
+        self.assertFalse(ScanSketch.objects.exists())
+
+        self.service.flush()
+        analytics = self.service.get_scan_analytics()
+        self.assertEqual(analytics["total_scans"], 3)
+        self.assertEqual(analytics["top_labels"][0], {"label": "bottle", "scans": 2})
+        self.assertEqual(analytics["unique_scanners"], 2)
+
+    def test_failed_flush_keeps_buckets_it_trimmed(self):
+        later = timezone.now() + timedelta(hours=2)  # past the label bucket, within its retention
+        with mock.patch('src.service.scan_analytics_service.timezone.now', return_value=later):
+            with self.failing_writes(), self.assertRaises(DatabaseError):
+                self.service.flush()
+            # The label bucket is in the past by now, it must still be written before being forgotten
+            self.service.flush()
+        self.assertTrue(ScanSketch.objects.filter(kind=ScanSketch.LABELS).exists())
+        self.assertEqual(self.service.get_scan_analytics(minutes=180)["total_scans"], 3)
+
+    def test_partial_failure_only_retries_the_rest(self):
+        calls = []
+        original = ScanSketch.objects.update_or_create
+
+        def fail_second(**kwargs):
+            calls.append(kwargs['kind'])
+            if len(calls) == 2:
+                raise DatabaseError("connection lost")
+            return original(**kwargs)
+
+        with mock.patch.object(ScanSketch.objects, 'update_or_create', side_effect=fail_second):
+            with self.assertRaises(DatabaseError):
+                self.service.flush()
+            self.service.flush()
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(ScanSketch.objects.count(), 2)
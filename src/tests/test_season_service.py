@@ -0,0 +1,98 @@
+from datetime import timedelta
+from django.utils import timezone
+from django.test import TestCase, override_settings
+from src.models.user import User
+from src.models.season import Season
+from src.models.season_score import SeasonScore
+from src.models.season_standing import SeasonStanding
+from src.cache.snapshot_cache import SnapshotCache
+from src.service.season_service import SeasonService
+
+
+@override_settings(SEASONS_AUTO_MONTHLY=True)
+class CurrentSeasonTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.month = f"{self.now:%Y-%m}"
+
+    @staticmethod
+    def service() -> SeasonService:
+        return SeasonService(snapshot_cache=SnapshotCache(namespace="season-test", ttl_seconds=60, max_stale_seconds=60))
+
+    def test_opens_the_monthly_season(self):
+        season = self.service().get_current_season()
+        self.assertEqual(season.name, self.month)
+        self.assertTrue(season.starts_at <= timezone.now() < season.ends_at)
+        self.assertEqual(self.service().get_current_season().id, season.id)
+
+    def test_monthly_season_ended_early_is_not_reused(self):
+        Season.objects.create(name=self.month, starts_at=self.now - timedelta(days=1), ends_at=self.now - timedelta(minutes=1))
+
+        season = self.service().get_current_season()
+        self.assertEqual(season.name, f"{self.month}-2")
+        self.assertTrue(season.starts_at <= timezone.now() < season.ends_at)
+        self.assertEqual(self.service().get_current_season().id, season.id)
+
+    def test_archived_seasons_are_skipped(self):
+        Season.objects.create(
+            name="special",
+            starts_at=self.now - timedelta(days=1),
+            ends_at=self.now + timedelta(days=1),
+            archived_at=self.now
+        )
+        Season.objects.create(
+            name=self.month,
+            starts_at=self.now - timedelta(days=1),
+            ends_at=self.now + timedelta(days=1),
+            archived_at=self.now
+        )
+
+        season = self.service().get_current_season()
+        self.assertEqual(season.name, f"{self.month}-2")
+        self.assertIsNone(season.archived_at)
+
+    @override_settings(SEASONS_AUTO_MONTHLY=False)
+    def test_gap_without_automatic_seasons(self):
+        Season.objects.create(name=self.month, starts_at=self.now - timedelta(days=1), ends_at=self.now - timedelta(minutes=1))
+        self.assertIsNone(self.service().get_current_season())
+
+
+@override_settings(SEASONS_AUTO_MONTHLY=False, SHARED_VERSION_CHECK_SECONDS=0)
+class ClosedSeasonTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.user = User.objects.create(username="player", email="player@example.com", password="!")
+        self.season = Season.objects.create(name="spring", starts_at=now - timedelta(days=1), ends_at=now + timedelta(days=30))
+        self.service = CurrentSeasonTests.service()
+        self.service.record_discovery(self.user.id, 5)  # caches the season in this process
+
+    def scores(self, season: Season) -> list[tuple[int, int]]:
+        return list(SeasonScore.objects.filter(season=season).values_list('points', 'discoveries'))
+
+    def test_season_archived_by_another_process_is_dropped(self):
+        CurrentSeasonTests.service().archive_season(self.season)
+        self.assertIsNone(self.service.get_current_season())
+
+        self.service.record_discovery(self.user.id, 7)
+        self.assertEqual(self.scores(self.season), [])
+        self.assertEqual(SeasonStanding.objects.get(season=self.season).points, 5)
+
+    def test_no_score_is_written_into_a_season_archived_unseen(self):
+        # Archived without the signal, this process still holds the season as running
+        Season.objects.filter(id=self.season.id).update(archived_at=timezone.now())
+        self.assertEqual(self.service.get_current_season().id, self.season.id)
+
+        self.service.record_discovery(self.user.id, 7)
+        self.assertEqual(self.scores(self.season), [(5, 1)])
+        other = User.objects.create(username="newcomer", email="newcomer@example.com", password="!")
+        self.service.record_discovery(other.id, 7)
+        self.assertFalse(SeasonScore.objects.filter(season=self.season, user=other).exists())
+
+    def test_no_score_is_written_into_a_season_ended_early(self):
+        Season.objects.filter(id=self.season.id).update(ends_at=timezone.now())
+        self.service.record_discovery(self.user.id, 7)
+        self.assertEqual(self.scores(self.season), [(5, 1)])
+
+    def test_open_season_keeps_counting(self):
+        self.service.record_discovery(self.user.id, 7)
+        self.assertEqual(self.scores(self.season), [(12, 2)])
@@ -0,0 +1,115 @@
+import os
+import time
+import asyncio
+import tempfile
+import tracemalloc
+import unittest
+from asgiref.sync import async_to_sync
+from django.core.asgi import get_asgi_application
+from django.test import TransactionTestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from src.models.user import User
+from src.models.skin import Skin
+from src.storage.blob_store_factory import BlobStoreFactory
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+@unittest.skipUnless(os.environ.get('RUN_BENCHMARKS'), "set RUN_BENCHMARKS=1 to run")
+class SkinAssetBenchmark(TransactionTestCase):
+    """
+    Time the app spends on one skin image request under ASGI, the bytes it sends itself and its peak Python
+    memory, when it streams the blob (no front proxy) against when it answers with an X-Accel-Redirect for
+    the proxy to send. Django reads a FileResponse into a list before sending it under ASGI, so the streamed
+    peak grows with the asset.
+
+    Sizes come from BENCHMARK_ASSET_BYTES (comma separated, default 65536,1048576,8388608). Requests go
+    through Django's ASGI handler as uvicorn would call it, so streamed times include every chunk it sends.
+    """
+    CALLS = 20
+
+    def test_app_time_by_asset_size(self):
+        sizes = [int(size) for size in (os.environ.get('BENCHMARK_ASSET_BYTES') or '65536,1048576,8388608').split(',')]
+        user = User.objects.create(username="bench", email="bench@example.com", password="!")
+        authorization = f'Bearer {AccessToken.for_user(user)}'
+        rows = []
+        with tempfile.TemporaryDirectory() as directory, override_settings(BLOB_STORE_ROOT=directory):
+            BlobStoreFactory.get_store.cache_clear()
+            try:
+                for size in sizes:
+                    skin = Skin.objects.create(
+                        name=f"bench{size}",
+                        price_points=30,
+                        rarity='RARE',
+                        description="",
+                        thumbnail=PNG_SIGNATURE + os.urandom(size - len(PNG_SIGNATURE))
+                    )
+                    path = f'/api/v1/skins/{skin.id}/thumbnail/'
+                    with override_settings(SKIN_ASSET_ACCEL_REDIRECT_PREFIX=''):
+                        streamed_ms, streamed_bytes, streamed_peak = self.__measure(path, authorization)
+                    with override_settings(SKIN_ASSET_ACCEL_REDIRECT_PREFIX='/protected/blobs/'):
+                        redirect_ms, redirect_bytes, redirect_peak = self.__measure(path, authorization)
+                    self.assertEqual(streamed_bytes, size)
+                    self.assertEqual(redirect_bytes, 0)
+                    rows.append((
+                        size, streamed_ms, streamed_bytes, streamed_peak, redirect_ms, redirect_bytes, redirect_peak
+                    ))
+            finally:
+                BlobStoreFactory.get_store.cache_clear()
+
+        print(f"\n{'asset bytes':>12} {'streamed ms':>12} {'app bytes':>10} {'peak KiB':>9} "
+              f"{'redirect ms':>12} {'app bytes':>10} {'peak KiB':>9}")
+        for size, streamed_ms, streamed_bytes, streamed_peak, redirect_ms, redirect_bytes, redirect_peak in rows:
+            print(f"{size:>12} {streamed_ms:>12.2f} {streamed_bytes:>10} {streamed_peak // 1024:>9} "
+                  f"{redirect_ms:>12.2f} {redirect_bytes:>10} {redirect_peak // 1024:>9}")
+
+    @classmethod
+    def __measure(cls, path: str, authorization: str) -> tuple[float, int, int]:
+        """
+        (milliseconds per request, body bytes sent by the app, peak bytes allocated) of fetching path through
+        Django's ASGI handler, the peak from one more request traced on its own so tracing doesn't skew the times
+        """
+        application = get_asgi_application()
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': 'GET',
+            'scheme': 'http',
+            'path': path,
+            'query_string': b'',
+            'headers': [(b'host', b'localhost'), (b'authorization', authorization.encode())],
+            'server': ('localhost', 80),
+            'client': ('127.0.0.1', 40000),
+        }
+
+        async def fetch() -> int:
+            sent = []
+            requests = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+
+            async def receive() -> dict:
+                if requests:
+                    return requests.pop()
+                await asyncio.Event().wait()  # the client never disconnects
+
+            async def send(message: dict) -> None:
+                if message['type'] == 'http.response.start':
+                    assert message['status'] == 200, message['status']
+                elif message['type'] == 'http.response.body':
+                    sent.append(len(message.get('body', b'')))
+
+            await application(scope, receive, send)
+            return sum(sent)
+
+        started = time.perf_counter()
+        for _ in range(cls.CALLS):
+            sent = async_to_sync(fetch)()
+        elapsed_ms = (time.perf_counter() - started) * 1000 / cls.CALLS
+
+        tracemalloc.start()
+        try:
+            async_to_sync(fetch)()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        return elapsed_ms, sent, peak
@@ -0,0 +1,155 @@
+import os
+import tempfile
+from io import BytesIO
+from PIL import Image
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from src.models.user import User
+from src.models.skin import Skin
+from src.models.skin_variant import SkinVariant
+from src.util.image_type import sniff_image_type
+from src.storage.blob_store import BlobStore
+from src.storage.blob_store_factory import BlobStoreFactory
+from src.service.skin_asset_pipeline import SkinAssetPipeline
+
+
+def png(width: int, height: int) -> bytes:
+    encoded = BytesIO()
+    Image.new('RGBA', (width, height), (20, 200, 120, 255)).save(encoded, 'PNG')
+    return encoded.getvalue()
+
+
+class BlobStoreTestCase(TestCase):
+    """Tests with a blob store of their own under a temporary directory"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.blob_root = directory.name
+        settings_override = override_settings(BLOB_STORE_ROOT=self.blob_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        BlobStoreFactory.get_store.cache_clear()
+        self.addCleanup(BlobStoreFactory.get_store.cache_clear)
+
+
+class SkinAssetResponseTests(BlobStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.image = png(300, 200)
+        self.skin = Skin.objects.create(name="Neon", price_points=30, rarity='RARE', description="", image=self.image)
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="viewer", email="v@example.com", password="!"))
+
+    def get_image(self):
+        return self.client.get(f'/api/v1/skins/{self.skin.id}/image/', HTTP_HOST='localhost')
+
+    @override_settings(SKIN_ASSET_ACCEL_REDIRECT_PREFIX='')
+    def test_streamed_by_the_app_without_a_proxy(self):
+        response = self.get_image()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Accel-Redirect', response.headers)
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(b''.join(response.streaming_content), self.image)
+
+    @override_settings(SKIN_ASSET_ACCEL_REDIRECT_PREFIX='/protected/blobs/')
+    def test_handed_to_the_proxy_when_it_serves_the_store(self):
+        response = self.get_image()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Content-Type'], 'image/png')
+        self.assertEqual(response['ETag'], f'"{self.skin.image_hash}"')
+
+        # The proxy's alias for the prefix is the store's root, so the rest of the path is the blob's file
+        location = response['X-Accel-Redirect'].removeprefix('/protected/blobs/')
+        with open(os.path.join(self.blob_root, location), 'rb') as file:
+            self.assertEqual(file.read(), self.image)
+
+    @override_settings(SKIN_ASSET_ACCEL_REDIRECT_PREFIX='/protected/blobs/')
+    def test_assets_missing_from_the_store_are_streamed_by_the_app(self):
+        # Hashed before the blob store existed and not moved yet
+        Skin.objects.filter(id=self.skin.id).update(image=self.image, image_hash=BlobStore.key_for(self.image))
+        os.remove(os.path.join(self.blob_root, BlobStoreFactory.get_store().location(self.skin.image_hash)))
+
+        response = self.get_image()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Accel-Redirect', response.headers)
+        self.assertEqual(b''.join(response.streaming_content), self.image)
+
+    @override_settings(SKIN_ASSET_ACCEL_REDIRECT_PREFIX='/protected/blobs/')
+    def test_current_copies_are_not_sent_again(self):
+        response = self.client.get(
+            f'/api/v1/skins/{self.skin.id}/image/',
+            HTTP_HOST='localhost',
+            HTTP_IF_NONE_MATCH=f'"{self.skin.image_hash}"'
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertNotIn('X-Accel-Redirect', response.headers)
+
+
+class SkinAssetPipelineTests(BlobStoreTestCase):
+    SIZES = [64, 128, 512]
+
+    def setUp(self):
+        super().setUp()
+        self.blob_store = BlobStoreFactory.get_store()
+        self.pipeline = SkinAssetPipeline(blob_store=self.blob_store, sizes=self.SIZES, workers=1)
+        self.addCleanup(self.pipeline._SkinAssetPipeline__executor.shutdown)
+        self.skin = Skin.objects.create(
+            name="Neon", price_points=30, rarity='RARE', description="", image=png(300, 200)
+        )
+
+    def variants(self) -> dict[int, SkinVariant]:
+        return {variant.size: variant for variant in SkinVariant.objects.filter(skin=self.skin)}
+
+    def test_one_webp_per_size_keeping_the_aspect_ratio(self):
+        self.assertEqual(self.pipeline.generate(self.skin.id), len(self.SIZES))
+
+        variants = self.variants()
+        self.assertEqual(sorted(variants), self.SIZES)
+        for size, variant in variants.items():
+            with self.blob_store.open(variant.blob_hash) as file:
+                content = file.read()
+            self.assertEqual(sniff_image_type(content), 'image/webp')
+            self.assertEqual(variant.byte_size, len(content))
+            self.assertEqual(variant.source_hash, self.skin.image_hash)
+            with Image.open(BytesIO(content)) as image:
+                self.assertEqual(image.size, (variant.width, variant.height))
+            # Longest side fits the size, but a small image is never scaled up
+            self.assertEqual(max(variant.width, variant.height), min(size, 300), size)
+            self.assertAlmostEqual(variant.width / variant.height, 1.5, delta=0.05)
+
+        self.assertEqual((variants[64].width, variants[512].width), (64, 300))
+        self.assertLess(variants[64].byte_size, variants[128].byte_size)
+
+    def test_regenerating_is_a_no_op_until_the_image_changes(self):
+        self.pipeline.generate(self.skin.id)
+        before = self.variants()
+        self.assertEqual(self.pipeline.generate(self.skin.id), 0)
+
+        self.skin.image = png(100, 400)
+        self.skin.save()
+        self.assertEqual(self.pipeline.generate(self.skin.id), len(self.SIZES))
+        after = self.variants()
+        self.assertEqual(SkinVariant.objects.filter(skin=self.skin).count(), len(self.SIZES))
+        for size in self.SIZES:
+            self.assertNotEqual(after[size].blob_hash, before[size].blob_hash)
+            self.assertEqual(after[size].source_hash, self.skin.image_hash)
+        self.assertEqual((after[64].width, after[64].height), (16, 64))
+
+    def test_undecodable_images_are_skipped(self):
+        self.skin.image = b'\x89PNG\r\n\x1a\n but not really'
+        self.skin.save()
+        with self.assertLogs('src.service.skin_asset_pipeline', level='WARNING'):
+            self.assertEqual(self.pipeline.generate(self.skin.id), 0)
+        self.assertEqual(self.variants(), {})
+
+    def test_sized_thumbnails_are_served_from_the_variants(self):
+        self.pipeline.generate(self.skin.id)
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="viewer", email="v@example.com", password="!"))
+
+        response = client.get(f'/api/v1/skins/{self.skin.id}/thumbnail/?size=128', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'image/webp')
+        self.assertEqual(response['ETag'], f'"{self.variants()[128].blob_hash}"')
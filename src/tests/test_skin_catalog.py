@@ -0,0 +1,101 @@
+from io import StringIO
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from src.models.user import User
+from src.models.skin import Skin
+from src.models.user_skins import UserSkin
+from src.cache.skin_catalog import SkinCatalog
+from src.cache.shared_version import SharedVersion
+from src.service.skin_service import SkinService
+from src.repository.user_repository import UserRepository
+from src.service_module import ServiceModule
+
+
+def make_skin(name: str, **fields) -> Skin:
+    return Skin.objects.create(name=name, price_points=30, rarity='RARE', description="", **fields)
+
+
+class SkinCatalogTests(TestCase):
+    def setUp(self):
+        self.skin = make_skin("Neon")
+        self.catalog = SkinCatalog()
+
+    def test_saving_a_skin_reloads_the_catalog(self):
+        self.assertEqual(self.catalog.get(self.skin.id).price_points, 30)
+        self.skin.price_points = 45
+        self.skin.save()
+        self.assertEqual(self.catalog.get(self.skin.id).price_points, 45)
+        new = make_skin("Chrome")
+        self.assertEqual(self.catalog.get(new.id).name, "Chrome")
+
+    @override_settings(SHARED_VERSION_CHECK_SECONDS=0)
+    def test_bump_from_another_process_reloads_the_catalog(self):
+        self.catalog.snapshot()
+        Skin.objects.filter(id=self.skin.id).update(available=False)  # no signal
+        SharedVersion('skin_catalog').bump()  # as another process's save would
+        self.assertFalse(self.catalog.get(self.skin.id).available)
+
+    @override_settings(SHARED_VERSION_CHECK_SECONDS=60, CATALOG_MAX_AGE_SECONDS=60)
+    def test_lookups_are_served_from_memory(self):
+        self.catalog.snapshot()
+        with self.assertNumQueries(0):
+            self.catalog.get(self.skin.id)
+            self.catalog.all()
+
+    @override_settings(CATALOG_MAX_AGE_SECONDS=0)
+    def test_old_snapshots_are_reloaded_without_a_bump(self):
+        self.catalog.snapshot()
+        Skin.objects.filter(id=self.skin.id).update(price_points=60)
+        self.assertEqual(self.catalog.get(self.skin.id).price_points, 60)
+
+
+class LimitedReleaseTests(TestCase):
+    def setUp(self):
+        self.skin = make_skin("Drop")
+
+    @override_settings(SHARED_VERSION_CHECK_SECONDS=0)
+    def test_release_from_the_command_reaches_running_servers(self):
+        # The server's catalog and version are its own, only the database is shared with the command
+        server_catalog = SkinCatalog()
+        server_catalog.snapshot()
+        server_version = SharedVersion('skin_catalog')
+        before = server_version.get()
+
+        call_command('release_limited_skin', self.skin.id, 5, stdout=StringIO())
+
+        self.assertEqual(server_version.get(), before + 1)
+        self.assertEqual(server_catalog.get(self.skin.id).stock, 5)
+        available = ServiceModule().skin_service.get_available_skins(
+            User.objects.create(username="buyer", email="buyer@example.com", password="!").id
+        )
+        self.assertEqual([(skin['skin_id'], skin['remaining_stock']) for skin in available], [(self.skin.id, 5)])
+
+
+@override_settings(SHARED_VERSION_CHECK_SECONDS=60, CATALOG_MAX_AGE_SECONDS=60)
+class OwnedSkinsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="collector", email="collector@example.com", password="!")
+        for skin in (make_skin("Neon"), make_skin("Chrome")):
+            UserSkin.objects.create(user=self.user, skin=skin, acquisition_type='PURCHASE')
+        # Own catalog, the shared one may hold a snapshot from another test under the same version
+        self.service = SkinService(
+            user_repository=UserRepository(),
+            skin_catalog=SkinCatalog(),
+            asset_pipeline=ServiceModule().skin_asset_pipeline
+        )
+        self.service.get_user_skins(self.user.id)  # load the catalog
+
+    def test_names_come_from_the_catalog(self):
+        with self.assertNumQueries(1):
+            skins = self.service.get_user_skins(self.user.id)
+        self.assertEqual(sorted(skin['name'] for skin in skins), ["Chrome", "Neon"])
+
+    def test_skin_newer_than_the_catalog_is_read_from_the_database(self):
+        # Created by another process, this one hasn't seen the version bump yet
+        newer = Skin.objects.bulk_create([Skin(name="Aurora", price_points=30, rarity='EPIC', description="")])[0]
+        UserSkin.objects.create(user=self.user, skin=newer, acquisition_type='SPECIAL_EVENT')
+        with self.assertNumQueries(2):
+            skins = self.service.get_user_skins(self.user.id)
+        self.assertIn({"name": "Aurora", "rarity": 'EPIC'}, [
+            {"name": skin['name'], "rarity": skin['rarity']} for skin in skins
+        ])
@@ -0,0 +1,144 @@
+import time
+import random
+import threading
+from django.db import connection, connections, OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.exceptions import ValidationError
+from src.models.user import User
+from src.models.skin import Skin
+from src.models.user_skins import UserSkin
+from src.models.skin_stock import SkinStock
+from src.service_module import ServiceModule
+
+BALANCE = 100
+PRICE = 30
+
+
+def make_skin(name: str, **fields) -> Skin:
+    return Skin.objects.create(name=name, price_points=PRICE, rarity='RARE', description="", **fields)
+
+
+class SkinPurchaseTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="buyer", email="buyer@example.com", password="!", points_balance=BALANCE)
+        self.skins = [make_skin(f"skin{i}") for i in range(4)]
+        self.service = ServiceModule().skin_service
+
+    def test_balance_is_never_overdrawn(self):
+        for skin in self.skins[:3]:
+            self.service.purchase_skin(self.user.id, skin.id)
+        with self.assertRaises(ValidationError):
+            self.service.purchase_skin(self.user.id, self.skins[3].id)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.points_balance, BALANCE - 3 * PRICE)
+
+    def test_second_purchase_of_a_skin_is_not_charged(self):
+        self.service.purchase_skin(self.user.id, self.skins[0].id)
+        with self.assertRaises(ValidationError):
+            self.service.purchase_skin(self.user.id, self.skins[0].id)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.points_balance, BALANCE - PRICE)
+        self.assertEqual(UserSkin.objects.filter(user=self.user).count(), 1)
+
+
+class ConcurrentSkinPurchaseTests(TransactionTestCase):
+    """
+    Many threads buying at once, each on its own connection. Whatever wins the races, nobody may end up
+    below zero, own a skin twice, or be charged for a purchase that didn't happen
+    """
+    THREADS = 16
+    PURCHASES_PER_THREAD = 20
+
+    def setUp(self):
+        self.users = [User.objects.create(
+            username=f"buyer{i}",
+            email=f"buyer{i}@example.com",
+            password="!",
+            points_balance=BALANCE
+        ) for i in range(4)]
+        self.skins = [make_skin(f"skin{i}") for i in range(5)]
+        self.service = ServiceModule().skin_service
+
+    def buy_concurrently(self, choose) -> list[Exception]:
+        start, errors = threading.Barrier(self.THREADS), []
+
+        def buy(seed: int):
+            rng = random.Random(seed)
+            start.wait()
+            try:
+                for _ in range(self.PURCHASES_PER_THREAD):
+                    self.purchase(*choose(rng))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buy, args=(seed,)) for seed in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return errors
+
+    def purchase(self, user: User, skin: Skin) -> None:
+        for _ in range(100):
+            try:
+                self.service.purchase_skin(user.id, skin.id)
+                return
+            except ValidationError:
+                return  # can't afford it, already owned or sold out
+            except OperationalError:
+                # The in-memory SQLite test database turns away writers while another holds the lock
+                # instead of waiting, retry the same purchase like a client would
+                if connection.vendor != 'sqlite':
+                    raise
+                time.sleep(0.001)
+
+    def assert_consistent(self):
+        for user in self.users:
+            user.refresh_from_db()
+            owned = list(UserSkin.objects.filter(user=user).values_list('skin_id', flat=True))
+            self.assertEqual(len(owned), len(set(owned)), f"{user.username} owns a skin twice")
+            self.assertGreaterEqual(user.points_balance, 0)
+            self.assertEqual(user.points_balance, BALANCE - PRICE * len(owned), user.username)
+
+    def test_racing_purchases_neither_overdraw_nor_double_charge(self):
+        errors = self.buy_concurrently(lambda rng: (rng.choice(self.users), rng.choice(self.skins)))
+        self.assertEqual(errors, [])
+        self.assert_consistent()
+        # Every user had enough attempts to spend down to what no skin is cheap enough for
+        self.assertEqual(UserSkin.objects.count(), len(self.users) * (BALANCE // PRICE))
+
+    def test_same_user_and_skin_is_bought_once(self):
+        errors = self.buy_concurrently(lambda rng: (self.users[0], self.skins[0]))
+        self.assertEqual(errors, [])
+        self.assertEqual(UserSkin.objects.filter(user=self.users[0], skin=self.skins[0]).count(), 1)
+        self.assert_consistent()
+
+    def test_limited_edition_is_not_oversold(self):
+        limited = make_skin("limited")
+        self.service.release_limited_edition(limited.id, 2)
+        errors = self.buy_concurrently(lambda rng: (rng.choice(self.users), limited))
+        self.assertEqual(errors, [])
+        self.assertEqual(UserSkin.objects.filter(skin=limited).count(), 2)
+        self.assertEqual(SkinStock.objects.remaining(limited.id), 0)
+        self.assert_consistent()
+
+    @override_settings(SKIN_STOCK_SHARDS=3)
+    def test_limited_edition_spread_over_shards_is_not_oversold(self):
+        # More buyers than units, and shards that sell out at different times
+        self.users += [User.objects.create(
+            username=f"crowd{i}",
+            email=f"crowd{i}@example.com",
+            password="!",
+            points_balance=BALANCE
+        ) for i in range(12)]
+        limited = make_skin("drop")
+        self.service.release_limited_edition(limited.id, 7)
+        self.assertEqual(SkinStock.objects.filter(skin=limited).count(), 3)
+
+        errors = self.buy_concurrently(lambda rng: (rng.choice(self.users), limited))
+        self.assertEqual(errors, [])
+        self.assertEqual(UserSkin.objects.filter(skin=limited).count(), 7)
+        self.assertEqual(list(SkinStock.objects.filter(skin=limited).values_list('remaining', flat=True)), [0, 0, 0])
+        self.assert_consistent()
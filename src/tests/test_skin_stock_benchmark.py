@@ -0,0 +1,93 @@
+import os
+import time
+import threading
+import unittest
+from statistics import quantiles
+from django.db import connection, connections, transaction, OperationalError
+from django.test import TransactionTestCase
+from src.models.skin import Skin
+from src.models.skin_stock import SkinStock
+
+
+@unittest.skipUnless(os.environ.get('RUN_BENCHMARKS'), "set RUN_BENCHMARKS=1 to run")
+class SkinStockClaimBenchmark(TransactionTestCase):
+    """
+    Throughput and latency of claiming limited-edition stock when many buyers hit one drop at once,
+    with the stock on a single counter row against spread over shards
+
+    Buyer counts come from BENCHMARK_BUYERS (comma separated, default 8,32), shard counts from
+    BENCHMARK_SHARDS (default 1,16). Every buyer is a thread on its own connection claiming in its own
+    transaction until the drop sells out. Claims skip locked shards only where the database supports
+    SKIP LOCKED (PostgreSQL), SQLite serialises every writer whatever the shard count.
+    """
+    CLAIMS_PER_BUYER = 20
+
+    def test_claims_by_buyers_and_shards(self):
+        buyer_counts = [int(n) for n in (os.environ.get('BENCHMARK_BUYERS') or '8,32').split(',')]
+        shard_counts = [int(n) for n in (os.environ.get('BENCHMARK_SHARDS') or '1,16').split(',')]
+        skin = Skin.objects.create(name="drop", price_points=30, rarity='EPIC', description="")
+        rows = []
+        for buyers in buyer_counts:
+            for shards in shard_counts:
+                stock = buyers * self.CLAIMS_PER_BUYER
+                SkinStock.objects.release(skin.id, stock, shards)
+                elapsed, latencies, sold_out = self.__claim_concurrently(skin.id, buyers)
+
+                # Never oversold, never undersold
+                self.assertEqual(len(latencies), stock)
+                self.assertEqual(SkinStock.objects.remaining(skin.id), 0)
+                self.assertFalse(SkinStock.objects.filter(skin=skin, remaining__lt=0).exists())
+                self.assertEqual(sold_out, buyers)
+
+                p50, p99 = (quantiles(latencies, n=100)[i] * 1000 for i in (49, 98))
+                rows.append((buyers, shards, stock / elapsed, p50, p99))
+
+        print(f"\n({connection.vendor}, skip locked: {connection.features.has_select_for_update_skip_locked})")
+        print(f"{'buyers':>7} {'shards':>7} {'claims/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        for buyers, shards, throughput, p50, p99 in rows:
+            print(f"{buyers:>7} {shards:>7} {throughput:>9.0f} {p50:>8.2f} {p99:>8.2f}")
+
+    @staticmethod
+    def __claim_concurrently(skin_id: int, buyers: int) -> tuple[float, list[float], int]:
+        """(seconds until sold out, latency of every successful claim, buyers told it sold out)"""
+        start, lock = threading.Barrier(buyers + 1), threading.Lock()
+        latencies, sold_out, errors = [], [], []
+
+        def buyer():
+            start.wait()
+            try:
+                while True:
+                    started = time.perf_counter()
+                    claimed = SkinStockClaimBenchmark.__claim(skin_id)
+                    with lock:
+                        if not claimed:
+                            sold_out.append(None)
+                            return
+                        latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buyer) for _ in range(buyers)]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+        return time.perf_counter() - started, latencies, len(sold_out)
+
+    @staticmethod
+    def __claim(skin_id: int) -> bool:
+        while True:
+            try:
+                with transaction.atomic():
+                    return SkinStock.objects.claim(skin_id)
+            except OperationalError:
+                # The in-memory SQLite test database turns writers away instead of queueing them
+                if connection.vendor != 'sqlite':
+                    raise
+                time.sleep(0.0005)
@@ -0,0 +1,78 @@
+import os
+import time
+import tempfile
+from django.test import TestCase, SimpleTestCase
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+from src.models.user import User
+from src.cache.snapshot_cache import SnapshotCache
+from src.cache.leaderboard_snapshot import LeaderboardSnapshotReader
+from src.service.leaderboard_service import LeaderboardService
+from src.repository.user_repository import UserRepository
+from src.repository.discovery_repository import DiscoveryRepository
+
+
+class SnapshotCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.computed = []
+
+    def compute(self, key):
+        def compute():
+            self.computed.append(key)
+            return key
+        return compute
+
+    def get(self, cache: SnapshotCache, *keys) -> None:
+        for key in keys:
+            cache.get(key, self.compute(key))
+
+    def test_least_recently_used_are_evicted(self):
+        cache = SnapshotCache(namespace="lru-test", ttl_seconds=60, max_stale_seconds=60, max_entries=2)
+        self.get(cache, 'a', 'b', 'a', 'c')  # 'b' was used least recently when 'c' came in
+        self.assertEqual(self.computed, ['a', 'b', 'c'])
+        self.get(cache, 'a', 'c', 'b')
+        self.assertEqual(self.computed, ['a', 'b', 'c', 'b'])
+
+    def test_many_keys_stay_bounded(self):
+        cache = SnapshotCache(namespace="bound-test", ttl_seconds=60, max_stale_seconds=60, max_entries=10)
+        self.get(cache, *range(1000))
+        self.get(cache, *range(990, 1000))
+        self.assertEqual(len(self.computed), 1000)  # the last ten were still cached
+        self.get(cache, 0)
+        self.assertEqual(len(self.computed), 1001)  # long evicted
+
+    def test_snapshots_past_their_stale_window_are_dropped(self):
+        cache = SnapshotCache(namespace="expiry-test", ttl_seconds=0.01, max_stale_seconds=0.01)
+        self.get(cache, 'old')
+        time.sleep(0.05)
+        self.get(cache, 'new')
+        # Storing 'new' dropped 'old', which would otherwise have stayed until evicted by size
+        self.assertEqual(cache._SnapshotCache__entries.keys(), {'new'})
+
+
+class CategoryLeaderboardTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.snapshot_cache = SnapshotCache(namespace="category-test", ttl_seconds=60, max_stale_seconds=60)
+        self.service = LeaderboardService(
+            user_repository=UserRepository(),
+            discovery_repository=DiscoveryRepository(),
+            snapshot_cache=self.snapshot_cache,
+            snapshot_reader=LeaderboardSnapshotReader(os.path.join(directory.name, 'none'), max_age_seconds=60)
+        )
+
+    def test_unknown_categories_are_rejected_before_caching(self):
+        for category in ("plastic", "NOPE", "METAL; --"):
+            with self.assertRaises(ValidationError):
+                self.service.get_category_leaderboard_snapshot(category)
+        self.assertEqual(len(self.snapshot_cache._SnapshotCache__entries), 0)
+        self.assertEqual(self.service.get_category_leaderboard_snapshot('METAL').value['results'], [])
+
+    def test_endpoint_answers_bad_request(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create(username="reader", email="reader@example.com", password="!"))
+        response = client.get('/api/v1/leaderboard/random/category/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 400)
+        response = client.get('/api/v1/leaderboard/GLASS/category/', HTTP_HOST='localhost')
+        self.assertEqual(response.status_code, 200)
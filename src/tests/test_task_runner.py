@@ -0,0 +1,64 @@
+import os
+import sys
+import signal
+import tempfile
+import unittest
+import subprocess
+from django.test import SimpleTestCase
+from src.service.task_runner import TaskRunner
+
+# A process with a delayed task waiting, told to stop while it sleeps
+WORKER = """
+import sys, time, django
+from django.conf import settings
+settings.configure()
+django.setup()
+from src.service.task_runner import TaskRunner
+
+def write(path, text):
+    with open(path, 'w') as file:
+        file.write(text)
+
+TaskRunner.install_signal_handler()
+runner = TaskRunner(workers=1, max_pending=10, drain_timeout_seconds=5)
+runner.submit('write', write, sys.argv[1], "written", delay_seconds=60)
+print("ready", flush=True)
+time.sleep(60)
+"""
+
+
+class TaskRunnerTests(SimpleTestCase):
+    def test_shutdown_runs_delayed_tasks(self):
+        done = []
+        runner = TaskRunner(workers=2, max_pending=10, drain_timeout_seconds=5)
+        runner.submit('a', done.append, 1, delay_seconds=60)
+        runner.submit('a', done.append, 2, delay_seconds=60)  # replaces the waiting task
+        runner.submit('b', done.append, 3, delay_seconds=60)
+        runner.shutdown()
+        self.assertEqual(sorted(done), [2, 3])
+        self.assertEqual(runner.pending(), 0)
+
+    @unittest.skipUnless(hasattr(signal, 'SIGKILL'), "needs POSIX signals")
+    def test_sigterm_runs_waiting_tasks_before_exiting(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'task')
+            root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+            process = subprocess.Popen(
+                [sys.executable, '-c', WORKER, path],
+                stdout=subprocess.PIPE,
+                text=True,
+                cwd=root,
+                env={**os.environ, 'PYTHONPATH': root}
+            )
+            try:
+                self.assertEqual(process.stdout.readline().strip(), "ready")
+                process.send_signal(signal.SIGTERM)
+                process.wait(timeout=10)
+            finally:
+                process.kill()
+                process.stdout.close()
+
+            # Still ends the way SIGTERM does, but only after the task ran
+            self.assertEqual(process.returncode, -signal.SIGTERM)
+            with open(path) as file:
+                self.assertEqual(file.read(), "written")
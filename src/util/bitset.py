@@ -0,0 +1,33 @@
+from typing import Iterable
+
+
+class Bitset:
+    """
+    Growable set of small non-negative integers stored one bit each, little-endian within a byte
+    """
+
+    def __init__(self, data: bytes | bytearray | memoryview | None = None):
+        self.__bits = bytearray(data or b'')
+
+    @classmethod
+    def of(cls, indexes: Iterable[int]) -> 'Bitset':
+        bitset = cls()
+        for index in indexes:
+            bitset.add(index)
+        return bitset
+
+    def add(self, index: int) -> None:
+        byte = index >> 3
+        if byte >= len(self.__bits):
+            self.__bits.extend(bytes(byte + 1 - len(self.__bits)))
+        self.__bits[byte] |= 1 << (index & 7)
+
+    def __contains__(self, index: int) -> bool:
+        byte = index >> 3
+        return 0 <= byte < len(self.__bits) and bool(self.__bits[byte] >> (index & 7) & 1)
+
+    def __len__(self) -> int:
+        return int.from_bytes(self.__bits, 'little').bit_count()
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.__bits)
@@ -0,0 +1,122 @@
+import sys
+import math
+import json
+import heapq
+import struct
+import hashlib
+from array import array
+
+
+class CountMinSketch:
+    """
+    Approximate per-key counts in fixed memory, plus the heaviest keys seen so far
+
+    With N total increments an estimate never undercounts, and overcounts by more than
+    e / width * N with probability at most exp(-depth). Two sketches of the same shape can be
+    merged by adding their tables, so each worker can keep its own and a reader sums them.
+
+    The heavy hitters are the `top_k` keys with the highest estimates at the time they were last
+    updated, kept in a min-heap so a new key only has to beat the current minimum to get in.
+    """
+    MAGIC = b'CMS1'
+    HEADER = struct.Struct('<4sIII')
+
+    def __init__(self, width: int = 1024, depth: int = 4, top_k: int = 20):
+        self.width = width
+        self.depth = depth
+        self.top_k = top_k
+        self.total = 0
+        self.__table = array('I', bytes(4 * width * depth))
+        self.__heavy = {}  # type: dict[str, int]
+        self.__heap = []  # type: list[tuple[int, str]]  # may hold outdated entries, __heavy is authoritative
+
+    def add(self, key: str, count: int = 1) -> int:
+        """Count `key` and return its new estimate"""
+        estimate = None
+        for index in self.__indexes(key):
+            self.__table[index] += count
+            estimate = self.__table[index] if estimate is None else min(estimate, self.__table[index])
+        self.total += count
+        self.__offer(key, estimate)
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(self.__table[index] for index in self.__indexes(key))
+
+    def heavy_hitters(self) -> list[tuple[str, int]]:
+        """The tracked heaviest keys with their current estimates, highest first"""
+        return sorted(
+            ((key, self.estimate(key)) for key in self.__heavy),
+            key=lambda hitter: (-hitter[1], hitter[0])
+        )
+
+    def error_bound(self) -> tuple[float, float]:
+        """(largest expected overcount of any estimate, probability of exceeding it)"""
+        return math.e / self.width * self.total, math.exp(-self.depth)
+
+    def merge(self, other: 'CountMinSketch') -> None:
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge count-min sketches of different shapes")
+        for index, count in enumerate(other.__table):
+            if count:
+                self.__table[index] += count
+        self.total += other.total
+        for key in set(self.__heavy) | set(other.__heavy):
+            self.__offer(key, self.estimate(key))
+
+    def to_bytes(self) -> bytes:
+        table = array('I', self.__table)
+        if sys.byteorder != 'little':
+            table.byteswap()
+        return b''.join([
+            self.HEADER.pack(self.MAGIC, self.width, self.depth, self.top_k),
+            struct.pack('<Q', self.total),
+            table.tobytes(),
+            json.dumps(sorted(self.__heavy)).encode()
+        ])
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'CountMinSketch':
+        magic, width, depth, top_k = cls.HEADER.unpack_from(data)
+        if magic != cls.MAGIC:
+            raise ValueError("Not a serialized count-min sketch")
+        sketch = cls(width, depth, top_k)
+        offset = cls.HEADER.size
+        (sketch.total,) = struct.unpack_from('<Q', data, offset)
+        offset += 8
+        table_end = offset + 4 * width * depth
+        sketch.__table = array('I', data[offset:table_end])
+        if sys.byteorder != 'little':
+            sketch.__table.byteswap()
+        for key in json.loads(data[table_end:]):
+            sketch.__offer(key, sketch.estimate(key))
+        return sketch
+
+    def __offer(self, key: str, estimate: int) -> None:
+        if key in self.__heavy or len(self.__heavy) < self.top_k:
+            self.__heavy[key] = estimate
+            heapq.heappush(self.__heap, (estimate, key))
+        else:
+            minimum, minimum_key = self.__minimum()
+            if estimate <= minimum:
+                return
+            heapq.heappop(self.__heap)
+            del self.__heavy[minimum_key]
+            self.__heavy[key] = estimate
+            heapq.heappush(self.__heap, (estimate, key))
+
+        if len(self.__heap) > 4 * self.top_k:
+            self.__heap = [(estimate, key) for key, estimate in self.__heavy.items()]
+            heapq.heapify(self.__heap)
+
+    def __minimum(self) -> tuple[int, str]:
+        """Smallest tracked estimate, dropping heap entries that were superseded since they were pushed"""
+        while self.__heap[0][0] != self.__heavy.get(self.__heap[0][1]):
+            heapq.heappop(self.__heap)
+        return self.__heap[0]
+
+    def __indexes(self, key: str) -> list[int]:
+        """One cell per row, from two halves of a single hash (Kirsch-Mitzenmacher double hashing)"""
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [row * self.width + (first + row * second) % self.width for row in range(self.depth)]
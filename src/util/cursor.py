@@ -0,0 +1,38 @@
+import json
+import base64
+import binascii
+from typing import Any, Optional
+from rest_framework.exceptions import ValidationError
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Opaque, url-safe keyset cursor holding the sort key of the last row of a page
+    """
+    payload = json.dumps(list(values), separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[list]:
+    """
+    Inverse of encode_cursor, None for the first page
+    Raises ValidationError if the cursor was not produced by encode_cursor with `size` values
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, binascii.Error, UnicodeError):
+        raise ValidationError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise ValidationError("Invalid cursor")
+    return values
+
+
+def decode_int_cursor(cursor: Optional[str], size: int) -> Optional[list[int]]:
+    """decode_cursor for cursors made only of integers"""
+    values = decode_cursor(cursor, size)
+    if values is not None and not all(isinstance(value, int) for value in values):
+        raise ValidationError("Invalid cursor")
+    return values
@@ -0,0 +1,16 @@
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+
+def sniff_image_type(content: bytes) -> str:
+    """Media type of an image from its leading bytes, application/octet-stream when unrecognised"""
+    if content[:4] == b'RIFF' and content[8:12] == b'WEBP':
+        return 'image/webp'
+    for signature, media_type in SIGNATURES:
+        if content.startswith(signature):
+            return media_type
+    return 'application/octet-stream'